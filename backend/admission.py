@@ -0,0 +1,197 @@
+import math
+import time
+import asyncio
+import logging
+from collections import deque, Counter
+from src.config import AdmissionConfig
+
+config = AdmissionConfig()
+
+
+class AdmissionRejected(Exception):
+    """
+    請求未被接受：status_code 為回應的 HTTP 狀態碼（429 或 503），retry_after 為建議的重試秒數。
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    一個請求的入場券：已開始執行（admitted）或在佇列中等待。
+    """
+
+    def __init__(self, session_id: str = None):
+        self.session_id = session_id
+        self.admitted = False
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.future = None  # 排隊時建立，輪到時完成
+        self.released = False
+
+
+class AdmissionController:
+    """
+    /api/chat 的入場控制：
+      - 同時執行的流程數上限為 max_concurrent，其餘請求依序排隊；
+      - 佇列長度上限為 max_queue，滿了就立即以 503 拒絕；
+      - 同一 session 同時執行或排隊的請求上限為 max_per_session，超過以 429 拒絕；
+      - 排隊超過 queue_timeout 秒仍未輪到時放棄並回報 503。
+    預估等待時間以流程平均耗時（指數移動平均）÷ 並行上限 × 排隊位置計算。
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        max_per_session: int = 2,
+        queue_timeout: float = 30,
+        default_retry_after: int = 5,
+        alpha: float = 0.2,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.queue_timeout = queue_timeout
+        self.default_retry_after = default_retry_after
+        self.alpha = alpha
+        self.running = 0
+        self.avg_seconds = None
+        self._queue = deque()
+        self._per_session = Counter()
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_full": 0,  # 佇列已滿（503）
+            "rejected_session": 0,  # 同一 session 請求過多（429）
+            "queue_timeouts": 0,
+            "abandoned": 0,  # 排隊中斷線的請求
+        }
+        self._wait_total = 0.0
+
+    def eta(self, position: int):
+        """
+        排在第 position 位的請求預估還要等待的秒數；尚無耗時資料時回傳 None。
+        """
+        if self.avg_seconds is None:
+            return None
+        return round(math.ceil(position / self.max_concurrent) * self.avg_seconds, 1)
+
+    def retry_after(self) -> int:
+        eta = self.eta(len(self._queue) + 1)
+        return max(1, math.ceil(eta)) if eta is not None else self.default_retry_after
+
+    def admit(self, session_id: str = None) -> Ticket:
+        """
+        登記一個請求：有空位就立即開始，否則排入佇列；無法接受時拋出 AdmissionRejected。
+        每個回傳的 Ticket 都必須在結束時呼叫 release()。
+        """
+        if session_id and self._per_session[session_id] >= self.max_per_session:
+            self.counters["rejected_session"] += 1
+            raise AdmissionRejected(429, "同一對話同時進行的請求過多，請稍後再試", self.retry_after())
+        ticket = Ticket(session_id)
+        if self.running < self.max_concurrent and not self._queue:
+            self._start(ticket)
+        elif len(self._queue) < self.max_queue:
+            ticket.future = asyncio.get_running_loop().create_future()
+            self._queue.append(ticket)
+            self.counters["queued"] += 1
+        else:
+            self.counters["rejected_full"] += 1
+            logging.warning("請求佇列已滿（執行中 %s，排隊 %s），拒絕請求", self.running, len(self._queue))
+            raise AdmissionRejected(503, "服務忙碌中，請稍後再試", self.retry_after())
+        if session_id:
+            self._per_session[session_id] += 1
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        ticket 在佇列中的位置（1 起算）；已開始執行時回傳 0。
+        """
+        if ticket.admitted:
+            return 0
+        return self._queue.index(ticket) + 1
+
+    async def wait(self, ticket: Ticket, interval: float = 2.0, timeout: float = None):
+        """
+        等待 ticket 輪到執行；排隊期間位置改變時 yield (位置, 預估等待秒數)。
+        timeout 預設為 queue_timeout，逾時拋出 AdmissionRejected(503)。
+        """
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        expires_at = time.monotonic() + timeout
+        last = None
+        while not ticket.admitted:
+            position = self.position(ticket)
+            if position != last:
+                last = position
+                yield position, self.eta(position)
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                self.counters["queue_timeouts"] += 1
+                self._queue.remove(ticket)
+                raise AdmissionRejected(503, "排隊等待逾時，請稍後再試", self.retry_after())
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.future), min(interval, remaining))
+            except asyncio.TimeoutError:
+                continue
+
+    def release(self, ticket: Ticket):
+        """
+        請求結束（完成、失敗或斷線）時呼叫，釋放名額並讓佇列中的下一個請求開始。重複呼叫不會重複釋放。
+        """
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.session_id:
+            self._per_session[ticket.session_id] -= 1
+            if self._per_session[ticket.session_id] <= 0:
+                del self._per_session[ticket.session_id]
+        if ticket.admitted:
+            self.running -= 1
+            seconds = time.monotonic() - ticket.started_at
+            if self.avg_seconds is None:
+                self.avg_seconds = seconds
+            else:
+                self.avg_seconds += self.alpha * (seconds - self.avg_seconds)
+            self._dispatch()
+        elif ticket in self._queue:
+            self.counters["abandoned"] += 1
+            self._queue.remove(ticket)
+
+    def _start(self, ticket: Ticket):
+        ticket.admitted = True
+        ticket.started_at = time.monotonic()
+        self.running += 1
+        self.counters["admitted"] += 1
+        self._wait_total += ticket.started_at - ticket.created_at
+
+    def _dispatch(self):
+        while self.running < self.max_concurrent and self._queue:
+            ticket = self._queue.popleft()
+            self._start(ticket)
+            if not ticket.future.done():
+                ticket.future.set_result(None)
+
+    def stats(self) -> dict:
+        admitted = self.counters["admitted"]
+        return {
+            "running": self.running,
+            "waiting": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            **self.counters,
+            "avg_wait_seconds": round(self._wait_total / admitted, 3) if admitted else None,
+            "avg_pipeline_seconds": round(self.avg_seconds, 3) if self.avg_seconds is not None else None,
+        }
+
+
+chat_admission = AdmissionController(
+    max_concurrent=config.MAX_CONCURRENT,
+    max_queue=config.MAX_QUEUE,
+    max_per_session=config.MAX_PER_SESSION,
+    queue_timeout=config.QUEUE_TIMEOUT,
+    default_retry_after=config.DEFAULT_RETRY_AFTER,
+)
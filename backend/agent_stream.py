@@ -1,25 +1,100 @@
-from src.clients.model_client import init_model_client
-from src.agents.agent import Agent
+from src.clients.model_client import get_model_client
+from src.config import SessionConfig, RequestConfig, AdmissionConfig
+from backend.session_store import SessionStore
+from backend.single_flight import SingleFlight
+from backend.admission import AdmissionRejected, chat_admission
+from src.utils.deadline import Deadline
+from src.utils.text_normalize import normalize_text
 import logging
-import logging
-import asyncio
 import json
 
 logging.basicConfig(level=logging.DEBUG)  # 或設定到合適的等級
 
-client = init_model_client()
-agent = Agent(client, default_source=None)
+client = get_model_client()
+session_config = SessionConfig()
+session_store = SessionStore(
+    client,
+    max_sessions=session_config.MAX_SESSIONS,
+    ttl=session_config.SESSION_TTL,
+    max_history=session_config.MAX_HISTORY,
+)
+request_config = RequestConfig()
+admission_config = AdmissionConfig()
+# 同時進行的相同問題共用一個流程
+chat_flights = SingleFlight()
+
+
+def coalesce_key(query: str, session_id: str, agent) -> str:
+    """
+    合併請求的 key：正規化後的問題。
+    session 已有對話歷史時，回答取決於上下文，因此只與同一 session 的相同請求合併。
+    """
+    if session_id and agent.has_history():
+        return f"{session_id}|{normalize_text(query)}"
+    return normalize_text(query)
+
+
+def running_flight(query: str, session_id: str = None):
+    """
+    取得相同問題正在執行的流程（沒有時回傳 None）；這類請求直接加入該流程，不佔用入場名額。
+    回傳的流程交給 admitted_stream，串流開始時加入的就是這一個流程，即使它在這之間已經結束。
+    """
+    if not request_config.COALESCE:
+        return None
+    return chat_flights.get(coalesce_key(query, session_id, session_store.get(session_id)))
+
+
+def _final_answer(messages: list) -> str:
+    # 與 Agent.chat 相同：串流片段合併為回答，否則取最後一則完整訊息
+    parts = [m.get("message") or "" for m in messages if m.get("delta")]
+    if parts:
+        return "".join(parts).strip()
+    finals = [m["message"] for m in messages if m.get("finalized") and m.get("message")]
+    return finals[-1] if finals else ""
 
 
-async def agent_stream(query: str):
+async def _serialized(session_id: str, messages):
     """
-    將 OpenAI 回應轉換為前端期望的格式
+    持有 session 的鎖再執行流程：同一 session 的請求依序執行，避免共用的 Agent 歷史交錯。
+    """
+    async with session_store.lock(session_id):
+        async for msg in messages:
+            yield msg
+
+
+async def agent_stream(query: str, session_id: str = None, deadline: Deadline = None, flight=None):
+    """
+    將 OpenAI 回應轉換為前端期望的格式。
+    deadline 為端點設定的請求截止時間，會傳給 Agent 的每個階段。
+    同時進行的相同問題只執行一次流程（使用第一個請求的 session 與截止時間），
+    其他請求加入後先收到已產生的片段，再接收後續片段；結束後回答也會寫入它們各自的 session。
+    同一 session 的流程依序執行，等待前一個請求的時間也計入 deadline。
+    flight 為端點檢查時已在執行的相同流程（見 running_flight），指定時直接加入它而不另外執行。
     """
     try:
-        logging.info(f"開始處理 agent_stream 請求，query: {query}")
+        logging.info(f"開始處理 agent_stream 請求，query: {query}, session_id: {session_id}")
+        agent = session_store.get(session_id)
+
+        pipeline_agent = agent
+        if flight is not None:
+            flight = chat_flights.attach(flight)
+            pipeline_agent = flight.owner
+            messages = chat_flights.subscribe(flight)
+        elif request_config.COALESCE:
+            flight = chat_flights.join(
+                coalesce_key(query, session_id, agent),
+                lambda: _serialized(session_id, agent.chat_stream(query, deadline=deadline)),
+                owner=agent,
+            )
+            pipeline_agent = flight.owner
+            messages = chat_flights.subscribe(flight)
+        else:
+            messages = _serialized(session_id, agent.chat_stream(query, deadline=deadline))
 
-        async for msg in agent.chat_stream(query):
+        received = []
+        async for msg in messages:
             logging.debug("收到原始回應: %s", msg)
+            received.append(msg)
 
             # 轉換格式
             if msg.get("message") is None:
@@ -34,13 +109,23 @@ async def agent_stream(query: str):
                     "finalized": msg.get("finalized"),
                     "reasoning": msg.get("reasoning"),
                     "source": msg.get("source"),
-                    
+                    "delta": msg.get("delta", False),
                 }
+            # 被時間預算截斷的階段（例如 "reasoning"、"tool:search_website"、"summary"）
+            if msg.get("stage"):
+                response_data["stage"] = msg["stage"]
+            if msg.get("degraded"):
+                response_data["degraded"] = msg["degraded"]
 
             logging.debug("轉換後的回應: %s", response_data)
             yield json.dumps(response_data, ensure_ascii=False) + "\n"
-            await asyncio.sleep(0.1)
 
+        # 加入他人流程的請求：把這次問答補進自己的 session，後續追問才有上下文
+        answer = _final_answer(received)
+        if pipeline_agent is not agent and session_id and answer:
+            async with session_store.lock(session_id):
+                agent.add_message("user", query)
+                agent.add_message("assistant", answer)
         logging.info("完成 agent_stream 請求處理")
 
     except Exception as e:
@@ -49,3 +134,48 @@ async def agent_stream(query: str):
             {"error": f"處理請求時發生錯誤: {str(e)}", "finalized": True},
             ensure_ascii=False,
         ) + "\n"
+
+
+async def admitted_stream(ticket, query: str, session_id: str = None, deadline: Deadline = None, flight=None):
+    """
+    先在入場佇列中等待，期間送出排隊位置與預估等待時間；輪到後才執行 agent_stream，結束時釋放名額。
+    排隊時間也計入 deadline。
+    ticket 為 None 時必須指定 flight（端點檢查到的執行中相同流程），加入它而不佔用名額；
+    該流程在串流開始前已被取消、無法重播時，改為在這裡取得名額自行執行。
+    """
+    try:
+        if ticket is None and flight is not None and flight.cancelled:
+            flight = None
+            try:
+                ticket = chat_admission.admit(session_id)
+            except AdmissionRejected as e:
+                # 回應已開始串流，無法再改狀態碼，以錯誤片段告知重試時間
+                yield json.dumps(
+                    {"error": str(e), "retry_after": e.retry_after, "finalized": True}, ensure_ascii=False
+                ) + "\n"
+                return
+        if ticket is not None:
+            try:
+                async for position, eta in chat_admission.wait(
+                    ticket,
+                    interval=admission_config.QUEUE_UPDATE_INTERVAL,
+                    timeout=deadline.remaining() if deadline else None,
+                ):
+                    message = f"目前排在第 {position} 位，請稍候。"
+                    if eta is not None:
+                        message = f"目前排在第 {position} 位，預估等待約 {eta:.0f} 秒。"
+                    yield json.dumps(
+                        {"message": message, "finalized": False, "source": "Queue", "position": position, "eta": eta},
+                        ensure_ascii=False,
+                    ) + "\n"
+            except AdmissionRejected as e:
+                # 回應已開始串流，無法再改狀態碼，以錯誤片段告知重試時間
+                yield json.dumps(
+                    {"error": str(e), "retry_after": e.retry_after, "finalized": True}, ensure_ascii=False
+                ) + "\n"
+                return
+        async for line in agent_stream(query, session_id=session_id, deadline=deadline, flight=flight):
+            yield line
+    finally:
+        if ticket is not None:
+            chat_admission.release(ticket)
@@ -1,4 +1,8 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class ChatRequest(BaseModel):
-    query: str
\ No newline at end of file
+    query: str
+    session_id: Optional[str] = None
+    # 前端可要求比伺服器預設更短的回應時間（秒），不能超過 REQUEST_TIMEOUT
+    timeout: Optional[float] = None
\ No newline at end of file
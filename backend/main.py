@@ -1,13 +1,56 @@
+import weakref
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import StreamingResponse
-from backend.agent_stream import agent_stream
+from backend.agent_stream import admitted_stream, running_flight, session_store, chat_flights
+from backend.admission import AdmissionRejected, chat_admission
 from backend.chat_request import ChatRequest
+from src.config import RequestConfig, SearchConfig
+from src.utils.deadline import Deadline
+from src.clients.browser_pool import browser_pool
+from src.clients.http_client import close_http_client
+from src.clients.model_client import close_model_clients
+from src.clients.scraper_pool import scraper_pool, config as scraper_pool_config
+from src.functions.web_search import get_search_stats
+from src.functions.search_prefetch import search_prefetcher
+from src.agents.function_registry import registry as tool_registry
+from src.functions.scrape_cache import get_scrape_cache
+from src.utils.completion_cache import get_completion_cache
+from src.tools.preferred_answers import faq_store, preferred_answer_stats
 from test.fake_stream import fake_stream
 
 import logging
 
-app = FastAPI()
+request_config = RequestConfig()
+search_config = SearchConfig()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 隨服務啟動預熱瀏覽器池，關閉時一併釋放；只用 HTTP 搜尋時不需要瀏覽器
+    # 瀏覽器無法啟動時只影響需要瀏覽器的搜尋，服務照常啟動，第一次使用時再重試
+    if search_config.BACKEND != "http":
+        try:
+            await browser_pool.start()
+        except Exception as e:
+            logging.warning("瀏覽器池預熱失敗，改為第一次使用時啟動: %s", e)
+    # 常見問答資料先讀本地快照，之後在背景定期更新
+    faq_store.start()
+    # 網頁擷取的 worker process 可選擇在啟動時預熱，否則於第一次使用時建立
+    if scraper_pool_config.PREWARM:
+        await scraper_pool.start()
+    try:
+        yield
+    finally:
+        await faq_store.stop()
+        await browser_pool.stop()
+        await scraper_pool.stop()
+        await close_http_client()
+        await close_model_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 設定允許的來源，這裡只允許 localhost:3000，或者你也可以使用 "*" 允許所有
 origins = [
@@ -51,9 +94,30 @@ async def chat(request: ChatRequest):
     處理用戶發送的對話訊息，並返回 Agent 的回應。
     """
     query = request.query
-    logger.info(f"收到對話請求，query: {query}")
-
-    response = StreamingResponse(agent_stream(query), media_type="application/json")
+    logger.info(f"收到對話請求，query: {query}, session_id: {request.session_id}")
+
+    # 整個請求的時間預算從這裡開始計算，傳給推理、搜尋與摘要等每個階段
+    timeout = request_config.TIMEOUT
+    if request.timeout is not None and request.timeout > 0:
+        timeout = min(timeout, request.timeout)
+    deadline = Deadline(timeout)
+
+    # 入場控制：加入執行中的相同問題不佔名額；其餘請求有空位就執行，否則排隊，佇列滿了立即拒絕
+    # 檢查到的流程交給串流，開始串流時加入的就是同一個流程，不會因它在這之間結束而改為不佔名額地執行
+    ticket = None
+    flight = running_flight(query, request.session_id)
+    if flight is None:
+        try:
+            ticket = chat_admission.admit(request.session_id)
+        except AdmissionRejected as e:
+            logger.warning(f"拒絕對話請求（{e.status_code}）: {e}")
+            raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    stream = admitted_stream(ticket, query, session_id=request.session_id, deadline=deadline, flight=flight)
+    if ticket is not None:
+        # 串流開始前客戶端就斷線時 generator 不會執行，也就不會在 finally 釋放名額；於 generator 被回收時補上
+        weakref.finalize(stream, chat_admission.release, ticket)
+    response = StreamingResponse(stream, media_type="application/json")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["Connection"] = "keep-alive"
 
@@ -85,6 +149,67 @@ async def test_stream(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/sessions/stats")
+async def session_stats():
+    """
+    回傳目前 session 數量、記憶體使用量等計數器。
+    """
+    return session_store.stats()
+
+
+@app.get("/api/chat/stats")
+async def chat_stats():
+    """
+    回傳入場控制（執行中、排隊中、被拒絕的請求數與平均等待時間）與相同問題合併的統計。
+    """
+    return {"admission": chat_admission.stats(), "coalesce": chat_flights.stats()}
+
+
+@app.get("/api/search/stats")
+async def search_stats():
+    """
+    回傳搜尋頁面載入時間、快取命中與未命中，以及預先搜尋的使用、浪費次數與節省時間等統計。
+    """
+    return {**get_search_stats(), "prefetch": search_prefetcher.stats()}
+
+
+@app.get("/api/tools/stats")
+async def tool_stats():
+    """
+    回傳各工具的呼叫次數、逾時、執行中與排隊中的數量及平均耗時。
+    """
+    return tool_registry.stats()
+
+
+@app.get("/api/cache/stats")
+async def completion_cache_stats():
+    """
+    回傳推理與摘要的模型回應快取命中統計。
+    """
+    cache = get_completion_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.get("/api/preferred-answers/stats")
+async def preferred_answers_stats():
+    """
+    回傳常見問答快速路徑的命中率與估計節省的時間。
+    """
+    return preferred_answer_stats.stats()
+
+
+@app.get("/api/scraper/stats")
+async def scraper_stats():
+    """
+    回傳網頁擷取 worker pool 的工作數、逾時、重建次數與平均耗時，以及擷取結果快取的命中統計。
+    """
+    cache = get_scrape_cache()
+    return {
+        "pool": scraper_pool.stats(),
+        "cache": cache.stats() if cache is not None else {"enabled": False},
+    }
+
+
 @app.get("/")
 async def read_root():
     return {"message": "歡迎使用 Agent 聊天系統！請使用 POST 請求 /chat 端點。"}
@@ -0,0 +1,91 @@
+import time
+import asyncio
+import logging
+import weakref
+from collections import OrderedDict
+from src.agents.agent import Agent
+
+
+class SessionStore:
+    """
+    以 session_id 為 key 保存每位使用者專屬的 Agent。
+      - 超過 max_sessions 時，淘汰最久未使用的 session（LRU）；
+      - 超過 ttl 秒未使用的 session 會在下一次存取時被清除；
+      - 每個 Agent 的對話歷史上限為 max_history；
+      - 同一 session 的 Agent 共用一份對話歷史，執行流程前須以 lock(session_id) 取得該 session 的鎖，
+        讓同一 session 的請求依序執行，不會交錯寫入歷史。
+    """
+
+    def __init__(self, client, max_sessions: int = 1000, ttl: float = 1800, max_history: int = 20):
+        self.client = client
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_history = max_history
+        self._sessions = OrderedDict()  # session_id -> (agent, last_access)
+        # 沒有人持有或等待時鎖會自動回收，不必跟著 session 的淘汰清除
+        self._locks = weakref.WeakValueDictionary()  # session_id -> asyncio.Lock
+        self.evictions = 0
+        self.expirations = 0
+
+    def _new_agent(self) -> Agent:
+        return Agent(self.client, default_source=None, max_history=self.max_history)
+
+    def _expire(self, now: float):
+        """
+        清除所有超過 TTL 的 session。OrderedDict 依存取時間排序，
+        因此只需從最舊的一端檢查即可。
+        """
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expirations += 1
+            logging.debug("session 過期移除: %s", session_id)
+
+    def get(self, session_id: str = None) -> Agent:
+        """
+        取得 session_id 對應的 Agent，不存在則建立。
+        未提供 session_id 時回傳一個不保存的臨時 Agent，避免不同使用者共用歷史。
+        """
+        if not session_id:
+            return self._new_agent()
+
+        now = time.monotonic()
+        self._expire(now)
+
+        entry = self._sessions.pop(session_id, None)
+        agent = entry[0] if entry else self._new_agent()
+        self._sessions[session_id] = (agent, now)
+
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.evictions += 1
+            logging.debug("session 數量超過上限，淘汰: %s", evicted_id)
+        return agent
+
+    def lock(self, session_id: str = None) -> asyncio.Lock:
+        """
+        取得 session_id 專屬的鎖；未提供 session_id 時回傳新的鎖（臨時 Agent 不會被共用）。
+        呼叫端需持有回傳的鎖直到流程結束，鎖才不會被回收。
+        """
+        if not session_id:
+            return asyncio.Lock()
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def stats(self) -> dict:
+        """
+        回傳 session 數量與估計的記憶體使用量等計數器。
+        """
+        self._expire(time.monotonic())
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "history_bytes": sum(agent.history_size() for agent, _ in self._sessions.values()),
+            "messages": sum(len(agent.messages) for agent, _ in self._sessions.values()),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+
+
+class Flight:
+    """
+    一個執行中的流程：已產生的片段、完成狀態、開始流程的一方（owner）與正在接收的訂閱者數量。
+    """
+
+    def __init__(self, key, owner=None):
+        self.key = key
+        self.owner = owner
+        self.chunks = []
+        self.done = False
+        self.cancelled = False  # 因所有訂閱者離開而被取消，片段不完整
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def close(self, error: Exception = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        # 喚醒等待中的訂閱者，之後的等待改用新的 Event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+    合併相同 key 的並行請求：
+      - 第一個請求（leader）以獨立的 task 執行流程，之後相同 key 的請求直接加入同一個流程；
+      - 每個片段轉送給所有訂閱者，晚加入的訂閱者會先收到已產生的片段；
+      - 流程結束後 key 即移除，之後的請求重新執行（不是快取）；
+      - 所有訂閱者都離開時取消流程。
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.counters = {"flights": 0, "joined": 0, "cancelled": 0, "failed": 0}
+        self.max_subscribers = 0
+
+    def get(self, key) -> Flight:
+        """
+        取得 key 對應的執行中流程，沒有時回傳 None。
+        回傳的流程之後可能結束，可以 attach() 加入同一個流程：已完成的流程會重播全部片段。
+        """
+        return self._flights.get(key)
+
+    def attach(self, flight: Flight) -> Flight:
+        """
+        加入指定的流程（通常由 get() 取得）；以 subscribe() 接收片段。
+        流程已被取消（flight.cancelled）時無法重播，呼叫端應改為自行執行。
+        """
+        self.counters["joined"] += 1
+        logging.info("加入執行中的相同請求（目前 %s 個訂閱者）: %s", flight.subscribers + 1, flight.key)
+        flight.subscribers += 1
+        self.max_subscribers = max(self.max_subscribers, flight.subscribers)
+        return flight
+
+    def join(self, key, factory, owner=None) -> Flight:
+        """
+        取得 key 對應的執行中流程；沒有時呼叫 factory() 取得 async iterator 並開始執行。
+        owner 記錄開始流程的一方（例如 leader 的 Agent），讓加入者判斷流程是否由自己執行。
+        以 subscribe() 接收片段。
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            return self.attach(flight)
+        flight = Flight(key, owner)
+        flight.task = asyncio.create_task(self._run(flight, factory()))
+        self._flights[key] = flight
+        self.counters["flights"] += 1
+        # 加入時就計入訂閱者，避免其他訂閱者離開時把尚未開始接收的流程取消
+        flight.subscribers += 1
+        self.max_subscribers = max(self.max_subscribers, flight.subscribers)
+        return flight
+
+    def _discard(self, flight: Flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    async def _run(self, flight: Flight, source):
+        try:
+            async for chunk in source:
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            flight.cancelled = True
+            flight.close(RuntimeError("流程已被取消"))
+            raise
+        except Exception as e:
+            self.counters["failed"] += 1
+            flight.close(e)
+        else:
+            flight.close()
+        finally:
+            self._discard(flight)
+
+    async def subscribe(self, flight: Flight):
+        """
+        逐一產出流程的片段：先補送已產生的部分，再等待後續片段。
+        flight 必須由 join() 取得，每次 join() 對應一次 subscribe()。
+        流程拋出的例外會在所有片段送出後，於每個訂閱者端重新拋出。
+        """
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                    continue
+                if flight.done:
+                    break
+                await flight.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # 沒有人在等結果了：取消流程，並立即移除 key，避免新請求加入被取消的流程
+                self.counters["cancelled"] += 1
+                self._discard(flight)
+                flight.task.cancel()
+
+    async def stream(self, key, factory, owner=None):
+        """
+        join() 與 subscribe() 的組合，不需要知道流程由誰執行時使用。
+        """
+        async for chunk in self.subscribe(self.join(key, factory, owner)):
+            yield chunk
+
+    def stats(self) -> dict:
+        requests = self.counters["flights"] + self.counters["joined"]
+        return {
+            **self.counters,
+            "active": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+            "max_subscribers": self.max_subscribers,
+            "coalesce_rate": round(self.counters["joined"] / requests, 3) if requests else None,
+        }
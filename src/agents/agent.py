@@ -1,22 +1,32 @@
+import time
+import asyncio
 import logging
-from src.clients.model_client import init_model_client
-from src.agents.reasoning import (
-    generate_reasoning,
-    parse_reasoning_text,
-)
+from src.config import PreferredAnswerConfig, RequestConfig, SearchConfig
+from src.utils.deadline import Deadline, DeadlineExceeded, iterate_within, run_within
+from src.agents.reasoning import generate_reasoning_stream
+from src.tools.preferred_answers import match_preferred_answer, preferred_answer_stats
+from src.functions.search_prefetch import search_prefetcher
 from src.agents.function_registry import (
     get_function_definitions,
-    handle_function_call,
-    get_function_call_info,
+    get_tool_definitions,
+    handle_tool_calls,
+    merge_tool_call_deltas,
+    get_streamed_tool_calls_info,
 )
 
 logging.basicConfig(level=logging.DEBUG)  # 或設定到合適的等級
 
+preferred_config = PreferredAnswerConfig()
+request_config = RequestConfig()
+search_config = SearchConfig()
+
 
 class Agent:
-    def __init__(self, client, default_source: str = None):
+    def __init__(self, client, default_source: str = None, max_history: int = None):
         """
         初始化 Agent，接收外部模型客戶端、系統提示和預設來源（default_source）。
+        client 需為非同步客戶端（例如 get_model_client() 回傳的共用 AsyncAzureOpenAI）。
+        max_history 為保留的對話訊息上限（不含系統提示），None 表示不限制。
         """
         system_prompt = f"""
         你是一個具有內部推理能力且高效的智慧助手。
@@ -34,20 +44,55 @@ class Agent:
         self.messages = [{"role": "system", "content": system_prompt}]
         self.default_source = default_source
         self.reasoning_steps = []  # 用於記錄模型的推理過程（面向使用者顯示）
+        self.max_history = max_history
         if system_prompt:
             self.add_message("system", system_prompt)
+        # 系統提示固定保留，不參與歷史裁剪
+        self._pinned = len(self.messages)
 
-    def add_message(self, role, content):
+    def add_message(self, role, content, record: bool = True):
         """
         新增對話訊息，若不是用戶訊息，則同時記錄到 reasoning_steps 中，
         這裡我們希望呈現給使用者的「思考過程」是比較自然的描述，而非內部調試細節。
+        record 為 False 時只加入對話（例如給模型的內部指示），不記錄到 reasoning_steps，
+        以免這些內容再被放進摘要的思考過程。
         """
         self.messages.append({"role": role, "content": content})
+        self._trim_history()
         # 對於非用戶訊息，我們將其記錄下來，但可以過濾或轉換後再記錄
-        if role != "user":
+        if role != "user" and record:
             self.reasoning_steps.append(content)
 
-    async def chat_stream(self, user_input):
+    def _trim_history(self):
+        """
+        若設定了 max_history，只保留最近的 max_history 則對話訊息，
+        避免每次請求都把無限增長的歷史重新送給模型。
+        """
+        if self.max_history is None or not hasattr(self, "_pinned"):
+            return
+        overflow = len(self.messages) - self._pinned - self.max_history
+        if overflow > 0:
+            del self.messages[self._pinned : self._pinned + overflow]
+
+    def has_history(self) -> bool:
+        """
+        是否已有對話歷史（系統提示以外的訊息）；沒有歷史時回答只取決於問題本身。
+        """
+        return len(self.messages) > self._pinned
+
+    def history_size(self) -> int:
+        """
+        估算目前對話歷史佔用的位元組數（以 UTF-8 編碼的內容長度計算）。
+        """
+        return sum(len(str(m.get("content") or "").encode("utf-8")) for m in self.messages)
+
+    async def chat_stream(self, user_input, deadline: Deadline = None):
+        """
+        處理一則使用者訊息，逐段 yield 回應片段。
+        deadline 為整個請求的截止時間：超過時間的階段會被取消並改用降級回答，
+        被截斷的階段列在最後一個 finalized 片段的 "degraded" 欄位。
+        """
+        deadline = deadline or Deadline()
         logging.debug("開始 chat_stream, user_input: %s", user_input)
         # 清空之前的推理紀錄
         self.reasoning_steps = []
@@ -55,53 +100,145 @@ class Agent:
         yield {"message": user_input, "finalized": False, "source": "UserInput"}
         logging.debug("已 yield user 訊息")
 
+        # Step 0: 先查詢常見問答，高信心直接回覆，省去整個 LLM 流程
+        grounding = None
+        if preferred_config.ENABLED:
+            start = time.perf_counter()
+            try:
+                tier, record, score = await asyncio.to_thread(match_preferred_answer, user_input)
+            except Exception as e:
+                logging.warning("查詢常見問答失敗: %s", e)
+                tier, record, score = "miss", None, 0
+            saved = preferred_answer_stats.record_lookup(tier, time.perf_counter() - start)
+            logging.info("常見問答查詢: %s（相似度 %.1f，節省約 %.2f 秒）", tier, score, saved)
+            if tier == "high":
+                answer = record[preferred_config.ANSWER_KEY]
+                self.add_message("assistant", answer)
+                yield {"message": answer, "finalized": True, "source": "PreferredAnswer"}
+                return
+            if tier == "medium":
+                grounding = (
+                    f"以下是與使用者問題相近的常見問答，可作為回答的依據：\n"
+                    f"問題：{record.get(preferred_config.QUESTION_KEY, '')}\n"
+                    f"回答：{record[preferred_config.ANSWER_KEY]}"
+                )
+
+        start = time.perf_counter()
+        # 推測式預先搜尋：與推理並行，以使用者問題先行搜尋；流程結束時未被使用就取消
+        prefetch = None
+        if search_config.PREFETCH_ENABLED:
+            prefetch = search_prefetcher.start(user_input, self.default_source)
+        try:
+            async for item in self._run_pipeline(user_input, grounding, deadline, prefetch):
+                if item.get("finalized") and deadline.cut_stages:
+                    item["degraded"] = list(deadline.cut_stages)
+                yield item
+        finally:
+            if prefetch is not None:
+                search_prefetcher.release(prefetch)
+        preferred_answer_stats.record_pipeline(time.perf_counter() - start)
+
+    async def _run_pipeline(self, user_input, grounding: str = None, deadline: Deadline = None, prefetch=None):
+        """
+        完整的 LLM 流程：推理 → 最終回答（可能呼叫外部函數）。
+        grounding 為中信心命中的常見問答內容，會以系統訊息提供給模型參考。
+        推理最多用到截止前 ANSWER_RESERVE 秒，最終回答最多用到截止前 TOOLS_RESERVE 秒，
+        剩下的時間留給工具與摘要；兩者都依總預算的比例縮小（見 Deadline.reserve）。
+        prefetch 為這個請求的預先搜尋，只有這個請求的 search_website 會取用。
+        """
+        deadline = deadline or Deadline()
         # Step 1: 調用模型生成推理過程
         functions = get_function_definitions()
         logging.debug("開始生成推理過程, functions: %s", functions)
-        raw_reasoning = generate_reasoning(self.client, user_input, functions)
-        logging.debug("raw_reasoning: %s", raw_reasoning)
-        steps = parse_reasoning_text(raw_reasoning)
-        logging.debug("解析後的 steps: %s", steps)
-        for step in steps:
-            if not step.strip():  # 跳過空消息
-                continue
-            self.reasoning_steps.append(step)
-            logging.debug("yield 推理步驟: %s", step[-1])
-            yield {"reasoning": [step], "finalized": False, "source": "ReasoningStep"}
+        # 推理過程以串流生成，每個 <stepN> 完成後立即送出
+        steps = []
+        reasoning = generate_reasoning_stream(self.client, user_input, functions)
+        reserve = deadline.reserve(request_config.ANSWER_RESERVE, request_config.ANSWER_RESERVE_RATIO)
+        try:
+            async for step in iterate_within(reasoning, deadline, "reasoning", reserve=reserve):
+                if not step.strip():  # 跳過空消息
+                    continue
+                steps.append(step)
+                self.reasoning_steps.append(step)
+                logging.debug("yield 推理步驟: %s", step)
+                yield {"reasoning": [step], "finalized": False, "source": "ReasoningStep"}
+        except DeadlineExceeded:
+            # 推理來不及完成：以已產生的步驟繼續回答
+            yield {
+                "message": "推理時間已到，以目前的推理步驟直接回答。",
+                "finalized": False,
+                "source": "Deadline",
+                "stage": "reasoning",
+            }
 
         # Step 2: 使用整個推理過程生成最終答案
         full_reasoning = "\n".join(steps)
         logging.debug("開始生成最終答案，full_reasoning: %s", full_reasoning)
-        self.add_message("system", f"這是你可以參考的推理步驟: {full_reasoning}，生成不包含推理步驟的最終答案。並在回答時使用 markdown 語法進行美化排版。")
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=self.messages,
-            functions=functions,
-            function_call="auto",
-            temperature=0.7,
+        # 以下兩則是給模型的內部指示：推理步驟已記錄在 reasoning_steps，不再重複記錄
+        if grounding:
+            self.add_message("system", grounding, record=False)
+        self.add_message(
+            "system",
+            f"這是你可以參考的推理步驟: {full_reasoning}，生成不包含推理步驟的最終答案。並在回答時使用 markdown 語法進行美化排版。",
+            record=False,
         )
-        logging.debug("模型回應 response: %s", response)
-
-        # 檢查模型回應是否包含 function_call
-        info = get_function_call_info(response)
-        logging.debug("function call info: %s", info)
-        if info:
-            logging.debug("進入 function call 處理")
-            async for item in handle_function_call(
-                response, self.reasoning_steps, self.default_source
-            ):
+        tool_calls = {}
+        content_parts = []
+        # 最終回答可能改為呼叫工具，保留時間給工具與摘要
+        answer_reserve = deadline.reserve(request_config.TOOLS_RESERVE, request_config.TOOLS_RESERVE_RATIO)
+        try:
+            stream = await run_within(
+                self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=self.messages,
+                    tools=get_tool_definitions(),
+                    tool_choice="auto",
+                    temperature=0.7,
+                    stream=True,
+                ),
+                deadline,
+                "answer",
+                reserve=answer_reserve,
+            )
+
+            # 逐 token 轉送最終答案；若模型改為呼叫工具，則累加 tool_calls 片段（可能同時有多個）
+            async for chunk in iterate_within(stream.__aiter__(), deadline, "answer", reserve=answer_reserve):
+                # Azure 的第一個 chunk 可能只有 content filter 結果，沒有 choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.tool_calls:
+                    merge_tool_call_deltas(tool_calls, delta.tool_calls)
+                    continue
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield {"message": delta.content, "delta": True, "finalized": False, "source": "AssistantAnswer"}
+        except DeadlineExceeded:
+            # 回答被截斷：保留已輸出的部分；尚未輸出任何內容時告知使用者
+            answer = "".join(content_parts).strip()
+            notice = "\n\n（回應時間已到，回答可能不完整）" if answer else "抱歉，回應時間已到，請稍後再試或簡化問題。"
+            if answer:
+                self.add_message("assistant", answer)
+            yield {"message": notice, "delta": True, "finalized": False, "source": "AssistantAnswer"}
+            yield {"message": "", "delta": True, "finalized": True, "source": "AssistantAnswer"}
+            return
+
+        # 檢查模型回應是否包含 tool call；多個工具會並行執行
+        infos = get_streamed_tool_calls_info(tool_calls)
+        logging.debug("tool calls info: %s", infos)
+        if infos:
+            logging.debug("進入 tool call 處理")
+            async for item in handle_tool_calls(infos, self.reasoning_steps, self.default_source, deadline, prefetch):
                 item["source"] = "FunctionCall"
                 yield item
             return
 
-        # 如果沒有 function_call，則直接使用模型生成的答案
-        content = response.choices[0].message.content.strip()
-        logging.debug("直接生成的答案 content: %s", content)
-        if content:
-            answer = content.strip()
-            logging.debug("yield assistant answer: %s", answer)
+        # 如果沒有 tool call，則直接使用模型生成的答案
+        answer = "".join(content_parts).strip()
+        logging.debug("直接生成的答案 content: %s", answer)
+        if answer:
             self.add_message("assistant", answer)
-            yield {"message": answer, "finalized": True, "source": "AssistantAnswer"}
+            yield {"message": "", "delta": True, "finalized": True, "source": "AssistantAnswer"}
         else:
             logging.debug("模型未返回答案")
             yield {"message": "模型未返回任何答案", "finalized": True, "source": "AssistantAnswer"}
@@ -112,20 +249,30 @@ class Agent:
         封裝 chat_stream，並將所有生成的訊息合併為最終答案，
         這裡僅用於測試。實際上，您可能會通過 WebSocket 或 SSE 來流式傳輸。
         """
-        final_messages = []
+        answer_parts = []
+        last_message = None
         async for msg in self.chat_stream(user_input):
-            final_messages.append(msg)
-        return final_messages[-1]["message"]
+            if msg.get("delta"):
+                answer_parts.append(msg.get("message", ""))
+            elif msg.get("message") is not None:
+                last_message = msg["message"]
+        if answer_parts:
+            return "".join(answer_parts)
+        return last_message
 
 
 if __name__ == "__main__":
-    from src.clients.model_client import init_model_client
+    from src.clients.model_client import get_model_client
 
-    client = init_model_client()
+    client = get_model_client()
     system_prompt = "你是一個具有內部推理能力的助手。當你無法直接回答問題時，請啟用外部搜尋並將搜尋過程與最終答案展示給使用者。"
     agent = Agent(client, system_prompt=system_prompt, default_source=None)
 
     user_input = "請問最新的人工智慧新聞有哪些？"
     print("用戶:", user_input)
-    for message in agent.chat_stream(user_input):
-        print(message)
+
+    async def _demo():
+        async for message in agent.chat_stream(user_input):
+            print(message)
+
+    asyncio.run(_demo())
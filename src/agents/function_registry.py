@@ -1,122 +1,319 @@
 import json
-from src.functions.web_search import search_web_with_firefox
+import time
+import asyncio
+import logging
+from src.functions.web_search import search_website
+from src.functions.search_prefetch import Prefetch, search_prefetcher
+from src.functions.page_fetcher import enrich_results
+from src.config import SearchConfig, ToolConfig, RequestConfig
+from src.agents.tool_registry import ToolRegistry
+from src.utils.deadline import Deadline, DeadlineExceeded, iterate_within
 from src.tools.get_current_time import get_current_time
-from src.functions.summarize_result import summarize_result
+from src.tools.knowledge_base import search_knowledge_base
+from src.tools.scrape_website import scrape_website
+from src.functions.summarize_result import summarize_result_stream, format_raw_info
+
+search_config = SearchConfig()
+tool_config = ToolConfig()
+request_config = RequestConfig()
+
+# 所有可供模型呼叫的工具；以 @registry.tool 註冊，schema 只建立一次
+registry = ToolRegistry(default_timeout=tool_config.DEFAULT_TIMEOUT)
+
 
 def get_function_definitions() -> list:
     """
-    根據 query 返回可用的函數定義列表。
-    這裡我們固定提供 "search_website" 這個函數。
+    返回可用的函數定義列表（已快取，不會每次請求重建）。
+    """
+    return registry.definitions()
+
+
+def get_tool_definitions() -> list:
     """
-    # 根據 query 你可以加入判斷，這裡先固定返回 "search_website"
+    將函數定義包成 tools 介面的格式（{"type": "function", "function": {...}}）。
+    """
+    return registry.tool_definitions()
+
+
+def _parse_arguments(name: str, arguments: str) -> dict:
+    try:
+        return json.loads(arguments or "{}")
+    except json.JSONDecodeError as e:
+        logging.warning("工具 %s 的參數不是有效的 JSON，改用空參數: %s", name, e)
+        return {}
+
+
+def get_tool_calls_info(response) -> list:
+    """
+    從非串流的模型 response 中取出所有 tool call：[{"id", "func_name", "arguments"}, ...]。
+    """
+    tool_calls = response.choices[0].message.tool_calls
+    if not tool_calls:
+        return []
     return [
         {
-            "name": "search_website",
-            "description": "從網路上搜尋即時資訊，並整理摘要返回答案。",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "用於搜尋的查詢詞。"}
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "name": "get_current_time",
-            "description": "回傳現在時間。若使用者問到「最近、現在」等等需要取得當下時間的指令時可以呼叫。",
-            "parameters": {"type": "object", "properties": {}, "required": []},
-        },
+            "id": call.id,
+            "func_name": call.function.name,
+            "arguments": _parse_arguments(call.function.name, call.function.arguments),
+        }
+        for call in tool_calls
     ]
 
 
-def get_function_call_info(response) -> dict:
+def merge_tool_call_deltas(calls: dict, deltas) -> dict:
     """
-    從模型返回的 response 中提取 function_call 的相關資訊。
+    將串流回應中的 tool_calls 片段依 index 累加到 calls 中。
+    串流模式下每個 tool call 的 id、名稱與參數會分成多個 chunk 傳回，需要逐段拼接。
     """
-    if response.choices[0].finish_reason != "function_call":
-        return 
+    for delta in deltas:
+        call = calls.setdefault(delta.index, {"id": None, "name": "", "arguments": ""})
+        if delta.id:
+            call["id"] = delta.id
+        if delta.function is not None:
+            if delta.function.name:
+                call["name"] += delta.function.name
+            if delta.function.arguments:
+                call["arguments"] += delta.function.arguments
+    return calls
+
+
+def get_streamed_tool_calls_info(calls: dict) -> list:
+    """
+    將累加完成的 tool_calls 片段轉換為與 get_tool_calls_info 相同的格式，依 index 排序。
+    """
+    return [
+        {"id": call["id"], "func_name": call["name"], "arguments": _parse_arguments(call["name"], call["arguments"])}
+        for _, call in sorted(calls.items())
+        if call["name"]
+    ]
+
+
+@registry.tool(
+    "search_website",
+    "從網路上搜尋即時資訊，並整理摘要返回答案。",
+    {
+        "type": "object",
+        "properties": {"query": {"type": "string", "description": "用於搜尋的查詢詞。"}},
+        "required": ["query"],
+    },
+    timeout=tool_config.SEARCH_TIMEOUT,
+    # 搜尋可能改用瀏覽器，限制同時執行的數量以免頁面排隊拖垮其他請求
+    max_concurrency=tool_config.SEARCH_MAX_CONCURRENCY,
+)
+async def _run_search_website(
+    arguments: dict, reasoning: list, default_source: str = None, prefetch: Prefetch = None
+) -> dict:
+    query_arg = arguments.get("query", "")
+    # 這個請求在推理期間已預先搜尋相似的查詢時直接使用其結果，否則呼叫搜尋函數取得原始結果
+    raw_results = None
+    if search_config.PREFETCH_ENABLED:
+        raw_results = await search_prefetcher.take(prefetch, query_arg, default_source)
+    if raw_results is None:
+        raw_results = await search_website(query_arg, source_url=default_source)
+    # 結果本身會以查詢結果區塊進入摘要，思考過程只記錄筆數
+    reasoning.append(f"搜尋到 {len(raw_results)} 筆結果。")
+    # 可選：並行抓取前幾筆結果的網頁正文，讓摘要不只依據標題
+    if search_config.ENRICH_ENABLED:
+        raw_results = await enrich_results(raw_results)
+    return {"raw_search_results": raw_results, "query": query_arg}
+
+
+# 預先搜尋與 search_website 工具共用同一個並行上限
+search_prefetcher.limiter = registry.get("search_website").slot
+
+
+@registry.tool(
+    "get_current_time",
+    "回傳現在時間。若使用者問到「最近、現在」等等需要取得當下時間的指令時可以呼叫。",
+    timeout=2,
+    # 結果與時間相關，不能使用模型回應快取
+    cacheable=False,
+)
+async def _run_get_current_time(
+    arguments: dict, reasoning: list, default_source: str = None, prefetch: Prefetch = None
+) -> dict:
+    return {"current_time": get_current_time()}
 
-    function_call = response.choices[0].message.function_call
-    if not function_call:
-        return 
 
-    func_name = function_call.name
-    arguments = json.loads(function_call.arguments)
-    return {"func_name": func_name, "arguments": arguments}
+@registry.tool(
+    "search_knowledge_base",
+    "在學校常見問答與已爬取的網頁內容中做語意搜尋。與校務、申請流程相關的問題請優先使用。",
+    {
+        "type": "object",
+        "properties": {"query": {"type": "string", "description": "要查詢的問題。"}},
+        "required": ["query"],
+    },
+    timeout=tool_config.KNOWLEDGE_TIMEOUT,
+)
+async def _run_search_knowledge_base(
+    arguments: dict, reasoning: list, default_source: str = None, prefetch: Prefetch = None
+) -> dict:
+    query_arg = arguments.get("query", "")
+    knowledge_results = await search_knowledge_base(query_arg)
+    reasoning.append(f"知識庫找到 {len(knowledge_results)} 筆相關資料。")
+    return {"knowledge_results": knowledge_results, "query": query_arg}
 
 
-async def handle_function_call(response, reasoning, default_source: str = None):
+@registry.tool(
+    "scrape_website",
+    "擷取指定學校網頁中的資訊（例如 FAQ、公告、申請期限）。需要某個已知網頁的詳細內容時使用，較耗時。",
+    {
+        "type": "object",
+        "properties": {
+            "url": {"type": "string", "description": "要擷取的網頁網址。"},
+            "prompt": {"type": "string", "description": "要從網頁中擷取的資訊描述。"},
+        },
+        "required": ["url", "prompt"],
+    },
+    timeout=tool_config.SCRAPE_TIMEOUT,
+    max_concurrency=tool_config.SCRAPE_MAX_CONCURRENCY,
+)
+async def _run_scrape_website(
+    arguments: dict, reasoning: list, default_source: str = None, prefetch: Prefetch = None
+) -> dict:
+    prompt_arg = arguments.get("prompt", "")
+    scraped = await scrape_website(arguments.get("url", ""), prompt_arg)
+    if "error" in scraped:
+        reasoning.append("網頁擷取失敗：" + scraped["error"])
+    return {"scraped_results": [scraped], "query": prompt_arg}
+
+
+def merge_tool_results(results: list) -> dict:
     """
-    處理模型返回的 function_call 回應：
-      - 如果函數名稱為 "search_website"，則調用 search_web_with_firefox 並利用 summarize_result 整合結果；
-      - 如果函數名稱為 "get_current_time"，則調用 get_current_time 返回當前時間。
-    以生成器方式逐步 yield 處理訊息，最終返回結果。
+    合併多個工具的結果：列表欄位串接，其餘欄位以先完成者為準（query 則以空白串接）。
     """
-    info = get_function_call_info(response)
-    if not info:
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            elif key == "query" and merged.get("query") and value:
+                if value not in merged["query"]:
+                    merged["query"] += " " + value
+            else:
+                merged.setdefault(key, value)
+    return merged
+
+
+async def _run_tool(
+    info: dict, reasoning: list, default_source: str = None, deadline: Deadline = None, prefetch: Prefetch = None
+):
+    """
+    依宣告的並行與時間上限執行單一工具，回傳 (info, 結果, 錯誤訊息, 耗時)。
+    有請求截止時間時，工具最多只能用到截止前保留給摘要的時間點。
+    """
+    name = info["func_name"]
+    tool = registry.get(name)
+    start = time.perf_counter()
+    if tool is None:
+        return info, None, f"未知的工具 {name}", 0.0
+    budget = None
+    if deadline is not None:
+        reserve = deadline.reserve(request_config.SUMMARY_RESERVE, request_config.SUMMARY_RESERVE_RATIO)
+        budget = deadline.timeout(reserve=reserve)
+    try:
+        result = await tool.run(info["arguments"], reasoning, default_source, prefetch, timeout=budget)
+        return info, result, None, time.perf_counter() - start
+    except asyncio.TimeoutError:
+        if budget is not None and budget < tool.timeout:
+            deadline.cut(f"tool:{name}")
+            return info, None, "請求時間不足，已略過", time.perf_counter() - start
+        logging.warning("工具 %s 超過 %s 秒未完成", name, tool.timeout)
+        return info, None, f"執行逾時（{tool.timeout:g} 秒）", time.perf_counter() - start
+    except Exception as e:
+        logging.warning("工具 %s 執行失敗: %s", name, e)
+        return info, None, f"執行失敗：{e}", time.perf_counter() - start
+
+
+async def handle_tool_calls(
+    infos: list, reasoning, default_source: str = None, deadline: Deadline = None, prefetch: Prefetch = None
+):
+    """
+    處理模型在同一個回應中要求的所有 tool call：
+      - 所有工具同時開始執行，各自有時間上限，總耗時約為最慢的工具而非總和；
+      - 每個工具完成（或逾時、失敗）時立即 yield 一個進度片段；
+      - 全部完成後把各工具的結果合併，以 summarize_result_stream 產生一份摘要，逐 token 回傳，
+        每個片段以 {"delta": True} 標記，最後以一個空的 finalized 片段結束。
+    deadline 為請求的截止時間：工具不足時間時略過；摘要來不及開始時改為直接列出工具結果，
+    中途被截斷時保留已產生的部分並附上提示。
+    prefetch 為這個請求的預先搜尋，傳給工具使用（只有 search_website 會取用）。
+    """
+    if not infos:
         return
+    deadline = deadline or Deadline()
 
-    # 處理搜尋功能
-    if info["func_name"] == "search_website":
+    names = [info["func_name"] for info in infos]
+    for info in infos:
         reasoning.append(
-            f"模型返回 function_call，準備執行 'search_website'，參數："
-            + json.dumps(info["arguments"], ensure_ascii=False)
+            f"模型返回 tool call，執行 '{info['func_name']}'，參數："
             + json.dumps(info["arguments"], ensure_ascii=False)
         )
-        yield {
-            "message": f"模型返回 function_call，進行網路搜尋。",
-            "finalized": False,
-            "reasoning": [reasoning.copy()[-1]],  # 複製一份當前推理過程
-            "source": "search_website1",
-        }
-        query_arg = info["arguments"].get("query", "")
-        # 呼叫搜尋函數取得原始結果
-        raw_results = await search_web_with_firefox(query_arg, source_url=default_source)
-        reasoning.append(f"搜尋結果：" + json.dumps(raw_results, ensure_ascii=False))
-        yield {
-            "message": f"網路搜尋完成。",
-            "finalized": False,
-            "reasoning": [reasoning.copy()[-1]],
-            "source": "search_website2",
-        }
-        # 使用 summarize_search_sresult 將原始結果與推理過程整合摘要
-        summary = summarize_result(
-            {
-                "raw_search_results": raw_results,
-                "reasoning": reasoning,
-            },
-        )
-        reasoning.append(f"將搜尋結果進行統整。")
-        yield {
-            "message": summary,
-            "finalized": True,
-            "reasoning": [reasoning.copy()[-1]],  # 傳回完整的推理過程
-            "source": "search_website3",
-        }
-        return 
-
-    if info["func_name"] == "get_current_time":
-        reasoning.append(f"模型返回 function_call，執行 'get_current_time'。")
-        yield {
-            "message": "模型返回 function_call，取得當前時間。",
-            "finalized": False,
-            "reasoning": [reasoning.copy()[-1]],
-            "source": "get_current_time1",
-        }
-        current_time = get_current_time()
-        summary = summarize_result(
-            {
-                "current_time": current_time,
-                "reasoning": reasoning,
-            },
-        )
-        reasoning.append(f"{summary}")
-        yield {
-            "message": f"{summary}",
-            "finalized": True,
-            "reasoning": [reasoning.copy()[-1]],
-            "source": "get_current_time2",
-        }
-        return 
-    
-    return
+    yield {
+        "message": f"模型返回 tool call，同時執行：{', '.join(names)}。",
+        "finalized": False,
+        "reasoning": reasoning.copy()[-len(infos):],
+        "source": "ToolCallStart",
+    }
+
+    tasks = [asyncio.create_task(_run_tool(info, reasoning, default_source, deadline, prefetch)) for info in infos]
+    results = []
+    errors = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            info, result, error, elapsed = await next_done
+            if error is None:
+                results.append(result)
+                # reasoning 會進入摘要 prompt（與模型回應快取的 key），只記錄完成與否；耗時只放在進度片段與 log
+                reasoning.append(f"'{info['func_name']}' 完成。")
+                step = f"'{info['func_name']}' 完成，耗時 {elapsed:.2f} 秒。"
+                logging.info("工具 %s 完成，耗時 %.2f 秒", info["func_name"], elapsed)
+            else:
+                errors.append(f"{info['func_name']}：{error}")
+                step = f"'{info['func_name']}' {error}"
+                reasoning.append(step)
+            yield {
+                "message": step,
+                "finalized": False,
+                "reasoning": [step],
+                "source": f"{info['func_name']}1",
+                "tool": info["func_name"],
+            }
+    finally:
+        # 呼叫端中途停止迭代時，不留下仍在執行的工具
+        for task in tasks:
+            task.cancel()
+
+    summary_info = merge_tool_results(results)
+    summary_info["reasoning"] = reasoning
+    if errors:
+        summary_info["tool_errors"] = errors
+    tools = [registry.get(name) for name in names]
+    cacheable = not errors and all(tool.cacheable for tool in tools if tool is not None)
+    summary_parts = []
+    summary = summarize_result_stream(summary_info, cacheable=cacheable)
+    try:
+        async for delta in iterate_within(summary, deadline, "summary"):
+            summary_parts.append(delta)
+            yield {"message": delta, "delta": True, "finalized": False, "source": "ToolSummary"}
+    except DeadlineExceeded:
+        # 摘要來不及產生：沒有任何內容時直接列出工具結果，否則附上截斷提示
+        fallback = "\n\n（回應時間已到，摘要可能不完整）" if summary_parts else format_raw_info(summary_info)
+        yield {"message": fallback, "delta": True, "finalized": False, "source": "ToolSummary"}
+    reasoning.append("將工具結果進行統整。")
+    yield {
+        "message": "",
+        "delta": True,
+        "finalized": True,
+        "reasoning": [reasoning.copy()[-1]],
+        "source": "ToolSummary",
+    }
+
+
+async def handle_function_call(info: dict, reasoning, default_source: str = None, deadline: Deadline = None):
+    """
+    處理單一 function call（舊介面），等同只有一個 tool call 的 handle_tool_calls。
+    """
+    if not info:
+        return
+    async for item in handle_tool_calls([info], reasoning, default_source, deadline):
+        yield item
@@ -1,3 +1,7 @@
+import re
+from src.utils.completion_cache import get_completion_cache
+
+
 def build_function_prompt(functions: list) -> str:
     """
     根據 function definitions 動態生成描述文字，
@@ -12,16 +16,11 @@ def build_function_prompt(functions: list) -> str:
     return "\n".join(lines)
 
 
-def generate_reasoning(client, query, functions=None):
+def build_reasoning_messages(query, functions=None) -> list:
     """
-    利用模型生成推理過程，要求模型用 <step1>, <step2>, ... 來分隔各步驟。
-    參數：
-        - query: 用戶查詢
-        - client: 用於呼叫模型的客戶端
-    返回：
-        - 模型生成的原始推理過程文本
+    組出要求模型以 <step1>, <step2>, ... 分隔推理步驟的 messages。
     """
-    func_info = build_function_prompt(functions)
+    func_info = build_function_prompt(functions or [])
     prompt = f"""
         請詳細描述你如何思考下面這個問題的推理過程，
         並且考慮到你可以調用以下外部功能來獲取最新資訊：\n
@@ -29,8 +28,20 @@ def generate_reasoning(client, query, functions=None):
         並用 <step1>, <step2>, <step3> 等標記分隔每個步驟。\n
         問題：{query}\n推理過程：
         """
-    messages = [{"role": "system", "content": prompt}]
-    response = client.chat.completions.create(
+    return [{"role": "system", "content": prompt}]
+
+
+async def generate_reasoning(client, query, functions=None):
+    """
+    利用模型生成推理過程，要求模型用 <step1>, <step2>, ... 來分隔各步驟。
+    參數：
+        - query: 用戶查詢
+        - client: 用於呼叫模型的非同步客戶端（AsyncAzureOpenAI）
+    返回：
+        - 模型生成的原始推理過程文本
+    """
+    messages = build_reasoning_messages(query, functions)
+    response = await client.chat.completions.create(
         model="gpt-4o",
         messages=messages,
         temperature=0.7,
@@ -39,6 +50,102 @@ def generate_reasoning(client, query, functions=None):
     return reasoning_text
 
 
+async def generate_reasoning_stream(client, query, functions=None):
+    """
+    以串流方式生成推理過程，每當一個 <stepN> 區塊完整到達就立即 yield，
+    不必等待整段推理文字生成完畢。
+    相同（或語意相近）的問題若已在模型回應快取中，直接重播快取的推理文字。
+    參數：
+        - query: 用戶查詢
+        - client: 用於呼叫模型的非同步客戶端（AsyncAzureOpenAI）
+    返回：
+        - 逐一 yield 的推理步驟文字
+    """
+    messages = build_reasoning_messages(query, functions)
+    cache = get_completion_cache()
+    parser = ReasoningStepParser()
+
+    vector = None
+    if cache is not None:
+        cached, vector = await cache.lookup("reasoning", "gpt-4o", messages, 0.7, query=query)
+        if cached is not None:
+            for step in parser.feed(cached) + parser.flush():
+                yield step
+            return
+
+    stream = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=messages,
+        temperature=0.7,
+        stream=True,
+    )
+    parts = []
+    async for chunk in stream:
+        # Azure 的第一個 chunk 可能只有 content filter 結果，沒有 choices
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        for step in parser.feed(delta):
+            yield step
+    for step in parser.flush():
+        yield step
+
+    if cache is not None and parts:
+        await cache.set("reasoning", "gpt-4o", messages, 0.7, "".join(parts), query=query, vector=vector)
+
+
+class ReasoningStepParser:
+    """
+    增量式的 <stepN> 解析器。
+    每次 feed 一段新的文字，回傳已經完整的步驟；
+    步驟的結束邊界為對應的 </stepN> 結束標記，或下一個 "<step" 開頭。
+    在沒有結束標記的情況下，結果與 parse_reasoning_text 對整段文字的解析一致。
+    """
+
+    MARKER = "<step"
+    CLOSING = re.compile(r"</step\d*>")
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        steps = []
+        while True:
+            start = self._buffer.find(self.MARKER)
+            if start == -1:
+                break
+            # 與 parse_reasoning_text 相同，丟棄第一個標記之前的前言
+            self._buffer = self._buffer[start:]
+
+            next_start = self._buffer.find(self.MARKER, len(self.MARKER))
+            closing = self.CLOSING.search(self._buffer)
+            if closing and (next_start == -1 or closing.end() <= next_start):
+                end = closing.end()
+            elif next_start != -1:
+                end = next_start
+            else:
+                break
+
+            step = self._buffer[:end].strip()
+            self._buffer = self._buffer[end:]
+            if step:
+                steps.append(step)
+        return steps
+
+    def flush(self) -> list:
+        """
+        串流結束時取出剩餘的內容作為最後一個步驟。
+        若全文都沒有 <step 標記，則整段文字視為單一步驟。
+        """
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+
 def parse_reasoning_text(raw_reasoning: str) -> list:
     """
     根據分隔符號解析原始推理過程文本，返回步驟列表。
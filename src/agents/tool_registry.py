@@ -0,0 +1,176 @@
+import time
+import asyncio
+import logging
+import contextlib
+
+
+class Tool:
+    """
+    一個可供模型呼叫的工具：JSON schema、執行函數，以及宣告的執行限制。
+      - timeout：從排隊到執行完成的時間上限（秒）；
+      - max_concurrency：同時執行的上限，超過時排隊等待（None 表示不限制）；
+      - cacheable：結果能否用於模型回應快取（時間相關的工具應為 False）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        parameters: dict,
+        handler,
+        timeout: float = 30,
+        max_concurrency: int = None,
+        cacheable: bool = True,
+    ):
+        self.name = name
+        self.handler = handler
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.cacheable = cacheable
+        self.schema = {"name": name, "description": description, "parameters": parameters}
+        self._semaphore = None
+        self._loop = None
+        self.waiting = 0
+        self.running = 0
+        self.counters = {"calls": 0, "completed": 0, "timeouts": 0, "failures": 0}
+        self._total_seconds = 0.0
+
+    def _get_semaphore(self):
+        # semaphore 綁定建立時的事件迴圈；換了事件迴圈（例如測試中多次 asyncio.run）時重建
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        佔用一個並行名額直到離開區塊（未設定 max_concurrency 時不限制）。
+        工具以外、但與工具使用相同資源的工作（例如預先搜尋）也應透過它執行，才不會超出宣告的上限。
+        """
+        if self.max_concurrency is None:
+            yield
+            return
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            semaphore.release()
+
+    async def _call(self, arguments: dict, *args):
+        async with self.slot():
+            return await self.handler(arguments, *args)
+
+    async def run(self, arguments: dict, *args, timeout: float = None):
+        """
+        在並行上限與時間上限內執行工具；逾時拋出 asyncio.TimeoutError。
+        timeout 為呼叫端剩餘的時間（例如請求的截止時間），取其與宣告的 timeout 中較小者。
+        """
+        self.counters["calls"] += 1
+        start = time.perf_counter()
+        limit = self.timeout if timeout is None else min(self.timeout, timeout)
+        try:
+            result = await asyncio.wait_for(self._call(arguments, *args), limit)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        except Exception:
+            self.counters["failures"] += 1
+            raise
+        self.counters["completed"] += 1
+        self._total_seconds += time.perf_counter() - start
+        return result
+
+    def stats(self) -> dict:
+        completed = self.counters["completed"]
+        return {
+            **self.counters,
+            "timeout": self.timeout,
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "avg_seconds": round(self._total_seconds / completed, 3) if completed else None,
+        }
+
+
+class ToolRegistry:
+    """
+    以 decorator 宣告工具的註冊表：
+      - schema 在註冊時建立一次並快取，每次請求直接回傳同一份列表；
+      - 依名稱查表分派，新增工具不必修改 agent 或分派邏輯。
+    """
+
+    def __init__(self, default_timeout: float = 30):
+        self.default_timeout = default_timeout
+        self._tools = {}
+        self._definitions = None
+        self._tool_definitions = None
+
+    def tool(
+        self,
+        name: str,
+        description: str,
+        parameters: dict = None,
+        timeout: float = None,
+        max_concurrency: int = None,
+        cacheable: bool = True,
+    ):
+        """
+        註冊工具的 decorator；被裝飾的函數簽名為 async handler(arguments, reasoning, default_source, prefetch)，
+        prefetch 為該請求的預先搜尋（可能為 None）。
+        """
+
+        def decorator(handler):
+            if name in self._tools:
+                logging.warning("工具 %s 重複註冊，以新的定義取代", name)
+            self._tools[name] = Tool(
+                name,
+                description,
+                parameters or {"type": "object", "properties": {}, "required": []},
+                handler,
+                timeout=self.default_timeout if timeout is None else timeout,
+                max_concurrency=max_concurrency,
+                cacheable=cacheable,
+            )
+            # 工具列表改變，下次取用時重建 schema 快取
+            self._definitions = None
+            self._tool_definitions = None
+            return handler
+
+        return decorator
+
+    def get(self, name: str) -> Tool:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self):
+        return len(self._tools)
+
+    def definitions(self) -> list:
+        """
+        函數定義列表（舊的 functions 格式），建立後快取；呼叫端不應修改回傳的內容。
+        """
+        if self._definitions is None:
+            self._definitions = [tool.schema for tool in self._tools.values()]
+        return self._definitions
+
+    def tool_definitions(self) -> list:
+        """
+        tools 介面格式的定義列表（{"type": "function", "function": {...}}），建立後快取。
+        """
+        if self._tool_definitions is None:
+            self._tool_definitions = [{"type": "function", "function": schema} for schema in self.definitions()]
+        return self._tool_definitions
+
+    def stats(self) -> dict:
+        return {name: tool.stats() for name, tool in self._tools.items()}
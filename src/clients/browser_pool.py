@@ -0,0 +1,227 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from src.config import BrowserConfig
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:  # 只用 HTTP 搜尋時可以不安裝 Playwright
+    async_playwright = None
+
+config = BrowserConfig()
+
+
+class BrowserBusyError(Exception):
+    """
+    等待分頁的請求已達上限，或等待逾時。
+    """
+
+
+class _BrowserSlot:
+    """
+    一個常駐的 Firefox 瀏覽器與其目前使用中的 context。
+    context 使用次數達上限或發生錯誤時會被換新，舊的 context 等其頁面全部關閉後再釋放。
+    """
+
+    def __init__(self):
+        self.browser = None
+        self.context = None
+        self.uses = 0
+        self.active = {}  # context -> 使用中的頁面數
+        self.retired = set()  # 已淘汰、等待關閉的 context
+
+
+class BrowserPool:
+    """
+    行程內共用的 Playwright 瀏覽器池：
+      - 啟動時預先開好 size 個 headless Firefox 與 context；
+      - 以 semaphore 限制同時開啟的頁面數量（max_pages）；
+      - 等待分頁的請求最多 max_waiting 個、每個最多等 wait_timeout 秒，超過時拋出 BrowserBusyError；
+      - context 每使用 context_max_uses 次，或瀏覽器崩潰時自動重建；
+      - stop() 會關閉所有 context、瀏覽器與 Playwright。
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        max_pages: int = 4,
+        context_max_uses: int = 50,
+        user_agent: str = None,
+        max_waiting: int = None,
+        wait_timeout: float = None,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.waiting = 0
+        self.context_max_uses = context_max_uses
+        self.user_agent = user_agent
+        self._playwright = None
+        self._slots = []
+        self._next = 0
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._lock = asyncio.Lock()
+        self.stats = {"pages": 0, "context_recycles": 0, "browser_restarts": 0, "busy_rejections": 0}
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        """
+        啟動 Playwright 並預熱所有瀏覽器。重複呼叫不會重複啟動。
+        啟動失敗時關閉已開啟的部分並拋出例外，池維持未啟動，下次使用時再重試。
+        """
+        async with self._lock:
+            if self.started:
+                return
+            if async_playwright is None:
+                raise RuntimeError("未安裝 Playwright，無法使用瀏覽器")
+            self._playwright = await async_playwright().start()
+            self._slots = [_BrowserSlot() for _ in range(self.size)]
+            try:
+                for slot in self._slots:
+                    await self._launch(slot)
+            except Exception:
+                for slot in self._slots:
+                    if slot.browser is not None:
+                        await self._close_browser(slot)
+                self._slots = []
+                await self._playwright.stop()
+                self._playwright = None
+                raise
+            logging.info("BrowserPool 已啟動，瀏覽器數量: %s，頁面上限: %s", self.size, self.max_pages)
+
+    async def stop(self):
+        """
+        關閉所有 context 與瀏覽器，並停止 Playwright。
+        """
+        async with self._lock:
+            if not self.started:
+                return
+            for slot in self._slots:
+                await self._close_browser(slot)
+            self._slots = []
+            await self._playwright.stop()
+            self._playwright = None
+            logging.info("BrowserPool 已關閉")
+
+    async def _launch(self, slot: _BrowserSlot):
+        slot.browser = await self._playwright.firefox.launch(headless=True)
+        slot.active = {}
+        slot.retired = set()
+        await self._new_context(slot)
+
+    async def _new_context(self, slot: _BrowserSlot):
+        slot.context = await slot.browser.new_context(user_agent=self.user_agent)
+        slot.active[slot.context] = 0
+        slot.uses = 0
+
+    async def _close_browser(self, slot: _BrowserSlot):
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            logging.debug("關閉瀏覽器時發生錯誤: %s", e)
+        slot.browser = None
+        slot.context = None
+
+    async def _recycle_context(self, slot: _BrowserSlot):
+        """
+        以新的 context 取代目前的 context；舊 context 若已無頁面則立即關閉。
+        """
+        old = slot.context
+        await self._new_context(slot)
+        self.stats["context_recycles"] += 1
+        slot.retired.add(old)
+        await self._release_context(slot, old)
+
+    async def _release_context(self, slot: _BrowserSlot, context):
+        if context in slot.retired and slot.active.get(context, 0) == 0:
+            slot.retired.discard(context)
+            slot.active.pop(context, None)
+            try:
+                await context.close()
+            except Exception as e:
+                logging.debug("關閉 context 時發生錯誤: %s", e)
+
+    async def _acquire_context(self):
+        """
+        以輪詢方式挑選瀏覽器，必要時重啟瀏覽器或換新 context。
+        """
+        async with self._lock:
+            slot = self._slots[self._next % len(self._slots)]
+            self._next += 1
+            if slot.browser is None or not slot.browser.is_connected():
+                logging.warning("瀏覽器已中斷，重新啟動")
+                self.stats["browser_restarts"] += 1
+                await self._launch(slot)
+            elif slot.uses >= self.context_max_uses:
+                await self._recycle_context(slot)
+            slot.uses += 1
+            context = slot.context
+            slot.active[context] = slot.active.get(context, 0) + 1
+            return slot, context
+
+    async def _acquire_page_slot(self):
+        """
+        取得開啟分頁的名額；等待的請求過多或等待逾時時拋出 BrowserBusyError。
+        """
+        if self._semaphore.locked() and self.max_waiting is not None and self.waiting >= self.max_waiting:
+            self.stats["busy_rejections"] += 1
+            raise BrowserBusyError(f"等待瀏覽器分頁的請求已達上限（{self.max_waiting}）")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.stats["busy_rejections"] += 1
+            raise BrowserBusyError(f"等待瀏覽器分頁超過 {self.wait_timeout} 秒") from None
+        finally:
+            self.waiting -= 1
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        取得一個新的分頁，離開 with 區塊時自動關閉。
+        若池尚未啟動（例如直接從命令列執行），會在第一次使用時啟動。
+        瀏覽器忙碌（等待的請求過多或等待逾時）時拋出 BrowserBusyError。
+        """
+        if not self.started:
+            await self.start()
+        await self._acquire_page_slot()
+        try:
+            slot, context = await self._acquire_context()
+            page = None
+            try:
+                page = await context.new_page()
+                self.stats["pages"] += 1
+                yield page
+            except Exception:
+                # 發生錯誤時視為 context 可能已損壞，換新以免影響後續搜尋
+                async with self._lock:
+                    if slot.context is context:
+                        await self._recycle_context(slot)
+                raise
+            finally:
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logging.debug("關閉分頁時發生錯誤: %s", e)
+                async with self._lock:
+                    # 瀏覽器重啟後舊 context 已不在記錄中，無需處理
+                    if context in slot.active:
+                        slot.active[context] -= 1
+                        await self._release_context(slot, context)
+        finally:
+            self._semaphore.release()
+
+
+browser_pool = BrowserPool(
+    size=config.POOL_SIZE,
+    max_pages=config.MAX_PAGES,
+    context_max_uses=config.CONTEXT_MAX_USES,
+    user_agent=config.USER_AGENT,
+    max_waiting=config.MAX_WAITING,
+    wait_timeout=config.PAGE_WAIT_TIMEOUT,
+)
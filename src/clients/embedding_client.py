@@ -0,0 +1,77 @@
+import hashlib
+import math
+from openai import AsyncAzureOpenAI
+from src.config import ScraperEmbeddingConfig
+
+config = ScraperEmbeddingConfig()
+
+
+class HashingEmbedder:
+    """
+    本地、可重現的 embedder：把字元 n-gram 雜湊到固定維度的向量（feature hashing）。
+    不需網路，用於測試或離線開發，取代 Azure embedding。
+    """
+
+    def __init__(self, dim: int = 256, ngram: int = 2):
+        self.dim = dim
+        self.ngram = ngram
+        self.name = f"hashing:{dim}:{ngram}"
+
+    def _embed(self, text: str) -> list:
+        vector = [0.0] * self.dim
+        compact = "".join(str(text).lower().split())
+        grams = [compact[i : i + self.ngram] for i in range(max(1, len(compact) - self.ngram + 1))]
+        for gram in grams:
+            digest = hashlib.md5(gram.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    async def __call__(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+
+class AzureEmbedder:
+    """
+    使用 Azure OpenAI 的 embedding 部署將文字轉為向量。
+    以 await embedder(texts) 呼叫，回傳與 texts 等長的向量列表。
+    """
+
+    def __init__(self, deployment: str = None, batch_size: int = 256):
+        self.deployment = deployment or config.AZURE_EMBEDDING_DEPLOYMENT
+        self.name = f"azure:{self.deployment}"
+        self.batch_size = batch_size
+        self._client = None
+
+    def _get_client(self) -> AsyncAzureOpenAI:
+        if self._client is None:
+            self._client = AsyncAzureOpenAI(
+                azure_endpoint=config.AZURE_ENDPOINT_EMBEDDINGS or config.AZURE_OPENAI_ENDPOINT,
+                api_key=config.AZURE_OPENAI_API_KEY,
+                api_version=config.API_VERSION,
+            )
+        return self._client
+
+    async def __call__(self, texts: list) -> list:
+        client = self._get_client()
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            response = await client.embeddings.create(
+                model=self.deployment, input=texts[i : i + self.batch_size]
+            )
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return vectors
+
+
+_embedder = None
+
+
+def get_embedder():
+    """
+    取得行程內共用的 embedder；EMBEDDER=hashing 時使用本地的 HashingEmbedder。
+    """
+    global _embedder
+    if _embedder is None:
+        _embedder = HashingEmbedder() if config.EMBEDDER == "hashing" else AzureEmbedder()
+    return _embedder
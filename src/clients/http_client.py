@@ -0,0 +1,35 @@
+import httpx
+from src.config import HttpConfig
+
+config = HttpConfig()
+
+_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    取得行程內共用的 httpx.AsyncClient。
+    所有抓取網頁的功能共用同一個連線池，避免每次請求都重新建立 TCP/TLS 連線。
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers={"User-Agent": config.USER_AGENT, "Accept-Language": config.ACCEPT_LANGUAGE},
+            timeout=httpx.Timeout(config.TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.MAX_CONNECTIONS,
+                max_keepalive_connections=config.MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client():
+    """
+    關閉共用的 HTTP 客戶端，於服務關閉時呼叫。
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
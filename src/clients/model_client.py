@@ -1,22 +1,61 @@
-from openai import AzureOpenAI
+import httpx
+from openai import AsyncAzureOpenAI
 from src.config import ModelConfig
 
 config = ModelConfig()
 
+# 行程內共用的模型客戶端，key 為名稱（目前只有 "default"）
+_clients = {}
 
-def init_model_client():
+
+def init_model_client(http_client: httpx.AsyncClient = None):
     """
-    使用 config 中的參數初始化 AzureOpenAI 客戶端，
+    使用 config 中的參數初始化 AsyncAzureOpenAI 客戶端，
+    所有呼叫皆為非同步，避免在 async generator 中阻塞 event loop。
+    每次呼叫都會建立新的連線池；一般情況請改用 get_model_client()。
     未來如果需要支持其他模型供應商，可在此處擴展。
     """
-    client = AzureOpenAI(
+    client = AsyncAzureOpenAI(
         azure_endpoint=config.AZURE_OPENAI_ENDPOINT,
         api_key=config.AZURE_OPENAI_API_KEY,
         api_version=config.AZURE_API_VERSION,
+        http_client=http_client,
     )
     return client
 
 
+def _build_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(config.TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=config.MAX_CONNECTIONS,
+            max_keepalive_connections=config.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_model_client(name: str = "default"):
+    """
+    取得共用的模型客戶端。Agent、推理生成與摘要都透過這裡取得同一個實例，
+    共用同一個保持連線（keep-alive）的連線池，不必每次重新建立 TCP/TLS 連線。
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed():
+        client = init_model_client(http_client=_build_http_client())
+        _clients[name] = client
+    return client
+
+
+async def close_model_clients():
+    """
+    關閉所有共用的模型客戶端，於服務關閉時呼叫。
+    """
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
+
+
 if __name__ == "__main__":
-    client = init_model_client()
+    client = get_model_client()
     print("Model client initialized.")
@@ -0,0 +1,182 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.config import ScraperPoolConfig
+
+config = ScraperPoolConfig()
+
+# worker process 內的 scraper 設定，由 _init_worker 在 process 啟動時建立一次
+_worker_config = None
+
+
+def _init_worker():
+    global _worker_config
+    from src.clients.scraper_client import init_scraper_client
+
+    _worker_config = init_scraper_client()
+
+
+def _run_job(prompt: str, source: str):
+    from src.functions.scraper import run_scraper
+
+    return run_scraper(prompt, source, _worker_config, verbose=False)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _discard_result(future):
+    # 已放棄的工作之後的結果或例外（例如 pool 被重建）無人等待，取出以免被記錄為未處理的例外
+    if not future.cancelled():
+        future.exception()
+
+
+class ScraperPool:
+    """
+    在獨立 process 中執行 SmartScraperGraph 的常駐 worker pool：
+      - 每個 worker 啟動時執行一次 initializer（建立 init_scraper_client 的模型設定），之後重複使用；
+      - scrape() 為 async API，爬取在其他 process 進行，不阻塞事件迴圈，也能用滿所有 CPU 核心；
+      - 每個工作有 timeout；逾時或被取消時，尚未開始的工作直接移除；
+        已在執行、無法中斷的工作若佔滿所有 worker，就終止並重建整個 pool；
+      - worker 異常結束（BrokenProcessPool）時自動重建。
+    initializer 與 job 必須是可 pickle 的模組層級函數，方便測試替換。
+    """
+
+    def __init__(self, workers: int = 2, job_timeout: float = 120, initializer=_init_worker, job=_run_job):
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.initializer = initializer
+        self.job = job
+        self._executor = None
+        self._stuck = set()  # 已放棄但仍在 worker 中執行的工作
+        self._in_flight = 0
+        self._total_seconds = 0.0
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "restarts": 0,
+        }
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 使用 spawn：服務 process 內有執行緒與事件迴圈，fork 並不安全
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+            )
+        return self._executor
+
+    async def start(self):
+        """
+        建立 pool 並讓所有 worker 完成啟動（載入套件、執行 initializer），第一個請求不必等待冷啟動。
+        """
+        executor = self._ensure_executor()
+        pids = await asyncio.gather(*(asyncio.wrap_future(executor.submit(_ping)) for _ in range(self.workers)))
+        logging.info("ScraperPool 已啟動，worker 數量: %s（已回應: %s）", self.workers, len(set(pids)))
+
+    async def stop(self):
+        """
+        終止所有 worker 並關閉 pool，於服務關閉時呼叫。
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(self._shutdown, executor)
+            logging.info("ScraperPool 已關閉")
+
+    @staticmethod
+    def _shutdown(executor: ProcessPoolExecutor, wait: bool = True):
+        # 爬取工作可能執行數分鐘，直接終止 worker 而不是等待完成
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _restart(self, executor: ProcessPoolExecutor, reason: str):
+        # 多個工作可能同時發現同一個 pool 損壞，只重建一次
+        if executor is None or executor is not self._executor:
+            return
+        self._executor = None
+        self._stuck.clear()
+        self.counters["restarts"] += 1
+        logging.warning("重建 ScraperPool: %s", reason)
+        # 在事件迴圈中執行，不等待舊 pool 的管理執行緒結束
+        self._shutdown(executor, wait=False)
+
+    def _abandon(self, executor: ProcessPoolExecutor, future):
+        # 尚未開始的工作可以直接取消；已在執行的只能等它結束或重建 pool
+        if future.cancel():
+            return
+        self._stuck.add(future)
+        future.add_done_callback(self._stuck.discard)
+        if len(self._stuck) >= self.workers:
+            self._restart(executor, "所有 worker 都被逾時的工作佔用")
+
+    async def scrape(self, prompt: str, source: str, timeout: float = None):
+        """
+        在 worker process 中爬取 source，回傳 SmartScraperGraph 的結果。
+        逾時拋出 asyncio.TimeoutError；呼叫端取消時，工作也會一併放棄。
+        排隊中的工作因 pool 重建而被取消時拋出 RuntimeError。
+        """
+        timeout = self.job_timeout if timeout is None else timeout
+        executor = self._ensure_executor()
+        future = executor.submit(self.job, prompt, source)
+        self.counters["submitted"] += 1
+        self._in_flight += 1
+        waiter = asyncio.wrap_future(future)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            waiter.add_done_callback(_discard_result)
+            self._abandon(executor, future)
+            raise
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if future.cancelled() and task is not None and not task.cancelling():
+                # 其他請求的逾時讓 pool 重建，排隊中的工作被取消，但呼叫端本身並未被取消：
+                # 改為一般錯誤，以免 CancelledError 一路中斷不相關的對話串流
+                self.counters["failed"] += 1
+                raise RuntimeError("scraper pool 已重建，工作被取消，請重試") from None
+            self.counters["cancelled"] += 1
+            waiter.add_done_callback(_discard_result)
+            self._abandon(executor, future)
+            raise
+        except BrokenProcessPool:
+            self.counters["failed"] += 1
+            self._restart(executor, "worker 異常結束")
+            raise
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+        self.counters["completed"] += 1
+        self._total_seconds += time.perf_counter() - start
+        return result
+
+    def stats(self) -> dict:
+        completed = self.counters["completed"]
+        return {
+            "workers": self.workers,
+            "started": self.started,
+            "in_flight": self._in_flight,
+            "stuck": len(self._stuck),
+            **self.counters,
+            "avg_seconds": round(self._total_seconds / completed, 3) if completed else None,
+        }
+
+
+scraper_pool = ScraperPool(workers=config.WORKERS, job_timeout=config.JOB_TIMEOUT)
@@ -9,11 +9,158 @@ class ModelConfig:
         self.AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
         self.AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
         self.AZURE_API_VERSION = os.getenv("AZURE_API_VERSION", "2024-02-01")
+        # 共用模型客戶端的連線池設定
+        self.MAX_CONNECTIONS = int(os.getenv("MODEL_MAX_CONNECTIONS", "100"))
+        self.MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MODEL_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.KEEPALIVE_EXPIRY = float(os.getenv("MODEL_KEEPALIVE_EXPIRY", "60"))  # 秒
+        self.TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "60"))  # 秒
 
 class SheetConfig:
     def __init__(self):
         self.GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
         self.SHEET_NAME = "Sheet1"
+        # 常見問答資料的本地快照與背景更新設定
+        self.SNAPSHOT_PATH = os.getenv("FAQ_SNAPSHOT_PATH", "cache/faq_snapshot.json")
+        self.REFRESH_INTERVAL = float(os.getenv("FAQ_REFRESH_INTERVAL", "600"))  # 秒
+        # 設定後改從本地 JSON 檔載入問答資料（測試或離線開發用），不連線 Google
+        self.FIXTURE_PATH = os.getenv("FAQ_FIXTURE_PATH")
+
+class PreferredAnswerConfig:
+    def __init__(self):
+        # 常見問答快速路徑：高信心直接回覆，中信心作為模型的參考資料
+        self.ENABLED = os.getenv("PREFERRED_ANSWER_ENABLED", "true").lower() == "true"
+        self.HIGH_THRESHOLD = float(os.getenv("PREFERRED_ANSWER_HIGH_THRESHOLD", "90"))
+        self.MEDIUM_THRESHOLD = float(os.getenv("PREFERRED_ANSWER_MEDIUM_THRESHOLD", "60"))
+        # 直接回覆還需整句相似度（fuzz.ratio）達到此門檻，避免只比對到部分問題就略過 LLM
+        self.HIGH_STRICT_THRESHOLD = float(os.getenv("PREFERRED_ANSWER_HIGH_STRICT_THRESHOLD", "85"))
+        self.QUESTION_KEY = "問題"
+        self.ANSWER_KEY = "回覆有誤"
+
+class SessionConfig:
+    def __init__(self):
+        # 每個使用者 session 對應一個 Agent，以下為 session store 的上限設定
+        self.MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+        self.SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))  # 秒
+        self.MAX_HISTORY = int(os.getenv("MAX_HISTORY", "20"))  # 每個 session 保留的訊息數
+
+class RequestConfig:
+    def __init__(self):
+        # 每個 /api/chat 請求的總時間預算（秒），逾時的階段會被取消並改用降級回答
+        self.TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "60"))
+        # 各階段留給後續階段的時間（秒），且不超過總預算的對應比例，短預算時依比例縮小
+        # 推理階段留給最終回答、工具與摘要
+        self.ANSWER_RESERVE = float(os.getenv("REQUEST_ANSWER_RESERVE", "30"))
+        self.ANSWER_RESERVE_RATIO = float(os.getenv("REQUEST_ANSWER_RESERVE_RATIO", "0.5"))
+        # 最終回答階段留給工具與摘要
+        self.TOOLS_RESERVE = float(os.getenv("REQUEST_TOOLS_RESERVE", "20"))
+        self.TOOLS_RESERVE_RATIO = float(os.getenv("REQUEST_TOOLS_RESERVE_RATIO", "0.35"))
+        # 工具階段留給摘要
+        self.SUMMARY_RESERVE = float(os.getenv("REQUEST_SUMMARY_RESERVE", "10"))
+        self.SUMMARY_RESERVE_RATIO = float(os.getenv("REQUEST_SUMMARY_RESERVE_RATIO", "0.2"))
+        # 合併同時進行的相同問題：只執行一次流程，片段轉送給所有請求
+        self.COALESCE = os.getenv("REQUEST_COALESCE", "true").lower() == "true"
+
+class AdmissionConfig:
+    def __init__(self):
+        # /api/chat 的入場控制：同時執行的流程數、排隊上限與等待時間
+        self.MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "8"))
+        self.MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "32"))  # 佇列滿了以 503 拒絕
+        self.MAX_PER_SESSION = int(os.getenv("CHAT_MAX_PER_SESSION", "2"))  # 超過以 429 拒絕
+        self.QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "30"))  # 秒
+        self.QUEUE_UPDATE_INTERVAL = float(os.getenv("CHAT_QUEUE_UPDATE_INTERVAL", "2"))  # 秒，檢查排隊位置的間隔
+        self.DEFAULT_RETRY_AFTER = int(os.getenv("CHAT_DEFAULT_RETRY_AFTER", "5"))  # 秒，尚無耗時資料時使用
+
+class BrowserConfig:
+    def __init__(self):
+        # 常駐 Playwright 瀏覽器池設定
+        self.POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))  # 常駐的 Firefox 數量
+        self.MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))  # 同時開啟的頁面上限
+        self.CONTEXT_MAX_USES = int(os.getenv("BROWSER_CONTEXT_MAX_USES", "50"))  # context 使用幾次後換新
+        # 等待分頁的請求上限與等待時間，超過時瀏覽器搜尋直接放棄，不讓請求在瀏覽器前無限堆積
+        self.MAX_WAITING = int(os.getenv("BROWSER_MAX_WAITING", "8"))
+        self.PAGE_WAIT_TIMEOUT = float(os.getenv("BROWSER_PAGE_WAIT_TIMEOUT", "10"))  # 秒
+        self.USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:115.0) Gecko/20100101 Firefox/115.0"
+
+class SearchConfig:
+    def __init__(self):
+        # 搜尋後端："auto" 先用 HTTP，無結果或被阻擋時改用瀏覽器；"http" 或 "browser" 則只用其一
+        self.BACKEND = os.getenv("SEARCH_BACKEND", "auto").lower()
+        # 精簡載入模式：封鎖非必要資源、只等待搜尋結果元素出現
+        self.FAST_MODE = os.getenv("SEARCH_FAST_MODE", "true").lower() == "true"
+        self.BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "other"}
+        self.RESULT_SELECTOR = "li.b_algo"
+        self.RESULT_TIMEOUT = int(os.getenv("SEARCH_RESULT_TIMEOUT", "5000"))  # 毫秒
+        # 搜尋結果快取：記憶體 LRU，另可設定 sqlite 路徑啟用磁碟快取
+        self.CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "600"))  # 秒
+        self.CACHE_MAX_SIZE = int(os.getenv("SEARCH_CACHE_MAX_SIZE", "1024"))
+        self.CACHE_DB_PATH = os.getenv("SEARCH_CACHE_DB_PATH")  # 例如 "cache/search.sqlite3"，未設定則不啟用
+        self.CACHE_DISK_TTL = float(os.getenv("SEARCH_CACHE_DISK_TTL", "86400"))  # 秒
+        # 抓取前 N 筆搜尋結果的網頁內容，供摘要使用
+        self.ENRICH_ENABLED = os.getenv("SEARCH_ENRICH_ENABLED", "false").lower() == "true"
+        self.ENRICH_TOP_N = int(os.getenv("SEARCH_ENRICH_TOP_N", "3"))
+        self.ENRICH_CONCURRENCY = int(os.getenv("SEARCH_ENRICH_CONCURRENCY", "3"))
+        self.ENRICH_PAGE_TIMEOUT = float(os.getenv("SEARCH_ENRICH_PAGE_TIMEOUT", "3"))  # 秒，單頁
+        self.ENRICH_DEADLINE = float(os.getenv("SEARCH_ENRICH_DEADLINE", "4"))  # 秒，整體
+        self.ENRICH_TOKEN_BUDGET = int(os.getenv("SEARCH_ENRICH_TOKEN_BUDGET", "800"))  # 每頁 token 上限
+        # 推測式預先搜尋：推理進行時先以使用者問題搜尋，模型查詢夠相似（0–100）時直接使用結果
+        self.PREFETCH_ENABLED = os.getenv("SEARCH_PREFETCH_ENABLED", "false").lower() == "true"
+        self.PREFETCH_MIN_SIMILARITY = float(os.getenv("SEARCH_PREFETCH_MIN_SIMILARITY", "70"))
+
+class HttpConfig:
+    def __init__(self):
+        # 共用 httpx.AsyncClient 的連線池設定
+        self.USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:115.0) Gecko/20100101 Firefox/115.0"
+        self.ACCEPT_LANGUAGE = "zh-TW,zh;q=0.9,en;q=0.8"
+        self.TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # 秒
+        self.MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+        self.MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+class CrawlerConfig:
+    def __init__(self):
+        # 站內爬蟲：範圍、並行度與禮貌性延遲
+        self.MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "300"))
+        self.MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "3"))
+        self.CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))  # 同時抓取的頁面數
+        self.PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "4"))
+        self.POLITENESS_DELAY = float(os.getenv("CRAWL_POLITENESS_DELAY", "0.25"))  # 秒，同一主機兩次請求的最小間隔
+        self.PAGE_TIMEOUT = float(os.getenv("CRAWL_PAGE_TIMEOUT", "10"))  # 秒
+        self.RESPECT_ROBOTS = os.getenv("CRAWL_RESPECT_ROBOTS", "true").lower() == "true"
+        self.SCRAPE_CONCURRENCY = int(os.getenv("CRAWL_SCRAPE_CONCURRENCY", "4"))  # 同時執行的 SmartScraperGraph 數
+        # 副檔名為以下類型的連結不抓取
+        self.SKIP_EXTENSIONS = {
+            ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".zip", ".rar", ".7z",
+            ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".mp3", ".mp4", ".avi", ".css", ".js",
+        }
+
+class ToolConfig:
+    def __init__(self):
+        # 模型呼叫工具時，各工具的執行時間上限（秒），從排隊開始計算
+        self.DEFAULT_TIMEOUT = float(os.getenv("TOOL_DEFAULT_TIMEOUT", "30"))
+        self.SEARCH_TIMEOUT = float(os.getenv("TOOL_SEARCH_TIMEOUT", "20"))
+        self.KNOWLEDGE_TIMEOUT = float(os.getenv("TOOL_KNOWLEDGE_TIMEOUT", "10"))
+        self.SCRAPE_TIMEOUT = float(os.getenv("TOOL_SCRAPE_TIMEOUT", "130"))  # 應大於 SCRAPER_JOB_TIMEOUT
+        # 各工具同時執行的上限，超過時排隊
+        self.SEARCH_MAX_CONCURRENCY = int(os.getenv("TOOL_SEARCH_MAX_CONCURRENCY", "4"))
+        self.SCRAPE_MAX_CONCURRENCY = int(os.getenv("TOOL_SCRAPE_MAX_CONCURRENCY", "2"))
+
+class PromptConfig:
+    def __init__(self):
+        # 摘要 prompt 的 token 預算（整體與各區塊）
+        self.SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "3000"))
+        self.RESULTS_BUDGET = int(os.getenv("SUMMARY_RESULTS_BUDGET", "2000"))
+        self.REASONING_BUDGET = int(os.getenv("SUMMARY_REASONING_BUDGET", "800"))
+        self.TIME_BUDGET = 50
+
+class CompletionCacheConfig:
+    def __init__(self):
+        # 推理與摘要的模型回應快取
+        self.ENABLED = os.getenv("COMPLETION_CACHE_ENABLED", "true").lower() == "true"
+        self.TTL = float(os.getenv("COMPLETION_CACHE_TTL", "3600"))  # 秒
+        self.MAX_SIZE = int(os.getenv("COMPLETION_CACHE_MAX_SIZE", "1024"))
+        # 語意層：以 embedding 相似度比對相近的問題
+        self.SEMANTIC_ENABLED = os.getenv("COMPLETION_CACHE_SEMANTIC", "false").lower() == "true"
+        self.SEMANTIC_THRESHOLD = float(os.getenv("COMPLETION_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+        self.SEMANTIC_MAX_SIZE = int(os.getenv("COMPLETION_CACHE_SEMANTIC_MAX_SIZE", "512"))
 
 class ScraperModelConfig:
     def __init__(self):
@@ -36,6 +183,35 @@ class ScraperEmbeddingConfig:
         self.AZURE_EMBEDDING_DEPLOYMENT = "text-embedding-3-large"
         self.AZURE_ENDPOINT_EMBEDDINGS = os.getenv("AZURE_ENDPOINT_EMBEDDINGS")
         self.AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+        # "azure" 使用上方的部署；"hashing" 使用本地可重現的 embedder（測試、離線開發用）
+        self.EMBEDDER = os.getenv("EMBEDDER", "azure").lower()
+
+class KnowledgeConfig:
+    def __init__(self):
+        # 常見問答 / 爬取內容的向量索引
+        self.INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", "cache/knowledge")
+        self.TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+        self.MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", "0.3"))
+
+class ScraperPoolConfig:
+    def __init__(self):
+        # SmartScraperGraph 的常駐 process pool
+        self.WORKERS = int(os.getenv("SCRAPER_WORKERS", str(os.cpu_count() or 2)))
+        self.JOB_TIMEOUT = float(os.getenv("SCRAPER_JOB_TIMEOUT", "120"))  # 秒，單一爬取工作
+        self.PREWARM = os.getenv("SCRAPER_PREWARM", "false").lower() == "true"  # 服務啟動時即預熱 worker
+        # 模型可爬取的網域（含子網域），以逗號分隔；避免模型要求存取內部網址
+        self.ALLOWED_DOMAINS = [
+            d.strip().lower() for d in os.getenv("SCRAPER_ALLOWED_DOMAINS", "ncku.edu.tw").split(",") if d.strip()
+        ]
+
+class ScrapeCacheConfig:
+    def __init__(self):
+        # 網頁擷取結果快取：以網址 + 擷取提示為鍵，內容未變時不重新擷取
+        self.ENABLED = os.getenv("SCRAPE_CACHE_ENABLED", "true").lower() == "true"
+        self.DB_PATH = os.getenv("SCRAPE_CACHE_DB_PATH", "cache/scrape.sqlite3")
+        self.TTL = float(os.getenv("SCRAPE_CACHE_TTL", str(30 * 86400)))  # 秒，超過後即使內容未變也重新擷取
+        self.MAX_SIZE = int(os.getenv("SCRAPE_CACHE_MAX_SIZE", "20000"))
+        self.FETCH_TIMEOUT = float(os.getenv("SCRAPE_CACHE_FETCH_TIMEOUT", "10"))  # 秒，條件式請求
 
 class ScraperConfig:
     def __init__(self):
@@ -0,0 +1,301 @@
+import time
+import asyncio
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+from src.clients.http_client import get_http_client
+from src.config import CrawlerConfig
+from src.functions.page_fetcher import extract_main_text
+
+config = CrawlerConfig()
+
+# 不影響頁面內容的追蹤參數，正規化時移除
+TRACKING_PARAMS = {"fbclid", "gclid"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    正規化 URL 作為去重的鍵：
+    scheme 與主機轉小寫、移除預設 port、片段（#...）與追蹤參數，查詢參數排序，空路徑補為 "/"。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class _LinkExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self.base = None
+        self.title_parts = []
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and attrs.get("href"):
+            if "nofollow" not in (attrs.get("rel") or "").lower():
+                self.links.append(attrs["href"])
+        elif tag == "base" and attrs.get("href") and self.base is None:
+            self.base = attrs["href"]
+        elif tag == "title":
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+
+
+def parse_page(url: str, html: str):
+    """
+    解析 HTML，回傳 (標題, 頁面中所有 http/https 連結的正規化 URL)。
+    """
+    parser = _LinkExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        logging.debug("解析 HTML 時發生錯誤 %s: %s", url, e)
+    base = urljoin(url, parser.base) if parser.base else url
+    links = []
+    for href in parser.links:
+        href = href.strip()
+        if href.lower().startswith(("mailto:", "javascript:", "tel:", "#")):
+            continue
+        absolute = urljoin(base, href)
+        if urlsplit(absolute).scheme in ("http", "https"):
+            links.append(normalize_url(absolute))
+    title = " ".join("".join(parser.title_parts).split())
+    return title, links
+
+
+class Crawler:
+    """
+    站內並行爬蟲：
+      - 以佇列作為待抓取的 URL frontier，正規化後的 URL 只會排入一次；
+      - 只跟隨 allowed_hosts 內的連結，並限制深度（max_depth）與頁數（max_pages）；
+      - 全域以 concurrency 個 worker 並行抓取，每個主機另有並行上限與兩次請求間的最小間隔；
+      - 可選擇遵守 robots.txt；
+      - crawl() 是 async generator，每抓完一頁就立即產出結果，不必等整站爬完。
+    """
+
+    def __init__(
+        self,
+        start_url: str,
+        max_pages: int = None,
+        max_depth: int = None,
+        concurrency: int = None,
+        per_host_concurrency: int = None,
+        politeness_delay: float = None,
+        page_timeout: float = None,
+        allowed_hosts: set = None,
+        respect_robots: bool = None,
+        client=None,
+    ):
+        self.start_url = normalize_url(start_url)
+        self.max_pages = config.MAX_PAGES if max_pages is None else max_pages
+        self.max_depth = config.MAX_DEPTH if max_depth is None else max_depth
+        self.concurrency = config.CONCURRENCY if concurrency is None else concurrency
+        self.per_host_concurrency = (
+            config.PER_HOST_CONCURRENCY if per_host_concurrency is None else per_host_concurrency
+        )
+        self.politeness_delay = config.POLITENESS_DELAY if politeness_delay is None else politeness_delay
+        self.page_timeout = config.PAGE_TIMEOUT if page_timeout is None else page_timeout
+        self.allowed_hosts = allowed_hosts or {urlsplit(self.start_url).netloc}
+        self.respect_robots = config.RESPECT_ROBOTS if respect_robots is None else respect_robots
+        self.client = client
+        self.seen = set()
+        self._hosts = {}  # 主機 -> {"semaphore", "lock", "next_at", "robots_lock"}
+        self._robots = {}  # 主機 -> RobotFileParser 或 None（不限制）
+        self.stats = {"fetched": 0, "failed": 0, "skipped": 0, "duplicates": 0, "elapsed": 0.0}
+
+    def in_scope(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.netloc not in self.allowed_hosts:
+            return False
+        path = parts.path.lower()
+        return not any(path.endswith(ext) for ext in config.SKIP_EXTENSIONS)
+
+    def _host(self, host: str) -> dict:
+        if host not in self._hosts:
+            self._hosts[host] = {
+                "semaphore": asyncio.Semaphore(self.per_host_concurrency),
+                "lock": asyncio.Lock(),
+                "next_at": 0.0,
+                "robots_lock": asyncio.Lock(),
+            }
+        return self._hosts[host]
+
+    async def _wait_turn(self, state: dict):
+        # 同一主機兩次請求的開始時間至少相隔 politeness_delay
+        async with state["lock"]:
+            now = time.monotonic()
+            wait = state["next_at"] - now
+            state["next_at"] = max(now, state["next_at"]) + self.politeness_delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _allowed_by_robots(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        async with self._host(parts.netloc)["robots_lock"]:
+            if parts.netloc not in self._robots:
+                self._robots[parts.netloc] = await self._load_robots(parts)
+        parser = self._robots[parts.netloc]
+        user_agent = self._client().headers.get("User-Agent", "*")
+        return parser is None or parser.can_fetch(user_agent, url)
+
+    async def _load_robots(self, parts):
+        parser = None
+        try:
+            response = await self._client().get(
+                urlunsplit((parts.scheme, parts.netloc, "/robots.txt", "", "")), timeout=self.page_timeout
+            )
+            if response.status_code == 200:
+                parser = RobotFileParser()
+                parser.parse(response.text.splitlines())
+        except Exception as e:
+            logging.debug("讀取 robots.txt 失敗 %s: %s", parts.netloc, e)
+        return parser
+
+    def _client(self):
+        return self.client or get_http_client()
+
+    async def fetch(self, url: str):
+        """
+        在主機的並行上限與禮貌性延遲下抓取一頁，回傳 (最終 URL, HTML)；非 HTML 回傳 (最終 URL, None)。
+        """
+        state = self._host(urlsplit(url).netloc)
+        async with state["semaphore"]:
+            await self._wait_turn(state)
+            response = await self._client().get(url, timeout=self.page_timeout)
+        response.raise_for_status()
+        final_url = normalize_url(str(response.url))
+        if "html" not in response.headers.get("content-type", "html"):
+            return final_url, None
+        return final_url, response.text
+
+    def _enqueue(self, frontier: asyncio.Queue, url: str, depth: int) -> bool:
+        if url in self.seen:
+            self.stats["duplicates"] += 1
+            return False
+        if len(self.seen) >= self.max_pages or depth > self.max_depth or not self.in_scope(url):
+            return False
+        self.seen.add(url)
+        frontier.put_nowait((url, depth))
+        return True
+
+    async def _process(self, frontier: asyncio.Queue, url: str, depth: int):
+        if not await self._allowed_by_robots(url):
+            self.stats["skipped"] += 1
+            return None
+        try:
+            final_url, html = await self.fetch(url)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logging.info("抓取失敗 %s: %s", url, e)
+            return None
+        if html is None:
+            self.stats["skipped"] += 1
+            return None
+        # 轉址後的網址也記為已見過，避免同一頁被不同網址重複抓取
+        if final_url != url:
+            if final_url in self.seen or not self.in_scope(final_url):
+                self.stats["duplicates"] += 1
+                return None
+            self.seen.add(final_url)
+        # HTML 解析屬 CPU 工作，交給執行緒以免阻塞事件迴圈
+        title, links = await asyncio.to_thread(parse_page, final_url, html)
+        content = await asyncio.to_thread(extract_main_text, html)
+        for link in links:
+            self._enqueue(frontier, link, depth + 1)
+        self.stats["fetched"] += 1
+        return {"url": final_url, "depth": depth, "title": title, "content": content, "links": len(links)}
+
+    async def crawl(self):
+        """
+        從 start_url 開始爬取，每完成一頁即產出 {"url", "depth", "title", "content", "links"}。
+        中途停止迭代（例如 break）時會取消所有 worker。
+        """
+        start = time.perf_counter()
+        frontier = asyncio.Queue()
+        results = asyncio.Queue()
+        done = object()
+        self._enqueue(frontier, self.start_url, 0)
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    page = await self._process(frontier, url, depth)
+                    if page is not None:
+                        results.put_nowait(page)
+                except Exception as e:
+                    logging.warning("處理頁面時發生錯誤 %s: %s", url, e)
+                finally:
+                    frontier.task_done()
+
+        async def monitor():
+            # frontier 清空且所有 worker 都處理完畢，代表不會再有新的 URL
+            await frontier.join()
+            results.put_nowait(done)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        watcher = asyncio.create_task(monitor())
+        try:
+            while True:
+                page = await results.get()
+                if page is done:
+                    break
+                yield page
+        finally:
+            for task in workers + [watcher]:
+                task.cancel()
+            await asyncio.gather(*workers, watcher, return_exceptions=True)
+            self.stats["elapsed"] = round(time.perf_counter() - start, 3)
+            logging.info("爬取完成 %s: %s", self.start_url, self.stats)
+
+
+async def crawl_site(start_url: str, **kwargs) -> list:
+    """
+    爬取整個網站並回傳所有頁面的列表（不需要串流結果時使用）。
+    """
+    return [page async for page in Crawler(start_url, **kwargs).crawl()]
+
+
+if __name__ == "__main__":
+    # 爬取網站並存成 JSON，可交給 knowledge_base 建立索引：
+    # python -m src.functions.crawler https://oia.ncku.edu.tw/ cache/oia_pages.json
+    import sys
+    import json
+    from src.clients.http_client import close_http_client
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def _main():
+        pages = []
+        try:
+            async for page in Crawler(sys.argv[1]).crawl():
+                print(f"[{len(pages) + 1}] depth={page['depth']} {page['url']} {page['title']}")
+                pages.append(page)
+        finally:
+            await close_http_client()
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], "w", encoding="utf-8") as f:
+                json.dump(pages, f, ensure_ascii=False, indent=2)
+
+    asyncio.run(_main())
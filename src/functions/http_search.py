@@ -0,0 +1,91 @@
+import logging
+import urllib.parse
+from datetime import datetime
+from html.parser import HTMLParser
+from src.clients.http_client import get_http_client
+
+# 出現這些字樣時視為被搜尋引擎阻擋（驗證碼、機器人檢查）
+BLOCKED_MARKERS = ("captcha", "/challenge", "unusual traffic")
+
+
+class SearchBlockedError(Exception):
+    """
+    搜尋引擎回傳阻擋頁面（例如 429 或驗證碼），需改用瀏覽器搜尋。
+    """
+
+
+class _BingResultParser(HTMLParser):
+    """
+    解析 Bing 搜尋結果頁，擷取 <li class="b_algo"> 中 <h2><a> 的標題與連結。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.li_depth = 0  # 位於 b_algo 內時，記錄 li 的巢狀深度
+        self.in_h2 = False
+        self.current = None
+        self.results = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "li":
+            if self.li_depth:
+                self.li_depth += 1
+            elif "b_algo" in (attrs.get("class") or "").split():
+                self.li_depth = 1
+        elif self.li_depth and tag == "h2":
+            self.in_h2 = True
+        elif self.in_h2 and tag == "a" and self.current is None:
+            self.current = {"title": "", "link": attrs.get("href")}
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self.current is not None:
+            self.results.append(self.current)
+            self.current = None
+        elif tag == "h2":
+            self.in_h2 = False
+        elif tag == "li" and self.li_depth:
+            self.li_depth -= 1
+
+    def handle_data(self, data):
+        if self.current is not None:
+            self.current["title"] += data
+
+
+def parse_bing_results(html: str) -> list:
+    """
+    從 Bing 結果頁 HTML 中解析出 [{"title", "link", "timestamp"}, ...]。
+    """
+    parser = _BingResultParser()
+    parser.feed(html)
+    parser.close()
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    results = []
+    for item in parser.results:
+        title = " ".join(item["title"].split())
+        if title and item["link"]:
+            results.append({"title": title, "link": item["link"], "timestamp": timestamp})
+    return results
+
+
+async def search_web_with_http(query: str, source_url: str = None) -> list:
+    """
+    不啟動瀏覽器，直接以共用的 httpx 連線池抓取 Bing 結果頁並解析。
+    被阻擋時拋出 SearchBlockedError，由呼叫端改用 Playwright。
+    """
+    if source_url is None:
+        encoded_query = urllib.parse.quote_plus(str(query))
+        source_url = f"https://www.bing.com/search?q={encoded_query}"
+
+    client = get_http_client()
+    response = await client.get(source_url)
+    if response.status_code in (403, 429, 503):
+        raise SearchBlockedError(f"HTTP {response.status_code}")
+    response.raise_for_status()
+
+    html = response.text
+    results = parse_bing_results(html)
+    if not results and any(marker in html.lower() for marker in BLOCKED_MARKERS):
+        raise SearchBlockedError("偵測到驗證頁面")
+    logging.debug("HTTP 搜尋取得 %s 筆結果", len(results))
+    return results
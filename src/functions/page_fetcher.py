@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from html.parser import HTMLParser
+from src.clients.http_client import get_http_client
+from src.config import SearchConfig
+from src.utils.token_count import truncate_to_tokens
+
+config = SearchConfig()
+
+# 不含正文的標籤，其中的文字一律略過
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"}
+# 區塊層級標籤，結束時換行，讓段落不會黏在一起
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+# 若頁面有這些標籤，優先只取其中的文字
+MAIN_TAGS = {"article", "main"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.all_parts = []
+        self.main_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in MAIN_TAGS:
+            self.main_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in MAIN_TAGS:
+            self.main_depth = max(0, self.main_depth - 1)
+        if tag in BLOCK_TAGS:
+            self.all_parts.append("\n")
+            if self.main_depth:
+                self.main_parts.append("\n")
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        self.all_parts.append(data)
+        if self.main_depth:
+            self.main_parts.append(data)
+
+
+def extract_main_text(html: str) -> str:
+    """
+    從 HTML 中擷取可讀的正文文字：
+    略過 script、導覽列、頁首頁尾等區塊；有 <article>/<main> 時只取其內容。
+    """
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        logging.debug("解析 HTML 時發生錯誤: %s", e)
+    parts = parser.main_parts if "".join(parser.main_parts).strip() else parser.all_parts
+    lines = (" ".join(line.split()) for line in "".join(parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+async def fetch_page_text(url: str, timeout: float = None, token_budget: int = None) -> str:
+    """
+    抓取單一網頁並回傳截斷至 token 預算內的正文。
+    """
+    timeout = config.ENRICH_PAGE_TIMEOUT if timeout is None else timeout
+    token_budget = config.ENRICH_TOKEN_BUDGET if token_budget is None else token_budget
+    client = get_http_client()
+    response = await client.get(url, timeout=timeout)
+    response.raise_for_status()
+    if "html" not in response.headers.get("content-type", "html"):
+        return ""
+    return truncate_to_tokens(extract_main_text(response.text), token_budget)
+
+
+async def enrich_results(
+    results: list,
+    top_n: int = None,
+    concurrency: int = None,
+    deadline: float = None,
+    page_timeout: float = None,
+    token_budget: int = None,
+) -> list:
+    """
+    並行抓取前 top_n 筆搜尋結果的網頁正文，寫入各結果的 "content" 欄位。
+      - 以 semaphore 限制同時抓取的頁面數；
+      - 每頁有個別的 timeout；
+      - 超過整體 deadline 仍未完成的頁面直接取消，只回傳已抓到的內容。
+    回傳新的結果列表，不修改傳入的 results（避免污染搜尋快取）。
+    """
+    top_n = config.ENRICH_TOP_N if top_n is None else top_n
+    concurrency = config.ENRICH_CONCURRENCY if concurrency is None else concurrency
+    deadline = config.ENRICH_DEADLINE if deadline is None else deadline
+
+    enriched = [dict(item) for item in results]
+    targets = [item for item in enriched[:top_n] if item.get("link")]
+    if not targets:
+        return enriched
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(item):
+        async with semaphore:
+            try:
+                item["content"] = await fetch_page_text(item["link"], page_timeout, token_budget)
+            except Exception as e:
+                logging.debug("抓取網頁失敗 %s: %s", item["link"], e)
+
+    tasks = [asyncio.create_task(fetch(item)) for item in targets]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logging.info("網頁抓取逾時，略過 %s/%s 頁", len(pending), len(tasks))
+    return enriched
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import logging
+from src.clients.http_client import get_http_client
+from src.config import ScrapeCacheConfig
+from src.functions.crawler import normalize_url
+from src.functions.page_fetcher import extract_main_text
+from src.utils.ttl_cache import SqliteCache
+
+config = ScrapeCacheConfig()
+
+
+def content_hash(text: str) -> str:
+    """
+    以正文文字（extract_main_text 的結果）計算內容雜湊；
+    只有版面、script 或隨機 token 變動時雜湊不變，不必重新擷取。
+    """
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def result_key(url: str, prompt: str) -> str:
+    digest = hashlib.sha256(f"{normalize_url(url)}\n{prompt.strip()}".encode("utf-8")).hexdigest()
+    return f"result:{digest}"
+
+
+def page_key(url: str) -> str:
+    return f"page:{normalize_url(url)}"
+
+
+class ScrapeCache:
+    """
+    SmartScraperGraph 擷取結果的快取：
+      - 每個網址記錄 ETag / Last-Modified 與正文雜湊（page 項目）；
+      - 每組網址 + 擷取提示記錄擷取結果與當時的正文雜湊（result 項目）；
+      - 再次擷取時先送條件式請求，304 或正文雜湊不變就直接回傳快取結果，不呼叫模型；
+      - 已有網頁正文（例如爬蟲剛抓到）時直接計算雜湊，不再重抓。
+    """
+
+    def __init__(self, store, client=None, fetch_timeout: float = 10):
+        self.store = store
+        self.client = client
+        self.fetch_timeout = fetch_timeout
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,  # 伺服器回應 304 的次數
+            "stale": 0,  # 網頁抓取失敗，改用舊結果的次數
+            "bytes_not_downloaded": 0,  # 因 304 而未重新下載的網頁大小
+            "bytes_not_extracted": 0,  # 因命中快取而未送交模型擷取的網頁大小
+        }
+
+    def _client(self):
+        return self.client or get_http_client()
+
+    async def _check_page(self, url: str, text: str = None) -> dict:
+        """
+        取得網頁目前的正文雜湊，回傳更新後的 page 項目 {"etag", "last_modified", "hash", "size"}。
+        """
+        key = page_key(url)
+        page = self.store.get(key) or {}
+        if text is None:
+            headers = {}
+            if page.get("etag"):
+                headers["If-None-Match"] = page["etag"]
+            if page.get("last_modified"):
+                headers["If-Modified-Since"] = page["last_modified"]
+            response = await self._client().get(url, headers=headers, timeout=self.fetch_timeout)
+            if response.status_code == 304 and page.get("hash"):
+                self.counters["not_modified"] += 1
+                self.counters["bytes_not_downloaded"] += page.get("size", 0)
+                return page
+            response.raise_for_status()
+            page = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "size": len(response.content),
+            }
+            # 正文擷取屬 CPU 工作，交給執行緒以免阻塞事件迴圈
+            text = await asyncio.to_thread(extract_main_text, response.text)
+        else:
+            page = {
+                "etag": page.get("etag"),
+                "last_modified": page.get("last_modified"),
+                "size": len(text.encode("utf-8")),
+            }
+        page["hash"] = content_hash(text)
+        self.store.set(key, page)
+        return page
+
+    async def scrape(self, url: str, prompt: str, extract, text: str = None):
+        """
+        回傳 url 以 prompt 擷取的結果；內容未變時使用快取，否則呼叫 extract(prompt, url) 並寫入快取。
+        text 為已取得的網頁正文時，不再發送請求。
+        """
+        key = result_key(url, prompt)
+        cached = self.store.get(key)
+        try:
+            page = await self._check_page(url, text)
+        except Exception as e:
+            if cached is not None:
+                self.counters["stale"] += 1
+                logging.info("網頁抓取失敗，使用先前的擷取結果 %s: %s", url, e)
+                return cached["result"]
+            logging.debug("網頁抓取失敗，直接擷取 %s: %s", url, e)
+            page = None
+
+        if cached is not None and page is not None and cached["hash"] == page["hash"]:
+            self.counters["hits"] += 1
+            self.counters["bytes_not_extracted"] += page.get("size", 0)
+            return cached["result"]
+
+        self.counters["misses"] += 1
+        result = await extract(prompt, url)
+        if page is not None:
+            self.store.set(key, {"hash": page["hash"], "result": result})
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            "size": len(self.store),
+        }
+
+
+_scrape_cache = None
+
+
+def get_scrape_cache():
+    """
+    取得行程內共用的擷取結果快取；SCRAPE_CACHE_ENABLED=false 時回傳 None。
+    """
+    global _scrape_cache
+    if _scrape_cache is None and config.ENABLED:
+        store = SqliteCache(config.DB_PATH, max_size=config.MAX_SIZE, ttl=config.TTL)
+        _scrape_cache = ScrapeCache(store, fetch_timeout=config.FETCH_TIMEOUT)
+    return _scrape_cache
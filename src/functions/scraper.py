@@ -1,8 +1,17 @@
+import asyncio
+import logging
 from scrapegraphai.graphs import SmartScraperGraph
 from scrapegraphai.utils import prettify_exec_info
+from src.clients.http_client import close_http_client
+from src.clients.scraper_pool import scraper_pool
+from src.config import CrawlerConfig
+from src.functions.crawler import Crawler
+from src.functions.scrape_cache import get_scrape_cache
 
+config = CrawlerConfig()
 
-def run_scraper(prompt: str, source: str, scraper_config: dict) -> str:
+
+def run_scraper(prompt: str, source: str, scraper_config: dict, verbose: bool = True) -> str:
     """
     使用 SmartScraperGraph 執行單頁爬取，返回爬取結果。
 
@@ -10,6 +19,7 @@ def run_scraper(prompt: str, source: str, scraper_config: dict) -> str:
         - prompt: 爬蟲提示，例如 "List me all the FAQ with their answers"
         - source: 目標 URL，例如成功大學國際處的某個網頁
         - scraper_config: 用於初始化爬蟲工具的配置字典（通常來自你的 config 模組）
+        - verbose: 是否印出爬取結果與執行狀態（在 worker process 中執行時關閉）
     """
     # (可根據需要加入 warnings 設定)
     scraper = SmartScraperGraph(
@@ -18,6 +28,8 @@ def run_scraper(prompt: str, source: str, scraper_config: dict) -> str:
         config=scraper_config,
     )
     result = scraper.run()
+    if not verbose:
+        return result
     print("\n[SmartScraperGraph] Scraping 結果：")
     print(result)
     if hasattr(scraper, "execution_info"):
@@ -28,45 +40,82 @@ def run_scraper(prompt: str, source: str, scraper_config: dict) -> str:
     return result
 
 
-def extract_next_page(current_url: str, page_content: str) -> str:
+async def crawl_pages(
+    start_url: str, prompt: str, scraper_config: dict = None, concurrency: int = None, **crawl_options
+):
     """
-    根據目前頁面的內容提取下一頁的 URL。
-    此函數需要你根據目標網站的結構來實作。
-    如果找不到下一頁，則返回空字串或 None。
+    以 Crawler 在站內並行探索頁面，每發現一頁就交給 SmartScraperGraph 處理。
+    未提供 scraper_config 時交給 ScraperPool 的 worker process 執行（建議），否則在執行緒中使用給定的設定。
+    抽取與爬取同時進行，哪一頁先完成就先產出 {"url", "title", "depth", "result"}。
+    crawl_options 會傳給 Crawler（max_pages、max_depth、politeness_delay 等）。
     """
-    # 這裡僅作示例，實際需要解析 page_content (可能使用 BeautifulSoup)
-    # 假設我們能從 page_content 中提取一個 <a id="next" href="...">Next</a>
-    next_url = None  # 實作解析邏輯
-    return next_url
+    concurrency = config.SCRAPE_CONCURRENCY if concurrency is None else concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+
+    results = asyncio.Queue()
+    done = object()
+    tasks = set()
+
+    async def scrape(page):
+        async with semaphore:
+            try:
+                if scraper_config is None:
+                    cache = get_scrape_cache()
+                    if cache is None:
+                        result = await scraper_pool.scrape(prompt, page["url"])
+                    else:
+                        # 爬蟲已取得正文，直接比對雜湊；內容未變的頁面不再送交模型擷取
+                        result = await cache.scrape(page["url"], prompt, scraper_pool.scrape, text=page["content"])
+                else:
+                    # SmartScraperGraph 是同步且耗時的呼叫，放到執行緒中以免阻塞爬蟲
+                    result = await asyncio.to_thread(run_scraper, prompt, page["url"], scraper_config, False)
+            except Exception as e:
+                logging.warning("爬取頁面失敗 %s: %s", page["url"], e)
+                result = None
+        results.put_nowait({"url": page["url"], "title": page["title"], "depth": page["depth"], "result": result})
+
+    async def produce():
+        try:
+            async for page in Crawler(start_url, **crawl_options).crawl():
+                tasks.add(asyncio.create_task(scrape(page)))
+            await asyncio.gather(*tasks)
+        finally:
+            results.put_nowait(done)
 
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await results.get()
+            if item is done:
+                break
+            yield item
+        await producer  # 讓爬蟲本身的例外往外拋
+    finally:
+        for task in tasks | {producer}:
+            task.cancel()
 
-def crawl_all_pages(start_url: str, prompt: str, scraper_config: dict) -> list:
+
+def crawl_all_pages(start_url: str, prompt: str, scraper_config: dict = None, **crawl_options) -> list:
     """
-    從起始 URL 開始，循環爬取所有頁面並合併結果。
+    從起始 URL 開始，爬取站內所有頁面並回傳每頁的爬取結果列表。
     """
-    results = []
-    current_url = start_url
-    while current_url:
-        # 呼叫單頁爬蟲
-        result = run_scraper(prompt, current_url, scraper_config)
-        results.append(result)
-        # 根據結果解析下一頁 URL
-        next_url = extract_next_page(current_url, result)
-        if next_url and next_url != current_url:
-            current_url = next_url
-        else:
-            break
-    return results
+
+    async def collect():
+        try:
+            return [page["result"] async for page in crawl_pages(start_url, prompt, scraper_config, **crawl_options)]
+        finally:
+            await close_http_client()
+            await scraper_pool.stop()
+
+    return asyncio.run(collect())
 
 
 # 測試用（直接運行此模組測試）
 if __name__ == "__main__":
-    # 假設你有一個初始化 scraper_config 的方法，例如在 scraper_client.py 中
-    from src.clients.scraper_client import init_scraper_config
-    scraper_config = init_scraper_config()
+    # 每個 worker process 啟動時會自行呼叫 init_scraper_client 建立設定
     start_url = "https://oia.ncku.edu.tw/"
     prompt = "請從成功大學國際處網站（僅限此網站及其內部連結）中，搜尋與「獎學金申請截止日期」相關的 FAQ 內容。請深入查找所有相關頁面，並彙整出完整資訊，最終請以清晰的列表格式返回答案。"
-    all_results = crawl_all_pages(start_url, prompt, scraper_config)
+    all_results = crawl_all_pages(start_url, prompt)
     print("所有頁面的爬蟲結果：")
     for res in all_results:
         print(res)
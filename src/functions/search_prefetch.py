@@ -0,0 +1,136 @@
+import time
+import asyncio
+import logging
+from rapidfuzz import fuzz
+from src.config import SearchConfig
+from src.functions.web_search import normalize_query, search_website
+
+config = SearchConfig()
+
+
+def query_similarity(a: str, b: str) -> float:
+    """
+    兩個搜尋查詢的相似度（0–100），正規化後以 rapidfuzz 的 WRatio 計算，
+    讓「請問成大交換學生怎麼申請？」與模型改寫的「成大 交換學生 申請」視為相近。
+    """
+    return fuzz.WRatio(normalize_query(a), normalize_query(b))
+
+
+class Prefetch:
+    """
+    一次預先搜尋：查詢字串、來源網址與執行中的搜尋 task。
+    """
+
+    def __init__(self, query: str, source_url: str, task: asyncio.Task):
+        self.query = query
+        self.source_url = source_url
+        self.task = task
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.used = False
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task):
+        self.finished_at = time.perf_counter()
+        # 被取消或失敗的預先搜尋可能無人等待，取出例外以免被記錄為未處理
+        if not task.cancelled():
+            task.exception()
+
+    def head_start(self) -> float:
+        """
+        到目前為止預先搜尋已執行的秒數（已完成則為整個搜尋的耗時）。
+        """
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+
+class SearchPrefetcher:
+    """
+    推測式預先搜尋：推理還在進行時，先以使用者原始問題開始搜尋。
+      - start()：建立預先搜尋，與推理並行執行；
+      - take()：模型呼叫 search_website 時，查詢與同一請求的預先搜尋夠相似（且來源相同）就直接等待其結果；
+      - release()：流程結束時仍未被使用的預先搜尋會被取消，計為浪費。
+    節省時間以預先搜尋在被取用前已執行的秒數估算。
+    limiter 為佔用搜尋並行名額的 async context manager 工廠（例如 search_website 工具的 Tool.slot），
+    讓預先搜尋與模型呼叫的搜尋共用同一個上限。
+    """
+
+    def __init__(self, min_similarity: float = 70, search=search_website, limiter=None):
+        self.min_similarity = min_similarity
+        self.search = search
+        self.limiter = limiter
+        self._active = []
+        self.counters = {"started": 0, "used": 0, "wasted": 0, "mismatched": 0, "failed": 0}
+        self.time_saved = 0.0
+        self.time_wasted = 0.0  # 被浪費的預先搜尋已執行的秒數
+
+    async def _search(self, query: str, source_url: str = None):
+        if self.limiter is None:
+            return await self.search(query, source_url=source_url)
+        async with self.limiter():
+            return await self.search(query, source_url=source_url)
+
+    def start(self, query: str, source_url: str = None) -> Prefetch:
+        task = asyncio.create_task(self._search(query, source_url=source_url))
+        prefetch = Prefetch(query, source_url, task)
+        self._active.append(prefetch)
+        self.counters["started"] += 1
+        logging.debug("開始預先搜尋: %s", query)
+        return prefetch
+
+    async def take(self, prefetch: Prefetch, query: str, source_url: str = None):
+        """
+        取得呼叫端自己的預先搜尋（prefetch，由同一個請求的 start() 回傳）結果；
+        只與這一個預先搜尋比對，不會取用其他請求的結果。
+        prefetch 為 None、已被使用、來源不同、查詢不夠相似或搜尋失敗時回傳 None，由呼叫端自行搜尋。
+        """
+        if prefetch is None or prefetch.used or prefetch.task.cancelled():
+            return None
+        score = query_similarity(prefetch.query, query)
+        if prefetch.source_url != source_url or score < self.min_similarity:
+            self.counters["mismatched"] += 1
+            logging.info("預先搜尋與模型的查詢不相符（相似度 %.1f）: %s", score, query)
+            # 已確定用不到：立即取消，讓出搜尋的並行名額給呼叫端自己的搜尋
+            prefetch.task.cancel()
+            return None
+        prefetch.used = True
+        saved = prefetch.head_start()
+        try:
+            # shield：呼叫端逾時被取消時不連帶取消預先搜尋，由 release() 統一收尾
+            results = await asyncio.shield(prefetch.task)
+        except Exception as e:
+            self.counters["failed"] += 1
+            logging.warning("預先搜尋失敗，改為重新搜尋: %s", e)
+            return None
+        self.counters["used"] += 1
+        self.time_saved += saved
+        logging.info("使用預先搜尋結果（相似度 %.1f，節省約 %.2f 秒）: %s", score, saved, query)
+        return results
+
+    def release(self, prefetch: Prefetch):
+        """
+        流程結束時呼叫：未被使用的預先搜尋取消並計為浪費。
+        """
+        if prefetch in self._active:
+            self._active.remove(prefetch)
+        if prefetch.used:
+            return
+        self.counters["wasted"] += 1
+        self.time_wasted += prefetch.head_start()
+        if not prefetch.task.done():
+            prefetch.task.cancel()
+        logging.debug("取消未使用的預先搜尋: %s", prefetch.query)
+
+    def stats(self) -> dict:
+        started = self.counters["started"]
+        return {
+            "enabled": config.PREFETCH_ENABLED,
+            **self.counters,
+            "active": len(self._active),
+            "use_rate": round(self.counters["used"] / started, 3) if started else None,
+            "time_saved_seconds": round(self.time_saved, 3),
+            "time_wasted_seconds": round(self.time_wasted, 3),
+        }
+
+
+search_prefetcher = SearchPrefetcher(min_similarity=config.PREFETCH_MIN_SIMILARITY)
@@ -1,46 +1,106 @@
-from src.clients.model_client import init_model_client
+import json
+from src.clients.model_client import get_model_client
+from src.config import PromptConfig
+from src.utils.prompt_builder import PromptBuilder
+from src.utils.completion_cache import get_completion_cache
+
+config = PromptConfig()
 
 
 def get_raw_info(info: dict) -> str:
     """
-    將提供的資訊進行摘要整理，返回綜合答案。
+    將提供的資訊組成摘要用的 prompt 文字。
 
     參數：
         - info: 一個字典，包含需要整合的資訊。
-            例如：{"raw_search_results": [...], "chain_of_thought": [...]}
-        - context: 其他附加上下文，用來指導摘要的重點。
+            例如：{"raw_search_results": [...], "reasoning": [...]}
 
     回傳：
-        - 模型生成的綜合答案。
+        - 依 token 預算裁剪、去除重複內容後的文字。
     """
-    # 將所有資訊整合成一個長文本
-    raw_info = "查詢結果：\n"
+    # 依 token 預算組裝各區塊：時間 > 搜尋結果 > 思考過程
+    builder = PromptBuilder(max_tokens=config.SUMMARY_MAX_TOKENS)
+
+    # 時間推理結果
+    if "current_time" in info:
+        builder.add_section(
+            "time", "當前時間：", [info.get("current_time", "")], config.TIME_BUDGET, priority=3
+        )
 
     # 網路搜尋結果
     if "raw_search_results" in info:
+        lines = []
         for item in info.get("raw_search_results", []):
-            raw_info += f"- {item.get('title', '')} ({item.get('link', '')})\n"
-        raw_info += "\n思考過程：\n" + "\n".join(info.get("reasoning", [])) + "\n"
+            line = f"- {item.get('title', '')} ({item.get('link', '')})"
+            # 若有抓取到網頁正文（enrich_results），一併附上
+            if item.get("content"):
+                line += f"\n  內容：{item['content']}"
+            lines.append(line)
+        builder.add_section("results", "查詢結果：", lines, config.RESULTS_BUDGET, priority=2)
 
-    # 時間推理結果
-    if "current_time" in info:
-        raw_info += "當前時間：\n" + info.get("current_time", "") + "\n"
-        raw_info += "\n思考過程：\n" + "\n".join(info.get("reasoning", [])) + "\n"
+    # 知識庫（常見問答、爬取內容）檢索結果
+    if "knowledge_results" in info:
+        lines = []
+        for item in info.get("knowledge_results", []):
+            if item.get("type") == "faq":
+                lines.append(f"- 問：{item.get('question', '')}\n  答：{item.get('answer', '')}")
+            else:
+                lines.append(f"- {item.get('title', '')} ({item.get('url', '')})\n  內容：{item.get('content', '')}")
+        builder.add_section("knowledge", "知識庫資料：", lines, config.RESULTS_BUDGET, priority=2)
 
-    return raw_info
+    # 網頁擷取（scrape_website）結果
+    if "scraped_results" in info:
+        lines = []
+        for scraped in info.get("scraped_results", []):
+            if "error" in scraped:
+                lines.append(f"- {scraped.get('url', '')}：{scraped['error']}")
+                continue
+            result = scraped.get("result")
+            content = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+            lines.append(f"- {scraped.get('url', '')}\n  內容：{content}")
+        builder.add_section("scraped", "網頁擷取結果：", lines, config.RESULTS_BUDGET, priority=2)
 
+    # 逾時或失敗的工具，讓模型知道哪些資訊缺漏
+    if info.get("tool_errors"):
+        builder.add_section(
+            "errors", "未能取得的資訊：", [f"- {error}" for error in info["tool_errors"]], config.TIME_BUDGET * 4, priority=3
+        )
 
-def summarize_result(info: dict) -> str:
+    if any(
+        key in info for key in ("raw_search_results", "current_time", "knowledge_results", "scraped_results", "tool_errors")
+    ):
+        builder.add_section("reasoning", "思考過程：", info.get("reasoning", []), config.REASONING_BUDGET, priority=1)
+
+    return builder.build()
+
+
+def format_raw_info(info: dict) -> str:
     """
-    將提供的資訊進行摘要整理，返回綜合答案。
+    不經模型、直接把工具結果排成 markdown 列表；摘要來不及產生時作為降級回答。
+    """
+    lines = []
+    if info.get("current_time"):
+        lines.append(f"當前時間：{info['current_time']}")
+    for item in info.get("knowledge_results", []):
+        if item.get("type") == "faq":
+            lines.append(f"- **{item.get('question', '')}**：{item.get('answer', '')}")
+        else:
+            lines.append(f"- [{item.get('title') or item.get('url', '')}]({item.get('url', '')})")
+    for item in info.get("raw_search_results", []):
+        lines.append(f"- [{item.get('title', '')}]({item.get('link', '')})")
+    for scraped in info.get("scraped_results", []):
+        if "error" not in scraped:
+            result = scraped.get("result")
+            content = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+            lines.append(f"- {scraped.get('url', '')}：{content}")
+    if not lines:
+        return "抱歉，在回應時間內沒有取得可用的資料，請稍後再試。"
+    return "回應時間有限，以下是目前取得的相關資料：\n\n" + "\n".join(lines)
 
-    參數：
-        - info: 一個字典，包含需要整合的資訊。
-            例如：{"raw_search_results": [...], "chain_of_thought": [...]}
-        - context: 其他附加上下文，用來指導摘要的重點。
 
-    回傳：
-        - 模型生成的綜合答案。
+def build_summary_messages(info: dict) -> list:
+    """
+    根據 info 組出摘要用的 messages。
     """
     raw_info = get_raw_info(info)
 
@@ -55,20 +115,70 @@ def summarize_result(info: dict) -> str:
         "最終回答："
     )
 
-    client = init_model_client()
-    messages = [
+    return [
         {"role": "system", "content": "你是一個專業的資訊統整助手。"},
         {"role": "user", "content": prompt},
     ]
 
+
+async def summarize_result_stream(info: dict, cacheable: bool = True):
+    """
+    以串流方式生成摘要，逐段 yield 模型產生的文字片段（token delta）。
+
+    參數：
+        - info: 一個字典，包含需要整合的資訊。
+            例如：{"raw_search_results": [...], "reasoning": [...], "query": "..."}
+        - cacheable: 是否使用模型回應快取；時間相關的工具（如 get_current_time）應設為 False
+    """
+    client = get_model_client()
+    messages = build_summary_messages(info)
+    cache = get_completion_cache() if cacheable else None
+    query = info.get("query")
+
+    vector = None
+    if cache is not None:
+        cached, vector = await cache.lookup("summary", "gpt-4o", messages, 0.7, query=query)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
     try:
-        response = client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model="gpt-4o",
             messages=messages,
             temperature=0.7,
+            stream=True,
         )
-        answer = response.choices[0].message.content.strip()
-        return answer
+        async for chunk in stream:
+            # Azure 的第一個 chunk 可能只有 content filter 結果，沒有 choices
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
     except Exception as e:
-        return f"摘要生成出錯：{e}"
+        yield f"摘要生成出錯：{e}"
+        return
+
+    if cache is not None and parts:
+        await cache.set("summary", "gpt-4o", messages, 0.7, "".join(parts), query=query, vector=vector)
+
 
+async def summarize_result(info: dict, cacheable: bool = True) -> str:
+    """
+    將提供的資訊進行摘要整理，返回綜合答案。
+
+    參數：
+        - info: 一個字典，包含需要整合的資訊。
+            例如：{"raw_search_results": [...], "chain_of_thought": [...]}
+        - context: 其他附加上下文，用來指導摘要的重點。
+
+    回傳：
+        - 模型生成的綜合答案。
+    """
+    parts = []
+    async for delta in summarize_result_stream(info, cacheable=cacheable):
+        parts.append(delta)
+    return "".join(parts).strip()
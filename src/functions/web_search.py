@@ -1,64 +1,216 @@
+import time
+import logging
 import urllib.parse
 from datetime import datetime
 import asyncio
-from playwright.async_api import async_playwright
-
-# 非同步函式：使用 Firefox 進行網路搜尋
-async def search_web_with_firefox(query: str, source_url: str = None) -> list:
-    results = []  # 用來存放搜尋結果的列表
-    # 使用 async with 管理 async_playwright 的上下文，確保資源釋放
-    async with async_playwright() as p:
-        # 啟動 Firefox 瀏覽器，headless 模式下不顯示瀏覽器介面
-        browser = await p.firefox.launch(headless=True)
-        # 設定 Firefox 的 User-Agent
-        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:115.0) Gecko/20100101 Firefox/115.0"
-        # 建立一個新的分頁，並設定使用自訂的 User-Agent
-        page = await browser.new_page(user_agent=user_agent)
-        
-        # 若未提供來源 URL，則根據 query 生成 Bing 搜尋 URL
-        if source_url is None:
-            # 確保 query 為字串，並做 URL 編碼
-            if not isinstance(query, str):
-                query = str(query)
-            encoded_query = urllib.parse.quote_plus(query)
-            source_url = f"https://www.bing.com/search?q={encoded_query}"
-        
-        # 導航至指定的搜尋頁面，timeout 設定為 15000 毫秒
-        await page.goto(source_url, timeout=15000)
-        # 等待頁面加載完成，直到網路處於空閒狀態
-        await page.wait_for_load_state("networkidle")
-        
-        # 根據 Bing 搜尋結果的結構，選取結果元素（這裡假設結果位於 <li class="b_algo"> 中的 h2 a 元素）
-        result_elements = page.locator("li.b_algo h2 a")
-        # 取得搜尋結果元素的數量（非同步方法）
-        count = await result_elements.count()
-        print("找到搜尋結果元素數量：", count)
-        
-        # 逐一處理每個搜尋結果元素
-        for i in range(count):
-            try:
-                element = result_elements.nth(i)
-                # 取得元素內的文字內容作為標題，並去除首尾空白
-                title = (await element.inner_text()).strip()
-                # 取得元素的 href 屬性作為連結
-                link = await element.get_attribute("href")
-                if link and title:
-                    # 取得目前時間作為 timestamp
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    results.append({"title": title, "link": link, "timestamp": timestamp})
-            except Exception as e:
-                print("錯誤：", e)
-                continue
-
-        # 關閉瀏覽器
-        await browser.close()
+from src.clients.browser_pool import browser_pool, BrowserBusyError
+from src.config import SearchConfig
+from src.utils.ttl_cache import TTLCache, SqliteCache, TieredCache
+from src.utils.text_normalize import normalize_text
+from src.functions.http_search import search_web_with_http, SearchBlockedError
+
+config = SearchConfig()
+
+search_cache = TieredCache(
+    TTLCache(max_size=config.CACHE_MAX_SIZE, ttl=config.CACHE_TTL),
+    SqliteCache(config.CACHE_DB_PATH, ttl=config.CACHE_DISK_TTL) if config.CACHE_DB_PATH else None,
+)
+
+# 搜尋統計，用於觀察頁面載入時間
+search_stats = {"searches": 0, "load_ms_total": 0.0, "last_load_ms": None}
+# 各搜尋後端實際服務的次數；fallback 為 HTTP 失敗後改用瀏覽器的次數
+backend_stats = {"http": 0, "browser": 0, "fallback": 0, "http_blocked": 0, "http_errors": 0, "browser_busy": 0}
+
+# 在瀏覽器端一次取出所有結果的標題與連結，避免每個元素各自往返兩次
+EXTRACT_RESULTS_JS = """
+els => els.map(e => ({title: (e.innerText || "").trim(), link: e.getAttribute("href")}))
+"""
+
+
+async def _block_non_essential(route):
+    """
+    封鎖圖片、字型、樣式表等與擷取結果無關的資源，只放行文件與腳本。
+    """
+    if route.request.resource_type in config.BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def _record_load_time(load_ms: float):
+    search_stats["searches"] += 1
+    search_stats["load_ms_total"] += load_ms
+    search_stats["last_load_ms"] = load_ms
+    logging.info("搜尋頁面載入耗時: %.0f ms", load_ms)
+
+
+def normalize_query(query) -> str:
+    """
+    正規化查詢字串，讓只差在大小寫、全半形、標點或空白的問題共用同一筆快取。
+    """
+    return normalize_text(query)
+
+
+def _cache_key(query, source_url: str = None) -> str:
+    return f"{normalize_query(query)}|{source_url or ''}"
+
+
+async def search_website(query: str, source_url: str = None) -> list:
+    """
+    search_website 工具的入口：先查詢搜尋結果快取，未命中才依設定的後端搜尋。
+    空結果不寫入快取，避免暫時性的失敗被保留。
+    """
+    key = _cache_key(query, source_url)
+    cached = search_cache.get(key)
+    if cached is not None:
+        logging.debug("搜尋快取命中: %s", key)
+        return cached
+
+    results, backend = await _search_with_backend(query, source_url)
+    logging.info("搜尋由 %s 後端完成，結果 %s 筆: %s", backend, len(results), key)
+    if results:
+        search_cache.set(key, results)
+    return results
+
+
+async def _search_with_backend(query: str, source_url: str = None) -> tuple:
+    """
+    依 SearchConfig.BACKEND 選擇搜尋方式，回傳 (結果, 實際使用的後端名稱)。
+    auto 模式下先用輕量的 HTTP 解析，無結果或被阻擋才啟動瀏覽器。
+    """
+    if config.BACKEND in ("auto", "http"):
+        try:
+            results = await search_web_with_http(query, source_url=source_url)
+            if results or config.BACKEND == "http":
+                backend_stats["http"] += 1
+                return results, "http"
+            logging.info("HTTP 搜尋無結果，改用瀏覽器")
+        except SearchBlockedError as e:
+            backend_stats["http_blocked"] += 1
+            logging.info("HTTP 搜尋被阻擋（%s），改用瀏覽器", e)
+            if config.BACKEND == "http":
+                return [], "http"
+        except Exception as e:
+            backend_stats["http_errors"] += 1
+            logging.warning("HTTP 搜尋失敗: %s", e)
+            if config.BACKEND == "http":
+                return [], "http"
+        if config.BACKEND == "auto":
+            backend_stats["fallback"] += 1
+
+    backend_stats["browser"] += 1
+    try:
+        return await search_web_with_firefox(query, source_url=source_url), "browser"
+    except BrowserBusyError as e:
+        # 瀏覽器階段已滿載：回傳空結果讓摘要降級，而不是讓請求在瀏覽器前堆積
+        backend_stats["browser_busy"] += 1
+        logging.warning("瀏覽器忙碌，放棄本次搜尋: %s", e)
+        return [], "browser"
+
+
+def get_search_stats() -> dict:
+    """
+    回傳搜尋頁面載入時間、各後端使用次數、快取命中率與瀏覽器分頁的使用與排隊狀況等統計。
+    """
+    return {
+        **search_stats,
+        "backends": backend_stats,
+        "cache": search_cache.stats(),
+        "browser": {**browser_pool.stats, "waiting": browser_pool.waiting, "max_pages": browser_pool.max_pages},
+    }
+
+
+# 非同步函式：使用常駐瀏覽器池中的 Firefox 進行網路搜尋
+async def search_web_with_firefox(query: str, source_url: str = None, fast: bool = None) -> list:
+    """
+    使用 Firefox 開啟搜尋頁面並擷取結果。
+    fast 為 True 時使用精簡載入模式（預設依 SearchConfig.FAST_MODE）：
+      - 透過 request routing 封鎖非必要資源；
+      - 只等待 li.b_algo 出現，而非整個網路閒置；
+      - 以一次 evaluate_all 取回所有標題與連結。
+    """
+    if fast is None:
+        fast = config.FAST_MODE
+
+    # 若未提供來源 URL，則根據 query 生成 Bing 搜尋 URL
+    if source_url is None:
+        # 確保 query 為字串，並做 URL 編碼
+        if not isinstance(query, str):
+            query = str(query)
+        encoded_query = urllib.parse.quote_plus(query)
+        source_url = f"https://www.bing.com/search?q={encoded_query}"
+
+    # 從瀏覽器池借出一個分頁（已設定 User-Agent），離開 with 區塊後自動歸還
+    async with browser_pool.page() as page:
+        if fast:
+            return await _extract_fast(page, source_url)
+        return await _extract_full(page, source_url)
+
+
+async def _extract_fast(page, source_url: str) -> list:
+    results = []
+    await page.route("**/*", _block_non_essential)
+    start = time.perf_counter()
+    await page.goto(source_url, timeout=15000, wait_until="domcontentloaded")
+    try:
+        await page.wait_for_selector(config.RESULT_SELECTOR, timeout=config.RESULT_TIMEOUT)
+    except Exception as e:
+        logging.warning("等待搜尋結果逾時或失敗: %s", e)
+        return results
+    finally:
+        _record_load_time((time.perf_counter() - start) * 1000)
+
+    items = await page.locator(f"{config.RESULT_SELECTOR} h2 a").evaluate_all(EXTRACT_RESULTS_JS)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for item in items:
+        if item.get("link") and item.get("title"):
+            results.append({"title": item["title"], "link": item["link"], "timestamp": timestamp})
+    return results
+
+
+async def _extract_full(page, source_url: str) -> list:
+    results = []
+    start = time.perf_counter()
+    # 導航至指定的搜尋頁面，timeout 設定為 15000 毫秒
+    await page.goto(source_url, timeout=15000)
+    # 等待頁面加載完成，直到網路處於空閒狀態
+    await page.wait_for_load_state("networkidle")
+    _record_load_time((time.perf_counter() - start) * 1000)
+
+    # 根據 Bing 搜尋結果的結構，選取結果元素（這裡假設結果位於 <li class="b_algo"> 中的 h2 a 元素）
+    result_elements = page.locator("li.b_algo h2 a")
+    # 取得搜尋結果元素的數量（非同步方法）
+    count = await result_elements.count()
+    print("找到搜尋結果元素數量：", count)
+
+    # 逐一處理每個搜尋結果元素
+    for i in range(count):
+        try:
+            element = result_elements.nth(i)
+            # 取得元素內的文字內容作為標題，並去除首尾空白
+            title = (await element.inner_text()).strip()
+            # 取得元素的 href 屬性作為連結
+            link = await element.get_attribute("href")
+            if link and title:
+                # 取得目前時間作為 timestamp
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                results.append({"title": title, "link": link, "timestamp": timestamp})
+        except Exception as e:
+            print("錯誤：", e)
+            continue
     return results
 
 # 測試部分：如果直接執行此模組，則進行搜尋測試
 if __name__ == "__main__":
     query = "2025 機器學習 李宏毅"
     # 使用 asyncio.run 執行非同步函式，取得搜尋結果
-    search_results = asyncio.run(search_web_with_firefox(query))
+    async def _demo():
+        try:
+            return await search_web_with_firefox(query)
+        finally:
+            await browser_pool.stop()
+
+    search_results = asyncio.run(_demo())
     print("搜尋結果：")
     if search_results:
         for res in search_results:
@@ -1,27 +1,34 @@
 import sys
+import asyncio
 
 try:
     sys.stdin.reconfigure(encoding='utf-8')
 except Exception as e:
     print("無法重新設定 sys.stdin 編碼：", e)
 
-from src.clients.model_client import init_model_client
+from src.clients.model_client import get_model_client, close_model_clients
+from src.clients.browser_pool import browser_pool
 from src.agents.agent import Agent
 
-def main():
-    client = init_model_client()
+async def main():
+    client = get_model_client()
     agent = Agent(client, default_source=None)
     
     print("歡迎使用 Agent 聊天系統！請輸入您的問題，輸入 'exit' 結束。")
     
-    while True:
-        user_input = input("請輸入您的問題：")
-        if user_input.lower() in ["exit", "quit"]:
-            print("結束聊天。")
-            break
-        answer = agent.chat(user_input)
-        print("Agent 回答：", answer)
-        print("-" * 40)
+    # 整個對話使用同一個 event loop，瀏覽器池才能在多次搜尋間重複使用
+    try:
+        while True:
+            user_input = input("請輸入您的問題：")
+            if user_input.lower() in ["exit", "quit"]:
+                print("結束聊天。")
+                break
+            answer = await agent.chat(user_input)
+            print("Agent 回答：", answer)
+            print("-" * 40)
+    finally:
+        await browser_pool.stop()
+        await close_model_clients()
 
 if __name__ == '__main__':
-    main()
+    asyncio.run(main())
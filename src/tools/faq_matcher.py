@@ -0,0 +1,92 @@
+import heapq
+from collections import Counter, defaultdict
+from rapidfuzz import fuzz, process
+from src.utils.text_normalize import normalize_text
+
+
+def text_ngrams(text: str) -> set:
+    """
+    取出文字的檢索單位：以空白分隔的詞（英文等），以及去除空白後的字元 bigram（中文等）。
+    """
+    grams = set(text.split())
+    compact = text.replace(" ", "")
+    if len(compact) == 1:
+        grams.add(compact)
+    grams.update(compact[i : i + 2] for i in range(len(compact) - 1))
+    return grams
+
+
+class FaqMatcher:
+    """
+    常見問答的索引式模糊比對：
+      - 建立時一次完成所有問題的正規化與 n-gram 切分；
+      - 以 n-gram 倒排索引挑出共同片段最多的候選（shortlist）；
+      - 再用 rapidfuzz 的 process.cdist（workers=-1）批次計算候選的相似度。
+    記錄數不超過 shortlist_size 時直接比對所有記錄，結果與逐筆比對完全相同；索引只用於大型資料。
+    scorer（預設 token_set_ratio，與原本的比對方式相同）負責召回與排序；
+    token_set_ratio 在查詢是問題的子集或超集時也會給 100 分，
+    因此另以 strict_scorer（預設 fuzz.ratio，整句比對）計算最佳候選的嚴格分數，供需要高信心的呼叫端使用。
+    資料量從數十筆到數萬筆，查詢成本都只與候選數量相關。
+    """
+
+    def __init__(
+        self,
+        records: list,
+        question_key: str = "問題",
+        shortlist_size: int = 256,
+        max_df_ratio: float = 0.2,
+        scorer=fuzz.token_set_ratio,
+        strict_scorer=fuzz.ratio,
+    ):
+        self.records = list(records)
+        self.question_key = question_key
+        self.shortlist_size = shortlist_size
+        self.scorer = scorer
+        self.strict_scorer = strict_scorer
+        self.questions = [normalize_text(r.get(question_key, "")) for r in self.records]
+        self.index = defaultdict(list)  # n-gram -> 含有該 n-gram 的記錄編號
+        for i, question in enumerate(self.questions):
+            for gram in text_ngrams(question):
+                self.index[gram].append(i)
+        # 出現在太多問題中的 n-gram（例如「的」「是」組成的片段）幾乎沒有鑑別力，查詢時略過
+        self.max_df = max(1, int(len(self.records) * max_df_ratio))
+
+    def __len__(self):
+        return len(self.records)
+
+    def _shortlist(self, query: str) -> list:
+        if len(self.records) <= self.shortlist_size:
+            # 候選數本來就不超過上限：全部比對，避免常見片段被略過時漏掉真正的最佳記錄
+            return list(range(len(self.records)))
+        grams = text_ngrams(query)
+        postings = [self.index[g] for g in grams if g in self.index]
+        selective = [p for p in postings if len(p) <= self.max_df]
+        # 若所有片段都很常見，仍使用它們以免完全找不到候選
+        counts = Counter()
+        for posting in selective or postings:
+            counts.update(posting)
+        if len(counts) <= self.shortlist_size:
+            return list(counts)
+        return [i for i, _ in heapq.nlargest(self.shortlist_size, counts.items(), key=lambda kv: kv[1])]
+
+    def match(self, query: str):
+        """
+        回傳 (最相近的記錄, 相似度 0-100)；沒有任何候選時（沒有記錄，或大型資料中沒有共同片段）回傳 (None, 0)。
+        """
+        record, score, _ = self.match_detailed(query)
+        return record, score
+
+    def match_detailed(self, query: str):
+        """
+        回傳 (最相近的記錄, 相似度, 嚴格相似度)；沒有任何候選時回傳 (None, 0, 0)。
+        只多出或少了幾個詞的查詢，相似度可能是 100，嚴格相似度則會明顯較低。
+        """
+        normalized = normalize_text(query)
+        candidates = self._shortlist(normalized)
+        if not candidates:
+            return None, 0, 0
+        choices = [self.questions[i] for i in candidates]
+        scores = process.cdist([normalized], choices, scorer=self.scorer, workers=-1)[0]
+        best = int(scores.argmax())
+        strict = self.strict_scorer(normalized, choices[best])
+        return self.records[candidates[best]], float(scores[best]), float(strict)
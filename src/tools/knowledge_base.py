@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from src.config import KnowledgeConfig, PreferredAnswerConfig
+from src.clients.embedding_client import get_embedder
+from src.tools.preferred_answers import faq_store
+from src.tools.vector_index import VectorIndex
+
+config = KnowledgeConfig()
+preferred_config = PreferredAnswerConfig()
+
+FAQ_PREFIX = "faq:"
+DOC_PREFIX = "doc:"
+
+
+class KnowledgeBase:
+    """
+    常見問答與爬取內容的語意檢索：
+      - 常見問答以問題文字 embedding，資料更新時只重新計算有變動的列；
+      - 爬取內容以 add_documents 加入，與常見問答共用同一個向量索引；
+      - 查詢時把問題 embedding 後在 mmap 的向量矩陣上做 top-k 餘弦相似度搜尋。
+    """
+
+    def __init__(self, index: VectorIndex, embedder=None, store=None):
+        self.index = index
+        self.embedder = embedder
+        self.store = store
+        self._store_version = None
+        self._lock = asyncio.Lock()
+
+    def _get_embedder(self):
+        return self.embedder or get_embedder()
+
+    def _get_store(self):
+        return self.store or faq_store
+
+    async def refresh(self) -> dict:
+        """
+        若常見問答資料有更新，將變動的列同步到向量索引。
+        """
+        store = self._get_store()
+        async with self._lock:
+            records = await asyncio.to_thread(store.get_records)
+            if self._store_version == store.version:
+                return {}
+            items = []
+            for row, record in enumerate(records):
+                question = str(record.get(preferred_config.QUESTION_KEY, "")).strip()
+                answer = record.get(preferred_config.ANSWER_KEY)
+                if not question or not answer:
+                    continue
+                items.append(
+                    {
+                        "id": f"{FAQ_PREFIX}{question}",
+                        "text": question,
+                        "payload": {"type": "faq", "question": question, "answer": answer},
+                    }
+                )
+            stats = await self.index.upsert(items, self._get_embedder(), prefix=FAQ_PREFIX)
+            self._store_version = store.version
+            return stats
+
+    async def add_documents(self, documents: list) -> dict:
+        """
+        加入或更新爬取內容：documents 為 [{"url", "title", "content"}, ...]。
+        """
+        items = [
+            {
+                "id": f"{DOC_PREFIX}{doc['url']}",
+                "text": f"{doc.get('title', '')}\n{doc['content']}",
+                "payload": {"type": "doc", "url": doc["url"], "title": doc.get("title", ""), "content": doc["content"]},
+            }
+            for doc in documents
+            if doc.get("url") and doc.get("content")
+        ]
+        async with self._lock:
+            # 只新增或更新傳入的文件，不移除先前加入的其他文件
+            return await self.index.upsert(items, self._get_embedder(), prefix=DOC_PREFIX, remove_missing=False)
+
+    async def search(self, query: str, k: int = None, min_score: float = None) -> list:
+        """
+        回傳與 query 最相近的 k 筆資料：[{"score", "type", ...payload}, ...]。
+        """
+        k = config.TOP_K if k is None else k
+        min_score = config.MIN_SCORE if min_score is None else min_score
+        try:
+            await self.refresh()
+        except Exception as e:
+            logging.warning("更新知識庫向量索引失敗，沿用舊索引: %s", e)
+        if not len(self.index):
+            return []
+        vector = (await self._get_embedder()([query]))[0]
+        hits = self.index.search(vector, k)
+        return [{"score": round(score, 4), **payload} for score, _, payload in hits if score >= min_score]
+
+
+knowledge_base = KnowledgeBase(VectorIndex(config.INDEX_DIR))
+
+
+async def search_knowledge_base(query: str, k: int = None) -> list:
+    """
+    search_knowledge_base 工具的入口：在常見問答與爬取內容中做語意搜尋。
+    """
+    return await knowledge_base.search(query, k)
+
+
+if __name__ == "__main__":
+    # 離線建立 / 更新向量索引：python -m src.tools.knowledge_base [爬取內容.json]
+    import sys
+    import json
+
+    async def _build():
+        print("常見問答：", await knowledge_base.refresh())
+        if len(sys.argv) > 1:
+            with open(sys.argv[1], encoding="utf-8") as f:
+                print("爬取內容：", await knowledge_base.add_documents(json.load(f)))
+
+    asyncio.run(_build())
@@ -1,40 +1,263 @@
-from rapidfuzz import fuzz
+import os
+import json
+import asyncio
+import logging
+import tempfile
 from dotenv import load_dotenv
-from src.clients.sheet_client import init_google_sheet
+from src.config import SheetConfig, PreferredAnswerConfig
+from src.tools.faq_matcher import FaqMatcher
 
 load_dotenv()
 
+config = SheetConfig()
+preferred_config = PreferredAnswerConfig()
+
 
 def load_google_sheet():
     """
     從 Google Sheet 載入常見問答資料。
     """
+    # 延遲載入 Google 客戶端，匯入本模組時不需要連線或憑證
+    from src.clients.sheet_client import init_google_sheet
+
     sheet = init_google_sheet()
     data = sheet.get_all_records()
     return data
 
 
-def get_preferred_answer(query, google_sheet=load_google_sheet(), threshold=40):
+def load_fixture(path: str):
+    """
+    從本地 JSON 檔載入常見問答資料，格式與 sheet.get_all_records() 相同。
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def default_loader():
+    """
+    依設定選擇資料來源：有 FAQ_FIXTURE_PATH 時讀本地檔，否則讀 Google Sheet。
+    """
+    if config.FIXTURE_PATH:
+        return load_fixture(config.FIXTURE_PATH)
+    return load_google_sheet()
+
+
+class FaqStore:
+    """
+    常見問答資料的延遲載入與背景更新：
+      - 第一次使用時才載入，優先讀取本地快照，冷啟動不需等待網路；
+      - start() 後在背景定期重新載入，成功時整份替換並寫回快照；
+      - 載入失敗時保留上一次成功的資料。
+    loader 可替換為任何回傳記錄列表的函數，方便測試。
+    """
+
+    def __init__(self, loader=default_loader, snapshot_path: str = None, refresh_interval: float = 600):
+        self.loader = loader
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self._records = None
+        self._matcher = None
+        self._matcher_version = None
+        self._task = None
+        self.version = 0  # 資料內容改變時遞增，供索引判斷是否需要重建
+        self.last_error = None
+
+    def _read_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            return load_fixture(self.snapshot_path)
+        except Exception as e:
+            logging.warning("讀取常見問答快照失敗: %s", e)
+            return None
+
+    def _write_snapshot(self, records: list):
+        if not self.snapshot_path:
+            return
+        directory = os.path.dirname(self.snapshot_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # 先寫入暫存檔再以 os.replace 原子性替換，避免讀到寫到一半的快照
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _swap(self, records: list) -> bool:
+        """
+        替換資料；內容與目前相同時不動版本號，回傳是否有變動。
+        """
+        if records == self._records:
+            return False
+        self._records = records
+        self.version += 1
+        return True
+
+    def refresh(self) -> bool:
+        """
+        同步重新載入資料；成功回傳 True，失敗時保留舊資料並回傳 False。
+        """
+        try:
+            records = list(self.loader())
+        except Exception as e:
+            self.last_error = str(e)
+            logging.warning("載入常見問答資料失敗，沿用上一份資料: %s", e)
+            return False
+        self.last_error = None
+        if not self._swap(records):
+            logging.info("常見問答資料沒有變動，共 %s 筆", len(records))
+            return True
+        try:
+            self._write_snapshot(records)
+        except Exception as e:
+            logging.warning("寫入常見問答快照失敗: %s", e)
+        logging.info("常見問答資料已更新，共 %s 筆", len(records))
+        return True
+
+    def get_records(self) -> list:
+        """
+        取得目前的問答記錄。尚未載入時先讀快照，沒有快照才同步載入一次。
+        """
+        if self._records is None:
+            snapshot = self._read_snapshot()
+            if snapshot is not None:
+                self._swap(snapshot)
+            elif not self.refresh():
+                self._swap([])
+        return self._records
+
+    def get_matcher(self) -> FaqMatcher:
+        """
+        取得目前資料的比對索引；資料更新後第一次使用時重建。
+        """
+        records = self.get_records()
+        if self._matcher is None or self._matcher_version != self.version:
+            self._matcher = FaqMatcher(records)
+            self._matcher_version = self.version
+        return self._matcher
+
+    async def _refresh_loop(self):
+        while True:
+            # gspread 為同步 API，放到執行緒中執行以免阻塞 event loop
+            await asyncio.to_thread(self.refresh)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """
+        載入快照並啟動背景更新工作（需在 event loop 中呼叫）。
+        """
+        if self._records is None:
+            snapshot = self._read_snapshot()
+            if snapshot is not None:
+                self._swap(snapshot)
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+faq_store = FaqStore(snapshot_path=config.SNAPSHOT_PATH, refresh_interval=config.REFRESH_INTERVAL)
+
+
+class PreferredAnswerStats:
+    """
+    記錄常見問答快速路徑的命中率與節省的時間。
+    節省時間以「完整流程的平均耗時 − 查詢常見問答的耗時」估算，
+    完整流程的平均耗時以指數移動平均（EMA）持續更新。
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.requests = 0
+        self.high_hits = 0
+        self.medium_hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        self.pipeline_avg = None
+
+    def record_lookup(self, tier: str, lookup_seconds: float) -> float:
+        """
+        記錄一次查詢的結果（"high"、"medium" 或 "miss"），回傳此次估計節省的秒數。
+        """
+        self.requests += 1
+        saved = 0.0
+        if tier == "high":
+            self.high_hits += 1
+            if self.pipeline_avg is not None:
+                saved = max(0.0, self.pipeline_avg - lookup_seconds)
+                self.time_saved += saved
+        elif tier == "medium":
+            self.medium_hits += 1
+        else:
+            self.misses += 1
+        return saved
+
+    def record_pipeline(self, seconds: float):
+        if self.pipeline_avg is None:
+            self.pipeline_avg = seconds
+        else:
+            self.pipeline_avg += self.alpha * (seconds - self.pipeline_avg)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "high_hits": self.high_hits,
+            "medium_hits": self.medium_hits,
+            "misses": self.misses,
+            "hit_rate": self.high_hits / self.requests if self.requests else 0.0,
+            "time_saved_seconds": round(self.time_saved, 3),
+            "pipeline_avg_seconds": self.pipeline_avg,
+        }
+
+
+preferred_answer_stats = PreferredAnswerStats()
+
+
+def match_preferred_answer(query) -> tuple:
+    """
+    在常見問答中尋找最相近的問題，回傳 (信心等級, 記錄, 相似度)。
+    信心等級為 "high"（可直接回覆）、"medium"（可作為參考資料）或 "miss"。
+    token_set_ratio 對子集或超集的查詢（例如只有「visa」，或兩個問題併在一起）也會給 100 分，
+    因此 high 另外要求整句相似度達到 HIGH_STRICT_THRESHOLD；其餘情況最多只作為 medium 參考資料。
+    """
+    record, score, strict = faq_store.get_matcher().match_detailed(query)
+    if record is None or not record.get(preferred_config.ANSWER_KEY):
+        return "miss", None, score
+    if score >= preferred_config.HIGH_THRESHOLD and strict >= preferred_config.HIGH_STRICT_THRESHOLD:
+        return "high", record, score
+    if score >= preferred_config.MEDIUM_THRESHOLD:
+        return "medium", record, score
+    return "miss", record, score
+
+
+def get_preferred_answer(query, google_sheet=None, threshold=40):
     """
     根據 query 在 preferred_answers 中進行模糊匹配，返回最合適的預設回答。
 
     :param query: 使用者輸入的問題文字
-    :param google_sheet: 從 Google Sheet 載入的字典列表，每筆記錄應包含 "問題" 與 "AI回覆"
+    :param google_sheet: 字典列表，每筆記錄應包含 "問題" 與 "AI回覆"；未提供時使用 faq_store 的資料
     :param threshold: 相似度門檻（0-100），超過此門檻則認為匹配
     :return: 如果有匹配，返回對應的 "AI回覆"，否則返回 None
     """
-    # 使用 rapidfuzz 模組計算相似度
-    best_match = None
-    best_score = 0
+    if google_sheet is None:
+        matcher = faq_store.get_matcher()
+    else:
+        matcher = FaqMatcher(google_sheet)
 
-    for record in google_sheet:
-        candidate = record.get("問題", "")
-        score = fuzz.token_set_ratio(query, candidate)
-        if score > best_score:
-            best_score = score
-            best_match = record
+    # 透過倒排索引挑選候選，再以 rapidfuzz 批次計算相似度
+    best_match, best_score = matcher.match(query)
     # default threshold = 40
-    if best_score >= threshold:
+    if best_match is not None and best_score >= threshold:
         print("最佳匹配：", best_match.get("問題", ""))
         print("相似度：", best_score)
         return best_match.get("回覆有誤", None)
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from src.clients.scraper_pool import scraper_pool
+from src.config import ScraperPoolConfig
+from src.functions.scrape_cache import get_scrape_cache
+
+config = ScraperPoolConfig()
+
+
+def is_allowed_url(url: str) -> bool:
+    """
+    只允許 http/https，且主機屬於 ALLOWED_DOMAINS（含子網域）的網址。
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    return any(host == domain or host.endswith("." + domain) for domain in config.ALLOWED_DOMAINS)
+
+
+async def scrape_website(url: str, prompt: str) -> dict:
+    """
+    scrape_website 工具的入口：在 ScraperPool 中以 SmartScraperGraph 擷取指定網頁的資訊。
+    回傳 {"url", "result"}；失敗時回傳 {"url", "error"}，由摘要告知使用者。
+    """
+    if not is_allowed_url(url):
+        return {"url": url, "error": "不允許爬取此網址"}
+    cache = get_scrape_cache()
+    try:
+        if cache is None:
+            return {"url": url, "result": await scraper_pool.scrape(prompt, url)}
+        # 網頁內容未變時直接使用先前的擷取結果，不重新呼叫模型
+        return {"url": url, "result": await cache.scrape(url, prompt, scraper_pool.scrape)}
+    except asyncio.TimeoutError:
+        return {"url": url, "error": "網頁爬取逾時"}
+    except Exception as e:
+        logging.warning("爬取網頁失敗 %s: %s", url, e)
+        return {"url": url, "error": f"網頁爬取失敗: {e}"}
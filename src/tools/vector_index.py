@@ -0,0 +1,155 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+import numpy as np
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: str, write):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+class VectorIndex:
+    """
+    存在磁碟上的向量索引：
+      - 向量以 float32 NumPy 陣列存成 vectors.npy，查詢時以 mmap 方式讀取，不必整份載入記憶體；
+      - 每列對應的 id、文字雜湊與 payload 存在 meta.json；
+      - 向量事先正規化，餘弦相似度即為一次矩陣乘法；
+      - upsert 只重新計算新增或內容有變動的項目。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.embedder_name = None
+        self.ids = []
+        self.hashes = []
+        self.payloads = []
+        self._vectors = None
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.vectors_path) and os.path.exists(self.meta_path)):
+            return
+        with open(self.meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        self.embedder_name = meta.get("embedder")
+        self.ids = meta["ids"]
+        self.hashes = meta["hashes"]
+        self.payloads = meta["payloads"]
+        self._vectors = np.load(self.vectors_path, mmap_mode="r")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, vector, k: int = 3) -> list:
+        """
+        回傳與 vector 餘弦相似度最高的 k 筆：[(相似度, id, payload), ...]。
+        """
+        if not self.ids:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        scores = self._vectors @ (query / norm)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.ids[i], self.payloads[i]) for i in top]
+
+    async def upsert(self, items: list, embedder, prefix: str = "", remove_missing: bool = True) -> dict:
+        """
+        以 items（[{"id", "text", "payload"}, ...]）更新索引。
+        只有新增或文字有變動的項目會重新 embedding；
+        remove_missing 為 True 時，id 以 prefix 開頭但不在 items 中的舊項目會被移除，
+        其他 prefix 的項目保持不變。
+        """
+        embedder_name = getattr(embedder, "name", type(embedder).__name__)
+        if self.embedder_name not in (None, embedder_name):
+            # 換了 embedder，向量空間不同，舊向量全部作廢
+            logging.info("embedder 由 %s 換成 %s，重建向量索引", self.embedder_name, embedder_name)
+            self.ids, self.hashes, self.payloads, self._vectors = [], [], [], None
+
+        existing = {id_: row for row, id_ in enumerate(self.ids)}
+        incoming = {item["id"] for item in items}
+
+        # 其他 prefix 的項目原樣保留；同 prefix 但不在 items 中的項目移除
+        rows = []  # (向量來源, id, 文字雜湊, payload)
+        removed = 0
+        for row, id_ in enumerate(self.ids):
+            if id_ in incoming:
+                continue
+            if remove_missing and id_.startswith(prefix):
+                removed += 1
+                continue
+            rows.append((self._vectors[row], id_, self.hashes[row], self.payloads[row]))
+
+        changed = []
+        unchanged = 0
+        payload_changed = 0  # 文字相同、只有 payload（例如回答）變動：不必重新 embedding，但仍要寫回
+        for item in items:
+            digest = text_hash(item["text"])
+            row = existing.get(item["id"])
+            if row is not None and self.hashes[row] == digest:
+                rows.append((self._vectors[row], item["id"], digest, item.get("payload")))
+                unchanged += 1
+                if self.payloads[row] != item.get("payload"):
+                    payload_changed += 1
+            else:
+                changed.append((item, digest))
+
+        added = sum(1 for item, _ in changed if item["id"] not in existing)
+        stats = {
+            "added": added,
+            "updated": len(changed) - added + payload_changed,
+            "unchanged": unchanged - payload_changed,
+            "removed": removed,
+            "total": len(rows) + len(changed),
+        }
+        if not (stats["added"] or stats["updated"] or stats["removed"]) and self.embedder_name == embedder_name:
+            # 沒有任何變動：不重建矩陣也不重寫檔案
+            return stats
+
+        if changed:
+            vectors = np.asarray(await embedder([item["text"] for item, _ in changed]), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+            for (item, digest), vector in zip(changed, vectors):
+                rows.append((vector, item["id"], digest, item.get("payload")))
+
+        # 組合矩陣與寫檔會複製整份向量，交給執行緒以免阻塞事件迴圈；寫完後再於事件迴圈中重新載入
+        await asyncio.to_thread(self._save, rows, embedder_name)
+        self._load()
+        logging.info("向量索引已更新: %s", stats)
+        return stats
+
+    def _save(self, rows: list, embedder_name: str):
+        if rows:
+            matrix = np.stack([np.asarray(vector, dtype=np.float32) for vector, _, _, _ in rows])
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        meta = {
+            "embedder": embedder_name,
+            "ids": [id_ for _, id_, _, _ in rows],
+            "hashes": [digest for _, _, digest, _ in rows],
+            "payloads": [payload for _, _, _, payload in rows],
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        _atomic_write(self.vectors_path, lambda f: np.save(f, matrix))
+        _atomic_write(self.meta_path, lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
@@ -0,0 +1,184 @@
+import json
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+import numpy as np
+from src.config import CompletionCacheConfig
+from src.utils.ttl_cache import TTLCache
+
+config = CompletionCacheConfig()
+
+
+def completion_key(model: str, messages: list, temperature: float) -> str:
+    """
+    以模型、messages 與 temperature 計算快取 key。
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    以使用者問題的 embedding 相似度比對的快取。
+    相似度高於 threshold 時視為同一個問題；超過 max_size 時淘汰最久未使用的項目。
+    向量正規化後存放在預先配置的矩陣中，查詢時以一次矩陣乘法算出所有相似度。
+    """
+
+    def __init__(self, embedder, threshold: float = 0.95, max_size: int = 512, ttl: float = 3600):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (namespace, query) -> (slot, value)，順序即使用順序
+        self._matrix = None  # (max_size, dim)，第一次寫入時依向量維度配置
+        self._slot_keys = [None] * max_size
+        self._slot_namespaces = np.full(max_size, -1, dtype=np.int32)  # -1 表示空槽
+        self._expires_at = np.zeros(max_size)
+        self._namespaces = {}  # namespace -> 整數編號
+        self._free = list(range(max_size - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+
+    async def embed(self, query: str) -> np.ndarray:
+        """
+        計算 query 的正規化向量；可傳給 get() 與 set() 共用，避免重複呼叫 embedder。
+        """
+        vector = np.asarray((await self.embedder([query]))[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key):
+        slot, _ = self._entries.pop(key)
+        self._slot_keys[slot] = None
+        self._slot_namespaces[slot] = -1
+        self._free.append(slot)
+
+    def _expire(self, now: float):
+        for slot in np.flatnonzero((self._slot_namespaces >= 0) & (self._expires_at < now)):
+            self._remove(self._slot_keys[slot])
+
+    async def get(self, namespace: str, query: str, vector: np.ndarray = None):
+        self._expire(time.monotonic())
+        namespace_id = self._namespaces.get(namespace)
+        if self._matrix is None or namespace_id is None or not (self._slot_namespaces == namespace_id).any():
+            self.misses += 1
+            return None
+        if vector is None:
+            vector = await self.embed(query)
+        scores = self._matrix @ vector
+        scores[self._slot_namespaces != namespace_id] = -np.inf
+        slot = int(np.argmax(scores))
+        if scores[slot] >= self.threshold:
+            key = self._slot_keys[slot]
+            self.hits += 1
+            self._entries.move_to_end(key)
+            logging.debug("語意快取命中（相似度 %.3f）: %s ≈ %s", scores[slot], query, key[1])
+            return self._entries[key][1]
+        self.misses += 1
+        return None
+
+    async def set(self, namespace: str, query: str, value, vector: np.ndarray = None):
+        if vector is None:
+            vector = await self.embed(query)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_size, len(vector)), dtype=np.float32)
+        key = (namespace, query)
+        if key in self._entries:
+            self._remove(key)
+        elif not self._free:
+            self._remove(next(iter(self._entries)))
+        slot = self._free.pop()
+        self._matrix[slot] = vector
+        self._slot_keys[slot] = key
+        self._slot_namespaces[slot] = self._namespaces.setdefault(namespace, len(self._namespaces))
+        self._expires_at[slot] = time.monotonic() + self.ttl
+        self._entries[key] = (slot, value)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CompletionCache:
+    """
+    模型回應快取：
+      - 精確層：以 (model, messages, temperature) 的雜湊為 key；
+      - 語意層（可選）：以使用者問題的 embedding 相似度比對，跨越措辭上的小差異。
+    namespace 用來區分不同的 LLM 階段（例如 "reasoning"、"summary"），避免互相命中。
+    """
+
+    def __init__(self, exact: TTLCache, semantic: SemanticCache = None):
+        self.exact = exact
+        self.semantic = semantic
+
+    async def lookup(self, namespace: str, model: str, messages: list, temperature: float, query: str = None):
+        """
+        查詢快取，回傳 (快取值或 None, query 的向量或 None)。
+        未命中時把向量傳給 set()，寫入語意層時就不必再 embedding 一次。
+        """
+        key = completion_key(model, messages, temperature)
+        value = self.exact.get(f"{namespace}:{key}")
+        if value is not None or self.semantic is None or not query:
+            return value, None
+        try:
+            vector = await self.semantic.embed(query)
+            return await self.semantic.get(namespace, query, vector), vector
+        except Exception as e:
+            logging.warning("語意快取查詢失敗: %s", e)
+            return None, None
+
+    async def get(self, namespace: str, model: str, messages: list, temperature: float, query: str = None):
+        value, _ = await self.lookup(namespace, model, messages, temperature, query)
+        return value
+
+    async def set(
+        self, namespace: str, model: str, messages: list, temperature: float, value, query: str = None, vector=None
+    ):
+        key = completion_key(model, messages, temperature)
+        self.exact.set(f"{namespace}:{key}", value)
+        if self.semantic is not None and query:
+            try:
+                await self.semantic.set(namespace, query, value, vector)
+            except Exception as e:
+                logging.warning("語意快取寫入失敗: %s", e)
+
+    def stats(self) -> dict:
+        stats = {"exact": self.exact.stats()}
+        if self.semantic is not None:
+            stats["semantic"] = self.semantic.stats()
+        return stats
+
+
+_completion_cache = None
+
+
+def get_completion_cache():
+    """
+    依 CompletionCacheConfig 建立共用的模型回應快取；未啟用時回傳 None。
+    """
+    global _completion_cache
+    if not config.ENABLED:
+        return None
+    if _completion_cache is None:
+        semantic = None
+        if config.SEMANTIC_ENABLED:
+            # 語意層為可選功能，只在啟用時才載入 embedding 客戶端
+            from src.clients.embedding_client import get_embedder
+
+            semantic = SemanticCache(
+                get_embedder(),
+                threshold=config.SEMANTIC_THRESHOLD,
+                max_size=config.SEMANTIC_MAX_SIZE,
+                ttl=config.TTL,
+            )
+        _completion_cache = CompletionCache(TTLCache(max_size=config.MAX_SIZE, ttl=config.TTL), semantic)
+    return _completion_cache
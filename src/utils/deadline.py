@@ -0,0 +1,89 @@
+import time
+import asyncio
+import logging
+
+
+class DeadlineExceeded(Exception):
+    """
+    某個階段在請求的截止時間前沒有完成，已被取消。
+    """
+
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} 超過請求的截止時間")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    單一請求的截止時間，從端點一路傳給推理、工具與摘要等各階段。
+    各階段以 timeout() 取得自己可用的時間；被截斷的階段記錄在 cut_stages。
+    seconds 為 None 表示不限制。
+    """
+
+    def __init__(self, seconds: float = None):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+        self.cut_stages = []
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float = None, reserve: float = 0.0):
+        """
+        回傳本階段可用的秒數：剩餘時間扣掉要留給後續階段的 reserve，且不超過 cap。
+        沒有截止時間也沒有 cap 時回傳 None（不限制）。
+        """
+        if self.expires_at is None:
+            return cap
+        available = max(0.0, self.remaining() - reserve)
+        return available if cap is None else min(cap, available)
+
+    def reserve(self, seconds: float, ratio: float) -> float:
+        """
+        要留給後續階段的秒數：不超過 seconds，也不超過總預算的 ratio 比例。
+        總預算很短（例如前端要求 20 秒）時依比例縮小，前面的階段才不會一開始就沒有時間。
+        """
+        if self.seconds is None:
+            return seconds
+        return min(seconds, self.seconds * ratio)
+
+    def cut(self, stage: str):
+        if stage not in self.cut_stages:
+            self.cut_stages.append(stage)
+            logging.warning("請求超過時間預算，截斷階段: %s（總預算 %s 秒）", stage, self.seconds)
+
+
+async def run_within(awaitable, deadline: Deadline, stage: str, reserve: float = 0.0):
+    """
+    在截止時間內等待 awaitable；逾時則取消它、記錄被截斷的階段並拋出 DeadlineExceeded。
+    """
+    try:
+        return await asyncio.wait_for(awaitable, deadline.timeout(reserve=reserve))
+    except asyncio.TimeoutError:
+        deadline.cut(stage)
+        raise DeadlineExceeded(stage) from None
+
+
+async def iterate_within(agen, deadline: Deadline, stage: str, reserve: float = 0.0):
+    """
+    在截止時間內逐一轉送 async generator 的內容；逾時則關閉它、記錄被截斷的階段並拋出 DeadlineExceeded。
+    已轉送的內容仍然有效，呼叫端可據此決定降級方式。
+    """
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(agen.__anext__(), deadline.timeout(reserve=reserve))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                deadline.cut(stage)
+                raise DeadlineExceeded(stage) from None
+            yield item
+    finally:
+        await agen.aclose()
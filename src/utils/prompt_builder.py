@@ -0,0 +1,93 @@
+import logging
+from src.utils.token_count import count_tokens, truncate_to_tokens
+
+# 截斷後剩餘預算低於此值時，不再放入半截的項目
+MIN_PARTIAL_TOKENS = 20
+
+
+class PromptSection:
+    def __init__(self, name: str, title: str, items: list, budget: int, priority: int):
+        self.name = name
+        self.title = title
+        self.items = [item for item in items if item and item.strip()]
+        self.budget = budget
+        self.priority = priority  # 數字越大越重要，超出總預算時越晚被裁剪
+
+    def tokens(self) -> int:
+        return sum(count_tokens(item) for item in self.items)
+
+
+def _fit(items: list, budget: int) -> list:
+    """
+    依序保留項目直到用完預算；最後一個放不下的項目在剩餘預算足夠時截斷放入。
+    """
+    kept = []
+    remaining = budget
+    for item in items:
+        tokens = count_tokens(item)
+        if tokens <= remaining:
+            kept.append(item)
+            remaining -= tokens
+            continue
+        if remaining >= MIN_PARTIAL_TOKENS:
+            partial = truncate_to_tokens(item, remaining - 1) + "…"
+            if count_tokens(partial) > remaining:
+                partial = truncate_to_tokens(item, remaining)
+            kept.append(partial)
+        break
+    return kept
+
+
+class PromptBuilder:
+    """
+    以 token 為單位組裝 prompt：
+      - 各區塊（例如搜尋結果、思考過程、時間）有各自的 token 預算；
+      - 內容相同的項目只保留一次（優先保留在較重要的區塊）；
+      - 總長超過 max_tokens 時，從優先順序最低的區塊開始裁剪。
+    """
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.sections = []
+        self.stats = {}
+
+    def add_section(self, name: str, title: str, items: list, budget: int, priority: int = 0):
+        self.sections.append(PromptSection(name, title, items, budget, priority))
+        return self
+
+    def _dedupe(self):
+        seen = set()
+        for section in sorted(self.sections, key=lambda s: -s.priority):
+            unique = []
+            for item in section.items:
+                key = " ".join(item.split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                unique.append(item)
+            section.items = unique
+
+    def build(self) -> str:
+        before = sum(section.tokens() for section in self.sections)
+        self._dedupe()
+        for section in self.sections:
+            section.items = _fit(section.items, section.budget)
+
+        overflow = sum(section.tokens() for section in self.sections) - self.max_tokens
+        for section in sorted(self.sections, key=lambda s: s.priority):
+            if overflow <= 0:
+                break
+            current = section.tokens()
+            section.items = _fit(section.items, max(0, current - overflow))
+            overflow -= current - section.tokens()
+
+        self.stats = {section.name: section.tokens() for section in self.sections}
+        self.stats["total"] = sum(section.tokens() for section in self.sections)
+        self.stats["before"] = before
+        logging.info("prompt 大小: %s tokens（原始 %s）%s", self.stats["total"], before, self.stats)
+
+        blocks = []
+        for section in self.sections:
+            if section.items:
+                blocks.append(section.title + "\n" + "\n".join(section.items))
+        return "\n\n".join(blocks) + "\n"
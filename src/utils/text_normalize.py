@@ -0,0 +1,12 @@
+import re
+import unicodedata
+
+
+def normalize_text(text) -> str:
+    """
+    正規化文字：統一全半形（NFKC）、轉小寫、去除標點並合併空白。
+    讓只差在大小寫、全半形、標點或空白的問題視為相同。
+    """
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
@@ -0,0 +1,44 @@
+import re
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # 未安裝 tiktoken 或無法下載編碼表時改用估算
+    _encoding = None
+
+# 中日韓文字大約一字一個 token，其他文字約四個字元一個 token
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    計算文字的 token 數。有 tiktoken 時精確計算，否則以字元數估算。
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    將文字截斷至不超過 budget 個 token。
+    """
+    if budget <= 0 or not text:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text)[:budget])
+    # 以二分搜尋找出估算下不超過預算的最長前綴
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
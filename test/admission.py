@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+from backend.admission import AdmissionController, AdmissionRejected
+from src.clients.browser_pool import BrowserPool, BrowserBusyError
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_queue_then_reject_when_full(self):
+        async def run():
+            controller = AdmissionController(max_concurrent=1, max_queue=1)
+            running = controller.admit()
+            queued = controller.admit()
+            with self.assertRaises(AdmissionRejected) as ctx:
+                controller.admit()
+            self.assertEqual(ctx.exception.status_code, 503)
+            self.assertGreaterEqual(ctx.exception.retry_after, 1)
+            return controller, running, queued
+
+        controller, running, queued = asyncio.run(run())
+        self.assertTrue(running.admitted)
+        self.assertFalse(queued.admitted)
+        self.assertEqual(controller.position(queued), 1)
+        self.assertEqual(controller.stats()["rejected_full"], 1)
+
+    def test_queued_request_reports_position_and_starts_after_release(self):
+        async def run():
+            controller = AdmissionController(max_concurrent=1, max_queue=4)
+            first = controller.admit()
+            second = controller.admit()
+            third = controller.admit()
+            updates = []
+
+            async def wait(ticket):
+                async for position, eta in controller.wait(ticket, interval=0.01):
+                    updates.append((ticket, position))
+
+            waiter = asyncio.create_task(wait(third))
+            await asyncio.sleep(0.02)
+            controller.release(first)
+            await asyncio.sleep(0.02)
+            controller.release(second)
+            await waiter
+            controller.release(third)
+            return controller, third, updates
+
+        controller, third, updates = asyncio.run(run())
+        self.assertTrue(third.admitted)
+        self.assertEqual([position for _, position in updates], [2, 1])
+        self.assertEqual(controller.stats()["running"], 0)
+        self.assertIsNotNone(controller.eta(1))
+
+    def test_per_session_limit_and_queue_timeout(self):
+        async def run():
+            controller = AdmissionController(max_concurrent=1, max_queue=4, max_per_session=1)
+            controller.admit("a")
+            with self.assertRaises(AdmissionRejected) as ctx:
+                controller.admit("a")
+            self.assertEqual(ctx.exception.status_code, 429)
+            queued = controller.admit("b")
+            with self.assertRaises(AdmissionRejected):
+                async for _ in controller.wait(queued, interval=0.01, timeout=0.03):
+                    pass
+            controller.release(queued)
+            controller.release(queued)  # 重複釋放不應影響計數
+            return controller
+
+        stats = asyncio.run(run()).stats()
+        self.assertEqual((stats["queue_timeouts"], stats["waiting"], stats["running"]), (1, 0, 1))
+
+
+class TestBrowserPageLimit(unittest.TestCase):
+    def test_waiting_for_pages_is_bounded(self):
+        async def run():
+            pool = BrowserPool(max_pages=1, max_waiting=1, wait_timeout=0.05)
+            await pool._acquire_page_slot()
+            waiter = asyncio.create_task(pool._acquire_page_slot())
+            await asyncio.sleep(0)
+            # 已有一個請求在等待：第二個立即被拒絕
+            with self.assertRaises(BrowserBusyError):
+                await pool._acquire_page_slot()
+            # 等待中的請求逾時
+            with self.assertRaises(BrowserBusyError):
+                await waiter
+            return pool
+
+        pool = asyncio.run(run())
+        self.assertEqual(pool.stats["busy_rejections"], 2)
+        self.assertEqual(pool.waiting, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
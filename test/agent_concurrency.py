@@ -0,0 +1,116 @@
+import asyncio
+import time
+import unittest
+from src.agents.agent import Agent
+
+LLM_DELAY = 0.2  # 模擬每次模型呼叫的網路延遲（秒）
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+        self.function_call = None
+
+
+class FakeChoice:
+    def __init__(self, content):
+        self.finish_reason = "stop"
+        self.message = FakeMessage(content)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.choices = [FakeChoice(content)]
+
+
+class FakeDelta:
+    def __init__(self, content, tool_calls=None):
+        self.content = content
+        self.function_call = None
+        self.tool_calls = tool_calls
+
+
+class FakeStreamChoice:
+    def __init__(self, content):
+        self.delta = FakeDelta(content)
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.choices = [FakeStreamChoice(content)]
+
+
+async def fake_stream(text):
+    for token in text.split(" "):
+        await asyncio.sleep(0)
+        yield FakeChunk(token + " ")
+
+
+class FakeCompletions:
+    async def create(self, **kwargs):
+        # 以 asyncio.sleep 模擬非同步 I/O，不會阻塞 event loop
+        await asyncio.sleep(LLM_DELAY)
+        text = "<step1> 分析問題 <step2> 給出答案"
+        if kwargs.get("stream"):
+            return fake_stream(text)
+        return FakeResponse(text)
+
+
+class FakeChat:
+    def __init__(self):
+        self.completions = FakeCompletions()
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.chat = FakeChat()
+
+
+async def run_one(query):
+    agent = Agent(FakeAsyncClient(), default_source=None)
+    return await agent.chat(query)
+
+
+async def run_many(n):
+    return await asyncio.gather(*(run_one(f"問題 {i}") for i in range(n)))
+
+
+class TestAgentConcurrency(unittest.TestCase):
+    def test_parallel_requests_do_not_serialize(self):
+        start = time.perf_counter()
+        asyncio.run(run_one("單一問題"))
+        single = time.perf_counter() - start
+
+        n = 10
+        start = time.perf_counter()
+        answers = asyncio.run(run_many(n))
+        parallel = time.perf_counter() - start
+
+        self.assertEqual(len(answers), n)
+        # N 個並行請求的耗時應接近單一請求，而不是 N 倍
+        self.assertLess(parallel, single * 2)
+
+    def test_final_answer_is_streamed_as_deltas(self):
+        async def collect():
+            agent = Agent(FakeAsyncClient(), default_source=None)
+            return [msg async for msg in agent.chat_stream("問題")]
+
+        chunks = asyncio.run(collect())
+        deltas = [c for c in chunks if c.get("delta")]
+        self.assertGreater(len(deltas), 1)
+        self.assertTrue(deltas[-1]["finalized"])
+        self.assertFalse(any(c["finalized"] for c in deltas[:-1]))
+
+    def test_internal_instructions_are_not_recorded_as_reasoning(self):
+        agent = Agent(FakeAsyncClient(), default_source=None)
+        asyncio.run(agent.chat("問題"))
+        steps = [step for step in agent.reasoning_steps if "<step" in step]
+        self.assertEqual(len(steps), len(set(steps)))
+        self.assertGreater(len(steps), 0)
+        # 給模型的回答指示仍在對話中，但不會進入摘要用的思考過程
+        self.assertTrue(any("生成不包含推理步驟" in m["content"] for m in agent.messages))
+        self.assertFalse(any("生成不包含推理步驟" in step for step in agent.reasoning_steps))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from unittest import mock
+from src.agents.agent import Agent
+from src.tools.preferred_answers import FaqStore
+from src.tools import preferred_answers
+from src.tools.preferred_answers import match_preferred_answer
+from test.agent_concurrency import FakeAsyncClient
+
+RECORDS = [
+    {"問題": "獎學金申請截止日期是什麼時候？", "回覆有誤": "每年三月底截止。"},
+    {"問題": "宿舍如何申請？", "回覆有誤": "請至住宿組網站申請。"},
+    {"問題": "How do I apply for a student visa?", "回覆有誤": "See the visa page."},
+]
+
+
+class CountingClient(FakeAsyncClient):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        create = self.chat.completions.create
+
+        async def counting_create(**kwargs):
+            self.calls += 1
+            return await create(**kwargs)
+
+        self.chat.completions.create = counting_create
+
+
+def collect(agent, query):
+    async def run():
+        return [msg async for msg in agent.chat_stream(query)]
+
+    return asyncio.run(run())
+
+
+class TestPreferredAnswerFastPath(unittest.TestCase):
+    def setUp(self):
+        store = FaqStore(loader=lambda: RECORDS)
+        patcher = mock.patch.object(preferred_answers, "faq_store", store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_high_confidence_skips_llm(self):
+        client = CountingClient()
+        chunks = collect(Agent(client), "獎學金申請截止日期是什麼時候？")
+        self.assertEqual(chunks[-1]["source"], "PreferredAnswer")
+        self.assertEqual(chunks[-1]["message"], "每年三月底截止。")
+        self.assertEqual(client.calls, 0)
+
+    def test_partial_matches_do_not_answer_directly(self):
+        # 單一關鍵字、問題的子集與包含額外問題的超集，token_set_ratio 都是 100，但不能直接回覆
+        for query in ("apply", "visa", "宿舍如何申請？另外，我是交換生，簽證要怎麼辦理？"):
+            with self.subTest(query=query):
+                tier, _, _ = match_preferred_answer(query)
+                self.assertNotEqual(tier, "high")
+
+    def test_superset_question_runs_pipeline(self):
+        client = CountingClient()
+        chunks = collect(Agent(client), "宿舍如何申請？另外，我是交換生，簽證要怎麼辦理？")
+        self.assertNotIn("PreferredAnswer", [c["source"] for c in chunks])
+        self.assertEqual(client.calls, 2)
+
+    def test_miss_runs_pipeline(self):
+        client = CountingClient()
+        chunks = collect(Agent(client), "今天天氣如何")
+        self.assertNotIn("PreferredAnswer", [c["source"] for c in chunks])
+        self.assertEqual(client.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import unittest
+from unittest import mock
+from src.clients import browser_pool as browser_pool_module
+from src.clients.browser_pool import BrowserPool, BrowserBusyError
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, user_agent=None):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeFirefox:
+    def __init__(self):
+        self.browsers = []
+        self.fail = False
+
+    async def launch(self, headless=True):
+        if self.fail:
+            raise RuntimeError("找不到 Firefox 執行檔")
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.firefox = FakeFirefox()
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+class FakePlaywrightManager:
+    def __init__(self, playwright):
+        self.playwright = playwright
+
+    async def start(self):
+        return self.playwright
+
+
+class TestBrowserPool(unittest.TestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = mock.patch.object(
+            browser_pool_module, "async_playwright", lambda: FakePlaywrightManager(self.playwright)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_context_is_recycled_after_max_uses(self):
+        pool = BrowserPool(context_max_uses=2)
+
+        async def run():
+            contexts = []
+            for _ in range(3):
+                async with pool.page() as page:
+                    contexts.append(page.context)
+            await pool.stop()
+            return contexts
+
+        contexts = asyncio.run(run())
+        self.assertIs(contexts[0], contexts[1])
+        self.assertIsNot(contexts[1], contexts[2])
+        self.assertTrue(contexts[0].closed)
+        self.assertEqual(pool.stats["context_recycles"], 1)
+        self.assertTrue(all(page.closed for context in contexts for page in context.pages))
+
+    def test_error_recycles_context_after_its_pages_close(self):
+        pool = BrowserPool(max_pages=2)
+
+        async def run():
+            async with pool.page() as other:
+                with self.assertRaises(ValueError):
+                    async with pool.page() as page:
+                        raise ValueError("頁面崩潰")
+                # 還有頁面在使用：舊 context 已淘汰但尚未關閉
+                self.assertIs(page.context, other.context)
+                self.assertFalse(page.context.closed)
+            self.assertTrue(page.context.closed)
+            async with pool.page() as fresh:
+                pass
+            return page, fresh
+
+        page, fresh = asyncio.run(run())
+        self.assertIsNot(fresh.context, page.context)
+        self.assertEqual(pool.stats["context_recycles"], 1)
+
+    def test_crashed_browser_is_relaunched(self):
+        pool = BrowserPool()
+
+        async def run():
+            async with pool.page() as old_page:
+                # 使用中的瀏覽器崩潰：下一個請求重新啟動瀏覽器
+                old_page.context.browser.connected = False
+                async with pool.page() as new_page:
+                    slot = pool._slots[0]
+                    self.assertEqual(list(slot.active), [new_page.context])
+            return slot, old_page, new_page
+
+        slot, old_page, new_page = asyncio.run(run())
+        self.assertIsNot(new_page.context.browser, old_page.context.browser)
+        self.assertEqual(pool.stats["browser_restarts"], 1)
+        # 舊 context 的頁面結束時不影響新瀏覽器的計數
+        self.assertEqual(slot.active, {new_page.context: 0})
+
+    def test_waiting_for_pages_is_bounded(self):
+        pool = BrowserPool(max_pages=1, max_waiting=1, wait_timeout=0.05)
+
+        async def use_page(hold):
+            async with pool.page():
+                await asyncio.sleep(hold)
+
+        async def run():
+            holder = asyncio.create_task(use_page(0.2))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(use_page(0))
+            await asyncio.sleep(0.01)
+            # 已有一個請求在等待：再來的請求立即被拒絕
+            with self.assertRaises(BrowserBusyError):
+                await use_page(0)
+            # 等待中的請求逾時
+            with self.assertRaises(BrowserBusyError):
+                await waiter
+            await holder
+
+        asyncio.run(run())
+        self.assertEqual(pool.stats["busy_rejections"], 2)
+        self.assertEqual((pool.waiting, pool.stats["pages"]), (0, 1))
+
+    def test_failed_start_is_rolled_back_and_retried(self):
+        pool = BrowserPool(size=2)
+
+        async def run():
+            self.playwright.firefox.fail = True
+            with self.assertRaises(RuntimeError):
+                await pool.start()
+            self.assertFalse(pool.started)
+            self.assertTrue(self.playwright.stopped)
+            # 瀏覽器恢復後，第一次使用時再啟動
+            self.playwright.firefox.fail = False
+            async with pool.page():
+                pass
+            return pool
+
+        pool = asyncio.run(run())
+        self.assertTrue(pool.started)
+        self.assertEqual(len(self.playwright.firefox.browsers), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+from src.utils.completion_cache import CompletionCache, SemanticCache
+from src.utils.ttl_cache import TTLCache
+
+MESSAGES = [{"role": "user", "content": "成大獎學金何時截止？"}]
+
+
+async def fake_embedder(texts):
+    # 以字元集合做成的簡單向量：只差標點的問題會得到相同向量
+    vocab = "成大獎學金何時截止申請宿舍"
+    return [[1.0 if ch in text else 0.0 for ch in vocab] for text in texts]
+
+
+class TestCompletionCache(unittest.TestCase):
+    def test_exact_tier(self):
+        cache = CompletionCache(TTLCache())
+
+        async def run():
+            await cache.set("summary", "gpt-4o", MESSAGES, 0.7, "三月底")
+            hit = await cache.get("summary", "gpt-4o", MESSAGES, 0.7)
+            other_temperature = await cache.get("summary", "gpt-4o", MESSAGES, 0.2)
+            other_namespace = await cache.get("reasoning", "gpt-4o", MESSAGES, 0.7)
+            return hit, other_temperature, other_namespace
+
+        self.assertEqual(asyncio.run(run()), ("三月底", None, None))
+
+    def test_semantic_tier(self):
+        cache = CompletionCache(TTLCache(), SemanticCache(fake_embedder, threshold=0.95))
+
+        async def run():
+            await cache.set("reasoning", "gpt-4o", MESSAGES, 0.7, "<step1> 查詢", query="成大獎學金何時截止？")
+            similar = await cache.get(
+                "reasoning", "gpt-4o", [{"role": "user", "content": "x"}], 0.7, query="成大獎學金何時截止"
+            )
+            different = await cache.get(
+                "reasoning", "gpt-4o", [{"role": "user", "content": "y"}], 0.7, query="宿舍申請"
+            )
+            return similar, different
+
+        self.assertEqual(asyncio.run(run()), ("<step1> 查詢", None))
+
+    def test_miss_then_set_embeds_query_once(self):
+        calls = []
+
+        async def counting_embedder(texts):
+            calls.extend(texts)
+            return await fake_embedder(texts)
+
+        cache = CompletionCache(TTLCache(), SemanticCache(counting_embedder, threshold=0.95))
+
+        async def run():
+            await cache.set("reasoning", "gpt-4o", MESSAGES, 0.7, "舊的推理", query="宿舍申請")
+            calls.clear()
+            cached, vector = await cache.lookup("summary", "gpt-4o", MESSAGES, 0.7, query="成大獎學金何時截止")
+            self.assertIsNone(cached)
+            await cache.set("summary", "gpt-4o", MESSAGES, 0.7, "三月底", query="成大獎學金何時截止", vector=vector)
+
+        asyncio.run(run())
+        self.assertEqual(calls, ["成大獎學金何時截止"])
+
+    def test_semantic_eviction_and_namespaces(self):
+        semantic = SemanticCache(fake_embedder, threshold=0.95, max_size=2)
+
+        async def run():
+            await semantic.set("reasoning", "成大獎學金何時截止", "獎學金")
+            await semantic.set("reasoning", "宿舍申請", "宿舍")
+            await semantic.get("reasoning", "成大獎學金何時截止？")  # 命中後變成最近使用
+            await semantic.set("reasoning", "大學申請", "申請")  # 淘汰最久未使用的「宿舍申請」
+            return (
+                await semantic.get("reasoning", "成大獎學金何時截止"),
+                await semantic.get("reasoning", "宿舍申請"),
+                await semantic.get("summary", "成大獎學金何時截止"),
+            )
+
+        self.assertEqual(asyncio.run(run()), ("獎學金", None, None))
+        self.assertEqual(semantic.stats()["size"], 2)
+
+    def test_semantic_entries_expire(self):
+        semantic = SemanticCache(fake_embedder, threshold=0.95, ttl=-1)
+
+        async def run():
+            await semantic.set("reasoning", "宿舍申請", "宿舍")
+            return await semantic.get("reasoning", "宿舍申請")
+
+        self.assertIsNone(asyncio.run(run()))
+        self.assertEqual(semantic.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
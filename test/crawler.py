@@ -0,0 +1,106 @@
+import time
+import asyncio
+import unittest
+import httpx
+from src.functions.crawler import Crawler, normalize_url, parse_page
+
+# 一個小型站台：首頁連到 a、b 與外部網站，a 連到 c，c 連到 d（深度 3）
+SITE = {
+    "/": '<title>首頁</title><a href="/a#top">A</a> <a href="b?utm_source=x">B</a> '
+    '<a href="https://other.example/">外部</a> <a href="/file.pdf">PDF</a> <a href="mailto:x@y.z">信箱</a>',
+    "/a": '<title>A</title><main>獎學金</main><a href="/">首頁</a><a href="/c">C</a>',
+    "/b": "<title>B</title><a href='/a'>A</a>",
+    "/c": "<title>C</title><a href='/d'>D</a>",
+    "/d": "<title>D</title>",
+}
+
+
+def make_client(site=SITE, delay=0.0, log=None):
+    async def handler(request):
+        if log is not None:
+            log.append((request.url.path, time.monotonic()))
+        await asyncio.sleep(delay)
+        if request.url.path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nDisallow: /b\n")
+        body = site.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, text=body, headers={"content-type": "text/html; charset=utf-8"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def crawl(**kwargs):
+    async def run():
+        async with make_client(**kwargs.pop("client_options", {})) as client:
+            crawler = Crawler("https://site.example", client=client, politeness_delay=0, **kwargs)
+            pages = [page async for page in crawler.crawl()]
+            return crawler, pages
+
+    return asyncio.run(run())
+
+
+class TestUrlHandling(unittest.TestCase):
+    def test_normalize_url(self):
+        self.assertEqual(
+            normalize_url("HTTPS://Site.Example:443/a?b=2&a=1&utm_source=x#frag"),
+            "https://site.example/a?a=1&b=2",
+        )
+        self.assertEqual(normalize_url("http://site.example"), "http://site.example/")
+
+    def test_parse_page_resolves_relative_links(self):
+        title, links = parse_page("https://site.example/", SITE["/"])
+        self.assertEqual(title, "首頁")
+        self.assertIn("https://site.example/a", links)
+        self.assertIn("https://site.example/b", links)
+        self.assertNotIn("mailto:x@y.z", links)
+
+
+class TestCrawler(unittest.TestCase):
+    def test_dedup_scope_robots_and_depth(self):
+        crawler, pages = crawl(max_depth=2)
+        urls = sorted(page["url"] for page in pages)
+        # b 被 robots.txt 擋下，外部網站與 PDF 不在範圍內，d 超過深度
+        self.assertEqual(urls, ["https://site.example/", "https://site.example/a", "https://site.example/c"])
+        self.assertEqual(crawler.stats["skipped"], 1)
+        self.assertGreater(crawler.stats["duplicates"], 0)
+        page_a = next(page for page in pages if page["url"].endswith("/a"))
+        self.assertEqual(page_a["content"], "獎學金")
+
+    def test_page_limit(self):
+        _, pages = crawl(max_pages=2, respect_robots=False)
+        self.assertEqual(len(pages), 2)
+
+    def test_pages_fetched_in_parallel_with_per_host_limit(self):
+        site = {"/": "".join(f'<a href="/p{i}">{i}</a>' for i in range(8))}
+        site.update({f"/p{i}": "<title>p</title>" for i in range(8)})
+        start = time.perf_counter()
+        _, pages = crawl(
+            respect_robots=False,
+            concurrency=8,
+            per_host_concurrency=4,
+            client_options={"site": site, "delay": 0.1},
+        )
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(pages), 9)
+        # 循序需 0.9 秒；每主機 4 個並行：首頁 + 兩輪 ≈ 0.3 秒
+        self.assertLess(elapsed, 0.6)
+
+    def test_politeness_delay_spaces_requests(self):
+        log = []
+        site = {"/": '<a href="/p1">1</a><a href="/p2">2</a>', "/p1": "", "/p2": ""}
+
+        async def run():
+            async with make_client(site=site, log=log) as client:
+                crawler = Crawler("https://site.example", client=client, respect_robots=False, politeness_delay=0.1)
+                return [page async for page in crawler.crawl()]
+
+        asyncio.run(run())
+        times = sorted(t for _, t in log)
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        self.assertEqual(len(times), 3)
+        self.assertTrue(all(gap >= 0.09 for gap in gaps), gaps)
+
+
+if __name__ == "__main__":
+    unittest.main()
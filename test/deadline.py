@@ -0,0 +1,127 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+from src.agents import agent as agent_module
+from src.agents import function_registry
+from src.agents.agent import Agent
+from src.agents.tool_registry import ToolRegistry
+from src.utils.deadline import Deadline, DeadlineExceeded, iterate_within
+from test.agent_concurrency import FakeAsyncClient, fake_stream
+
+
+async def ticks(n, delay):
+    for i in range(n):
+        await asyncio.sleep(delay)
+        yield i
+
+
+class SlowAnswerClient(FakeAsyncClient):
+    """推理很快，最終回答的模型呼叫卡住。"""
+
+    def __init__(self):
+        super().__init__()
+
+        async def create(**kwargs):
+            if kwargs.get("tools"):
+                await asyncio.sleep(10)
+            return fake_stream("<step1> 分析問題")
+
+        self.chat.completions.create = create
+
+
+def collect(gen):
+    async def run():
+        return [item async for item in gen]
+
+    return asyncio.run(run())
+
+
+class TestDeadline(unittest.TestCase):
+    def test_iterate_within_cuts_and_records_stage(self):
+        deadline = Deadline(0.25)
+        items = []
+
+        async def run():
+            with self.assertRaises(DeadlineExceeded):
+                async for i in iterate_within(ticks(10, 0.1), deadline, "search"):
+                    items.append(i)
+
+        asyncio.run(run())
+        self.assertEqual(items, [0, 1])
+        self.assertEqual(deadline.cut_stages, ["search"])
+
+    def test_no_deadline_means_no_limit(self):
+        deadline = Deadline()
+        self.assertIsNone(deadline.timeout())
+        self.assertEqual(deadline.timeout(cap=5), 5)
+        self.assertFalse(deadline.expired)
+
+    def test_reserves_scale_with_short_budget(self):
+        config = agent_module.request_config
+        deadline = Deadline(20)
+        answer_reserve = deadline.reserve(config.ANSWER_RESERVE, config.ANSWER_RESERVE_RATIO)
+        tools_reserve = deadline.reserve(config.TOOLS_RESERVE, config.TOOLS_RESERVE_RATIO)
+        summary_reserve = deadline.reserve(config.SUMMARY_RESERVE, config.SUMMARY_RESERVE_RATIO)
+        # 每個階段都還有時間，且越後面的階段保留越少
+        self.assertGreater(deadline.timeout(reserve=answer_reserve), 5)
+        self.assertGreater(answer_reserve, tools_reserve)
+        self.assertGreater(tools_reserve, summary_reserve)
+        self.assertGreater(summary_reserve, 0)
+        self.assertEqual(Deadline(600).reserve(30, 0.5), 30)
+
+    def test_short_budget_does_not_cut_reasoning(self):
+        agent = Agent(FakeAsyncClient())
+        with mock.patch.object(agent_module.preferred_config, "ENABLED", False):
+            chunks = collect(agent.chat_stream("問題", deadline=Deadline(20)))
+        self.assertIn("ReasoningStep", [c["source"] for c in chunks])
+        self.assertNotIn("Deadline", [c["source"] for c in chunks])
+        self.assertNotIn("degraded", chunks[-1])
+
+    def test_stuck_answer_is_cut_and_reported(self):
+        agent = Agent(SlowAnswerClient())
+        with mock.patch.object(agent_module.request_config, "ANSWER_RESERVE", 0.1), mock.patch.object(
+            agent_module.preferred_config, "ENABLED", False
+        ):
+            start = time.perf_counter()
+            chunks = collect(agent.chat_stream("問題", deadline=Deadline(0.5)))
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 1)
+        self.assertTrue(chunks[-1]["finalized"])
+        self.assertEqual(chunks[-1]["degraded"], ["answer"])
+        self.assertIn("回應時間已到", "".join(c["message"] for c in chunks if c.get("delta")))
+
+    def test_tool_and_summary_cut_fall_back_to_raw_results(self):
+        registry = ToolRegistry()
+
+        @registry.tool("fast", "快", timeout=5)
+        async def fast(arguments, reasoning, default_source=None, prefetch=None):
+            return {"raw_search_results": [{"title": "獎學金公告", "link": "https://oia.example/a"}]}
+
+        @registry.tool("stuck", "卡住", timeout=5)
+        async def stuck(arguments, reasoning, default_source=None, prefetch=None):
+            await asyncio.sleep(10)
+
+        async def stuck_summary(info, cacheable=True):
+            await asyncio.sleep(10)
+            yield "不會出現"
+
+        infos = [{"id": "1", "func_name": "fast", "arguments": {}}, {"id": "2", "func_name": "stuck", "arguments": {}}]
+        deadline = Deadline(0.4)
+        with mock.patch.object(function_registry, "registry", registry), mock.patch.object(
+            function_registry, "summarize_result_stream", stuck_summary
+        ), mock.patch.object(function_registry.request_config, "SUMMARY_RESERVE", 0.2):
+            start = time.perf_counter()
+            chunks = collect(function_registry.handle_tool_calls(infos, [], deadline=deadline))
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(deadline.cut_stages, ["tool:stuck", "summary"])
+        answer = "".join(c["message"] for c in chunks if c.get("delta"))
+        self.assertIn("[獎學金公告](https://oia.example/a)", answer)
+        self.assertTrue(chunks[-1]["finalized"])
+
+
+if __name__ == "__main__":
+    unittest.main()
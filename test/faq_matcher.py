@@ -0,0 +1,59 @@
+import unittest
+from rapidfuzz import fuzz, process
+from src.tools.faq_matcher import FaqMatcher, text_ngrams
+from src.utils.text_normalize import normalize_text
+
+RECORDS = [
+    {"問題": "獎學金申請截止日期是什麼時候？", "回覆有誤": "每年三月底截止。"},
+    {"問題": "宿舍如何申請？", "回覆有誤": "請至住宿組網站申請。"},
+    {"問題": "How do I apply for a student visa?", "回覆有誤": "See the visa page."},
+]
+
+
+class TestFaqMatcher(unittest.TestCase):
+    def test_ngrams(self):
+        self.assertEqual(text_ngrams("宿舍申請"), {"宿舍申請", "宿舍", "舍申", "申請"})
+
+    def test_matches_chinese_and_english(self):
+        matcher = FaqMatcher(RECORDS)
+        record, score = matcher.match("獎學金什麼時候截止？")
+        self.assertEqual(record["回覆有誤"], "每年三月底截止。")
+        record, _ = matcher.match("apply student VISA")
+        self.assertEqual(record["回覆有誤"], "See the visa page.")
+        self.assertGreater(score, 40)
+
+    def test_near_duplicate_scores_high_on_both_scorers(self):
+        record, score, strict = FaqMatcher(RECORDS).match_detailed("宿舍要如何申請？")
+        self.assertEqual(record["回覆有誤"], "請至住宿組網站申請。")
+        self.assertGreaterEqual(min(score, strict), 90)
+
+    def test_partial_queries_have_low_strict_score(self):
+        matcher = FaqMatcher(RECORDS)
+        # 只有一個詞、包含問題再加上其他內容、只共用一個關鍵字的查詢
+        for query in ("apply", "宿舍如何申請？另外，我是交換生，簽證要怎麼辦理？", "宿舍停車位怎麼租？"):
+            with self.subTest(query=query):
+                _, _, strict = matcher.match_detailed(query)
+                self.assertLess(strict, 60)
+
+    def test_no_candidates(self):
+        self.assertEqual(FaqMatcher([]).match("宿舍如何申請"), (None, 0))
+        # 大型資料才使用索引：沒有任何共同片段時沒有候選
+        self.assertEqual(FaqMatcher(RECORDS, shortlist_size=2).match("完全無關"), (None, 0))
+        self.assertEqual(FaqMatcher(RECORDS, shortlist_size=2).match_detailed("完全無關"), (None, 0, 0))
+
+    def test_small_sheet_matches_linear_scan(self):
+        # 每個問題都含有「申請」等常見片段，索引會略過它們
+        topics = ["宿舍", "獎學金", "簽證", "交換學生", "選課", "學雜費", "保險", "停車證", "畢業", "休學"]
+        verbs = ["如何申請", "申請期限", "申請需要哪些文件", "申請結果何時公布", "可以線上申請嗎"]
+        records = [{"問題": f"{t}{v}？"} for t in topics for v in verbs]
+        questions = [normalize_text(r["問題"]) for r in records]
+        matcher = FaqMatcher(records)
+        queries = ["申請", "何時申請", "住宿繳費申請", "何時哪些申請", "住宿嗎", "保險申請期限", "結果公布", "交換"]
+        for query in queries:
+            with self.subTest(query=query):
+                _, expected, _ = process.extractOne(normalize_text(query), questions, scorer=fuzz.token_set_ratio)
+                self.assertAlmostEqual(matcher.match(query)[1], expected, places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
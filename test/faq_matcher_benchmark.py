@@ -0,0 +1,56 @@
+"""
+比較逐筆 fuzz.token_set_ratio 掃描與 FaqMatcher 索引查詢在不同資料量下的延遲。
+
+    python -m test.faq_matcher_benchmark
+"""
+import time
+import random
+from rapidfuzz import fuzz
+from src.tools.faq_matcher import FaqMatcher
+
+TOPICS = ["獎學金", "宿舍", "簽證", "復學", "選課", "學費", "畢業", "交換", "保險", "實習"]
+ACTIONS = ["申請", "截止日期", "需要文件", "如何辦理", "退費", "延期", "資格", "流程", "聯絡窗口", "常見問題"]
+
+
+def make_records(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        question = f"{rng.choice(TOPICS)}{rng.choice(ACTIONS)}第{i}項：{rng.choice(TOPICS)}{rng.choice(ACTIONS)}"
+        records.append({"問題": question, "回覆有誤": f"回答 {i}"})
+    return records
+
+
+def linear_scan(query: str, records: list):
+    best_match, best_score = None, 0
+    for record in records:
+        score = fuzz.token_set_ratio(query, record.get("問題", ""))
+        if score > best_score:
+            best_match, best_score = record, score
+    return best_match, best_score
+
+
+def bench(n: int, queries: list):
+    records = make_records(n)
+
+    start = time.perf_counter()
+    matcher = FaqMatcher(records)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        matcher.match(query)
+    indexed = (time.perf_counter() - start) / len(queries)
+
+    start = time.perf_counter()
+    for query in queries:
+        linear_scan(query, records)
+    linear = (time.perf_counter() - start) / len(queries)
+
+    print(f"{n:>7} 筆 | 建索引 {build * 1000:8.1f} ms | 索引查詢 {indexed * 1000:7.2f} ms | 逐筆掃描 {linear * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    queries = [f"{t}{a}" for t in TOPICS[:5] for a in ACTIONS[:4]] + [f"第{i}項" for i in (7, 4242, 99999)]
+    for n in (100, 1_000, 10_000, 100_000):
+        bench(n, queries)
@@ -0,0 +1,31 @@
+import unittest
+from src.functions.http_search import parse_bing_results
+
+HTML = """
+<ol id="b_results">
+  <li class="b_algo"><h2><a href="https://oia.ncku.edu.tw/a">成大 <strong>獎學金</strong> 公告</a></h2>
+    <div class="b_caption"><p>說明 <a href="https://ignored.example">不是標題</a></p></div></li>
+  <li class="b_ad"><h2><a href="https://ads.example">廣告</a></h2></li>
+  <li class="b_algo"><h2><a href="https://example.com/b">第二筆結果</a></h2></li>
+</ol>
+"""
+
+
+class TestParseBingResults(unittest.TestCase):
+    def test_extracts_organic_titles_and_links(self):
+        results = parse_bing_results(HTML)
+        self.assertEqual(
+            [(r["title"], r["link"]) for r in results],
+            [
+                ("成大 獎學金 公告", "https://oia.ncku.edu.tw/a"),
+                ("第二筆結果", "https://example.com/b"),
+            ],
+        )
+        self.assertIn("timestamp", results[0])
+
+    def test_empty_page(self):
+        self.assertEqual(parse_bing_results("<html></html>"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
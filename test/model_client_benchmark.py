@@ -0,0 +1,68 @@
+"""
+比較「每次呼叫都 init_model_client()」與「共用 get_model_client()」的成本。
+
+    python -m test.model_client_benchmark            # 只量測建立客戶端的成本
+    python -m test.model_client_benchmark --live 10  # 另外實際呼叫 Azure OpenAI 10 次
+"""
+import time
+import asyncio
+import argparse
+from src.clients.model_client import init_model_client, get_model_client, close_model_clients
+
+
+def bench_construction(n: int):
+    start = time.perf_counter()
+    for _ in range(n):
+        init_model_client()
+    per_call = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        get_model_client()
+    shared = (time.perf_counter() - start) / n
+
+    print(f"建立客戶端（{n} 次平均）")
+    print(f"  init_model_client(): {per_call * 1000:.3f} ms")
+    print(f"  get_model_client():  {shared * 1000:.3f} ms")
+
+
+async def _ping(client):
+    await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": "ping"}],
+        max_tokens=1,
+    )
+
+
+async def bench_live(n: int):
+    # 每次都建立新客戶端：每次呼叫都要重新建立 TCP/TLS 連線
+    start = time.perf_counter()
+    for _ in range(n):
+        client = init_model_client()
+        await _ping(client)
+        await client.close()
+    per_call = (time.perf_counter() - start) / n
+
+    # 共用客戶端：第一次之後重複使用 keep-alive 連線
+    client = get_model_client()
+    await _ping(client)  # 預熱連線
+    start = time.perf_counter()
+    for _ in range(n):
+        await _ping(client)
+    shared = (time.perf_counter() - start) / n
+    await close_model_clients()
+
+    print(f"實際呼叫模型（{n} 次平均）")
+    print(f"  init_model_client(): {per_call * 1000:.1f} ms")
+    print(f"  get_model_client():  {shared * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200, help="建立客戶端的次數")
+    parser.add_argument("--live", type=int, default=0, help="實際呼叫模型的次數（需要 .env 設定）")
+    args = parser.parse_args()
+
+    bench_construction(args.n)
+    if args.live:
+        asyncio.run(bench_live(args.live))
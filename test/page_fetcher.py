@@ -0,0 +1,51 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+from src.functions import page_fetcher
+from src.functions.page_fetcher import extract_main_text, enrich_results
+
+HTML = """
+<html><head><style>body {color: red}</style><script>var x = 1;</script></head>
+<body>
+  <nav>首頁 | 關於</nav>
+  <main><h1>獎學金公告</h1><p>申請截止日期為 3 月 31 日。</p></main>
+  <footer>版權所有</footer>
+</body></html>
+"""
+
+
+class TestExtractMainText(unittest.TestCase):
+    def test_keeps_main_content_only(self):
+        text = extract_main_text(HTML)
+        self.assertIn("獎學金公告", text)
+        self.assertIn("申請截止日期為 3 月 31 日。", text)
+        self.assertNotIn("var x", text)
+        self.assertNotIn("首頁", text)
+        self.assertNotIn("版權所有", text)
+
+
+class TestEnrichResults(unittest.TestCase):
+    def test_returns_what_arrived_before_deadline(self):
+        async def fake_fetch(url, timeout=None, token_budget=None):
+            await asyncio.sleep(5 if "slow" in url else 0.01)
+            return f"內容 {url}"
+
+        results = [
+            {"title": "快", "link": "https://fast.example"},
+            {"title": "慢", "link": "https://slow.example"},
+        ]
+        with mock.patch.object(page_fetcher, "fetch_page_text", fake_fetch):
+            start = time.perf_counter()
+            enriched = asyncio.run(enrich_results(results, top_n=2, concurrency=2, deadline=0.2))
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 1)
+        self.assertEqual(enriched[0]["content"], "內容 https://fast.example")
+        self.assertNotIn("content", enriched[1])
+        # 不修改原本的結果（可能來自快取）
+        self.assertNotIn("content", results[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
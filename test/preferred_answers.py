@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from src.tools.preferred_answers import FaqStore, get_preferred_answer
+
+RECORDS = [
+    {"問題": "獎學金申請截止日期是什麼時候？", "回覆有誤": "每年三月底截止。"},
+    {"問題": "宿舍如何申請？", "回覆有誤": "請至住宿組網站申請。"},
+]
+
+
+class TestFaqStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmp.name, "faq.json")
+        self.calls = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def loader(self):
+        self.calls += 1
+        return RECORDS
+
+    def failing_loader(self):
+        raise ConnectionError("Google 無法連線")
+
+    def test_loads_lazily_and_writes_snapshot(self):
+        store = FaqStore(loader=self.loader, snapshot_path=self.snapshot)
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(store.get_records(), RECORDS)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(os.path.exists(self.snapshot))
+
+    def test_cold_start_from_snapshot_when_source_is_down(self):
+        FaqStore(loader=self.loader, snapshot_path=self.snapshot).refresh()
+        store = FaqStore(loader=self.failing_loader, snapshot_path=self.snapshot)
+        self.assertEqual(store.get_records(), RECORDS)
+
+    def test_failed_refresh_keeps_last_good_data(self):
+        store = FaqStore(loader=self.loader, snapshot_path=self.snapshot)
+        store.refresh()
+        store.loader = self.failing_loader
+        self.assertFalse(store.refresh())
+        self.assertEqual(store.get_records(), RECORDS)
+        self.assertIn("Google", store.last_error)
+
+    def test_version_changes_only_when_records_change(self):
+        store = FaqStore(loader=lambda: list(RECORDS))
+        store.refresh()
+        version = store.version
+        matcher = store.get_matcher()
+        # 內容相同的重新載入：版本不變，索引不重建
+        self.assertTrue(store.refresh())
+        self.assertEqual(store.version, version)
+        self.assertIs(store.get_matcher(), matcher)
+
+        store.loader = lambda: RECORDS + [{"問題": "圖書館開放時間", "回覆有誤": "早上八點到晚上十點"}]
+        store.refresh()
+        self.assertEqual(store.version, version + 1)
+        self.assertIsNot(store.get_matcher(), matcher)
+
+    def test_get_preferred_answer_with_fixture(self):
+        answer = get_preferred_answer("獎學金什麼時候截止申請", RECORDS)
+        self.assertEqual(answer, "每年三月底截止。")
+
+
+if __name__ == "__main__":
+    unittest.main()
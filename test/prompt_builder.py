@@ -0,0 +1,36 @@
+import unittest
+from src.utils.prompt_builder import PromptBuilder
+from src.utils.token_count import count_tokens
+
+
+class TestPromptBuilder(unittest.TestCase):
+    def test_duplicates_kept_in_higher_priority_section(self):
+        builder = PromptBuilder(max_tokens=1000)
+        builder.add_section("results", "查詢結果：", ["- 成大獎學金 (https://a)"], 500, priority=2)
+        builder.add_section("reasoning", "思考過程：", ["- 成大獎學金 (https://a)", "<step1> 搜尋"], 500, priority=1)
+        prompt = builder.build()
+        self.assertEqual(prompt.count("成大獎學金"), 1)
+        self.assertEqual(builder.stats["reasoning"], count_tokens("<step1> 搜尋"))
+
+    def test_section_budget(self):
+        builder = PromptBuilder(max_tokens=1000)
+        items = [f"第 {i} 筆結果，" + "內容" * 20 for i in range(50)]
+        builder.add_section("results", "查詢結果：", items, 200, priority=1)
+        builder.build()
+        self.assertLessEqual(builder.stats["results"], 200)
+        self.assertGreater(builder.stats["before"], 200)
+
+    def test_total_budget_trims_lowest_priority_first(self):
+        builder = PromptBuilder(max_tokens=120)
+        builder.add_section("time", "當前時間：", ["2025-01-01 12:00:00"], 50, priority=3)
+        builder.add_section("results", "查詢結果：", ["結果" * 40], 100, priority=2)
+        builder.add_section("reasoning", "思考過程：", ["推理" * 40], 100, priority=1)
+        prompt = builder.build()
+        self.assertLessEqual(builder.stats["total"], 120)
+        self.assertIn("2025-01-01 12:00:00", prompt)
+        self.assertEqual(builder.stats["results"], count_tokens("結果" * 40))
+        self.assertLess(builder.stats["reasoning"], count_tokens("推理" * 40))
+
+
+if __name__ == "__main__":
+    unittest.main()
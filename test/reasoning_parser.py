@@ -0,0 +1,45 @@
+import unittest
+from src.agents.reasoning import ReasoningStepParser, parse_reasoning_text
+
+RAW = "前言 <step1> 理解問題。\n<step2> 搜尋資料。\n<step3> 給出答案。"
+
+
+def feed_in_chunks(text, size):
+    parser = ReasoningStepParser()
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.append(parser.feed(text[i : i + size]))
+    emitted.append(parser.flush())
+    return emitted
+
+
+class TestReasoningStepParser(unittest.TestCase):
+    def test_matches_full_text_parser(self):
+        for size in (1, 3, 7, len(RAW)):
+            steps = [s for batch in feed_in_chunks(RAW, size) for s in batch]
+            self.assertEqual(steps, parse_reasoning_text(RAW))
+
+    def test_steps_are_emitted_progressively(self):
+        parser = ReasoningStepParser()
+        self.assertEqual(parser.feed("<step1> 第一步"), [])
+        # 下一個 <step 標記到達時，第一步即完成
+        self.assertEqual(parser.feed(" <step2> 第二"), ["<step1> 第一步"])
+        self.assertEqual(parser.flush(), ["<step2> 第二"])
+
+    def test_closing_tag_ends_step(self):
+        parser = ReasoningStepParser()
+        self.assertEqual(parser.feed("<step1> 第一步</step1>"), ["<step1> 第一步</step1>"])
+
+    def test_split_marker(self):
+        parser = ReasoningStepParser()
+        self.assertEqual(parser.feed("<step1> a <st"), [])
+        self.assertEqual(parser.feed("ep2> b"), ["<step1> a"])
+
+    def test_text_without_markers(self):
+        parser = ReasoningStepParser()
+        self.assertEqual(parser.feed("沒有標記的推理"), [])
+        self.assertEqual(parser.flush(), ["沒有標記的推理"])
+
+
+if __name__ == "__main__":
+    unittest.main()
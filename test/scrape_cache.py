@@ -0,0 +1,77 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import httpx
+from src.functions.scrape_cache import ScrapeCache
+from src.utils.ttl_cache import SqliteCache
+
+
+class FakeSite:
+    def __init__(self):
+        self.body = "<html><main>獎學金申請截止日期為 3 月 31 日</main><script>var t = 1;</script></html>"
+        self.etag = '"v1"'
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=self.body, headers={"etag": self.etag, "content-type": "text/html"})
+
+
+class TestScrapeCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.site = FakeSite()
+        self.extractions = []
+        self.store = SqliteCache(os.path.join(tmp.name, "scrape.sqlite3"), ttl=3600)
+
+    async def extract(self, prompt, url):
+        self.extractions.append((prompt, url))
+        return {"answer": f"第 {len(self.extractions)} 次擷取"}
+
+    def scrape(self, prompt="截止日期?", url="https://oia.example/faq", text=None):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self.site.handler)) as client:
+                cache = ScrapeCache(self.store, client=client)
+                result = await cache.scrape(url, prompt, self.extract, text=text)
+                return result, cache.stats()
+
+        return asyncio.run(run())
+
+    def test_not_modified_page_is_not_extracted_again(self):
+        first, _ = self.scrape()
+        second, stats = self.scrape()
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.extractions), 1)
+        self.assertEqual(self.site.requests[-1].headers["if-none-match"], '"v1"')
+        self.assertEqual((stats["hits"], stats["not_modified"]), (1, 1))
+        self.assertGreater(stats["bytes_not_downloaded"], 0)
+
+    def test_extraction_reruns_only_when_content_changes(self):
+        self.scrape()
+        # ETag 改變但正文相同（只有 script 不同）：不重新擷取
+        self.site.etag = '"v2"'
+        self.site.body = self.site.body.replace("var t = 1", "var t = 2")
+        self.scrape()
+        self.assertEqual(len(self.extractions), 1)
+
+        self.site.etag = '"v3"'
+        self.site.body = self.site.body.replace("3 月 31 日", "4 月 15 日")
+        result, stats = self.scrape()
+        self.assertEqual(len(self.extractions), 2)
+        self.assertEqual(result, {"answer": "第 2 次擷取"})
+        self.assertEqual(stats["misses"], 1)
+
+    def test_prompt_is_part_of_key_and_text_skips_fetch(self):
+        self.scrape(text="正文")
+        self.scrape(text="正文")
+        self.scrape(prompt="另一個問題", text="正文")
+        self.assertEqual(self.site.requests, [])
+        self.assertEqual(len(self.extractions), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import time
+import asyncio
+import unittest
+from src.clients.scraper_pool import ScraperPool
+
+# 以下函數在 worker process 中執行，必須定義在模組層級
+_initialized_at = None
+
+
+def fake_init():
+    global _initialized_at
+    time.sleep(0.2)  # 模擬載入模型設定的冷啟動成本
+    _initialized_at = time.time()
+
+
+def fake_job(prompt, source):
+    if source == "slow":
+        time.sleep(10)
+    if source == "crash":
+        os._exit(1)
+    return {"prompt": prompt, "source": source, "pid": os.getpid(), "initialized_at": _initialized_at}
+
+
+class TestScraperPool(unittest.TestCase):
+    def run_with_pool(self, scenario, workers=2):
+        async def run():
+            pool = ScraperPool(workers=workers, job_timeout=5, initializer=fake_init, job=fake_job)
+            try:
+                return await scenario(pool)
+            finally:
+                await pool.stop()
+
+        return asyncio.run(run())
+
+    def test_warm_workers_are_reused(self):
+        async def scenario(pool):
+            await pool.start()
+            start = time.perf_counter()
+            results = await asyncio.gather(*(pool.scrape("p", f"url{i}") for i in range(6)))
+            return results, time.perf_counter() - start, pool.stats()
+
+        results, elapsed, stats = self.run_with_pool(scenario)
+        self.assertEqual([r["source"] for r in results], [f"url{i}" for i in range(6)])
+        self.assertTrue(all(r["initialized_at"] for r in results))
+        # 預熱後不再付出 initializer 的成本，且只有 workers 個 process
+        self.assertLess(elapsed, 0.2)
+        self.assertLessEqual(len({r["pid"] for r in results}), 2)
+        self.assertEqual(stats["completed"], 6)
+
+    def test_timeout_recycles_pool_when_all_workers_stuck(self):
+        async def scenario(pool):
+            with self.assertRaises(asyncio.TimeoutError):
+                await pool.scrape("p", "slow", timeout=0.5)
+            # 逾時的工作佔滿唯一的 worker，pool 應重建，之後的工作不受影響
+            result = await pool.scrape("p", "fast")
+            return result, pool.stats()
+
+        result, stats = self.run_with_pool(scenario, workers=1)
+        self.assertEqual(result["source"], "fast")
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["restarts"], 1)
+
+    def test_restart_fails_queued_jobs_without_cancelling_callers(self):
+        async def scenario(pool):
+            await pool.start()
+            stuck = asyncio.create_task(pool.scrape("p", "slow", timeout=0.5))
+            await asyncio.sleep(0.1)
+            # 排在唯一的 worker 後面；前一個工作逾時重建 pool 時，尚未送進 worker 的工作會被取消
+            queued = [asyncio.create_task(pool.scrape("p", f"queued{i}")) for i in range(4)]
+            with self.assertRaises(asyncio.TimeoutError):
+                await stuck
+            outcomes = await asyncio.gather(*queued, return_exceptions=True)
+            return outcomes, [task.cancelled() for task in queued], await pool.scrape("p", "ok"), pool.stats()
+
+        outcomes, cancelled, result, stats = self.run_with_pool(scenario, workers=1)
+        self.assertFalse(any(cancelled))
+        self.assertTrue(all(isinstance(o, RuntimeError) for o in outcomes))
+        self.assertEqual(result["source"], "ok")
+        self.assertEqual(stats["restarts"], 1)
+
+    def test_cancelled_job_does_not_block_caller(self):
+        async def scenario(pool):
+            await pool.start()
+            task = asyncio.create_task(pool.scrape("p", "slow"))
+            await asyncio.sleep(0.2)
+            start = time.perf_counter()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            cancel_elapsed = time.perf_counter() - start
+            # 另一個 worker 仍可處理新的工作
+            return await pool.scrape("p", "ok"), cancel_elapsed, pool.stats()
+
+        result, cancel_elapsed, stats = self.run_with_pool(scenario, workers=2)
+        self.assertEqual(result["source"], "ok")
+        self.assertLess(cancel_elapsed, 0.5)
+        self.assertEqual(stats["cancelled"], 1)
+
+    def test_broken_worker_rebuilds_pool(self):
+        async def scenario(pool):
+            with self.assertRaises(Exception):
+                await pool.scrape("p", "crash")
+            return await pool.scrape("p", "ok"), pool.stats()
+
+        result, stats = self.run_with_pool(scenario, workers=1)
+        self.assertEqual(result["source"], "ok")
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["restarts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
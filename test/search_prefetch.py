@@ -0,0 +1,131 @@
+import asyncio
+import unittest
+from src.agents.tool_registry import Tool
+from src.functions.search_prefetch import SearchPrefetcher, query_similarity
+
+
+def make_search(delay, calls):
+    async def search(query, source_url=None):
+        calls.append(query)
+        await asyncio.sleep(delay)
+        return [{"title": query, "link": "https://example.com"}]
+
+    return search
+
+
+class TestSearchPrefetch(unittest.TestCase):
+    def test_similar_queries(self):
+        self.assertGreaterEqual(query_similarity("請問成大交換學生怎麼申請？", "成大 交換學生 申請"), 70)
+        self.assertLess(query_similarity("請問成大交換學生怎麼申請？", "台北天氣"), 70)
+
+    def test_similar_query_uses_prefetched_results(self):
+        calls = []
+        prefetcher = SearchPrefetcher(search=make_search(0.2, calls))
+
+        async def run():
+            prefetch = prefetcher.start("What is the latest AI news?")
+            await asyncio.sleep(0.1)  # 模擬推理時間
+            results = await prefetcher.take(prefetch, "latest AI news")
+            prefetcher.release(prefetch)
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual(results[0]["title"], "What is the latest AI news?")
+        self.assertEqual(calls, ["What is the latest AI news?"])
+        stats = prefetcher.stats()
+        self.assertEqual((stats["used"], stats["wasted"], stats["active"]), (1, 0, 0))
+        self.assertGreaterEqual(stats["time_saved_seconds"], 0.09)
+
+    def test_unrelated_query_falls_back_and_prefetch_is_cancelled(self):
+        prefetcher = SearchPrefetcher(search=make_search(5, []))
+
+        async def run():
+            prefetch = prefetcher.start("latest AI news")
+            self.assertIsNone(await prefetcher.take(prefetch, "python asyncio tutorial"))
+            prefetcher.release(prefetch)
+            await asyncio.sleep(0)
+            return prefetch
+
+        prefetch = asyncio.run(run())
+        self.assertTrue(prefetch.task.cancelled())
+        stats = prefetcher.stats()
+        self.assertEqual((stats["used"], stats["wasted"], stats["mismatched"]), (0, 1, 1))
+
+    def test_failed_prefetch_returns_none(self):
+        async def broken(query, source_url=None):
+            raise RuntimeError("瀏覽器啟動失敗")
+
+        prefetcher = SearchPrefetcher(search=broken)
+
+        async def run():
+            prefetch = prefetcher.start("latest AI news")
+            results = await prefetcher.take(prefetch, "latest AI news")
+            prefetcher.release(prefetch)
+            return results
+
+        self.assertIsNone(asyncio.run(run()))
+        self.assertEqual(prefetcher.stats()["failed"], 1)
+
+    def test_requests_only_take_their_own_prefetch(self):
+        calls = []
+        prefetcher = SearchPrefetcher(search=make_search(0.05, calls))
+
+        async def run():
+            # 兩個請求同時進行：A 問 AI 新聞，B 問不相關的問題
+            mine = prefetcher.start("What is the latest AI news?")
+            theirs = prefetcher.start("python asyncio tutorial")
+            # B 的模型改寫出與 A 相近的查詢，不應取走 A 的預先搜尋
+            stolen = await prefetcher.take(theirs, "latest AI news")
+            own = await prefetcher.take(mine, "latest AI news")
+            prefetcher.release(theirs)
+            prefetcher.release(mine)
+            return mine, stolen, own
+
+        mine, stolen, own = asyncio.run(run())
+        self.assertIsNone(stolen)
+        self.assertEqual(own[0]["title"], "What is the latest AI news?")
+        self.assertTrue(mine.used)
+        stats = prefetcher.stats()
+        self.assertEqual((stats["used"], stats["wasted"], stats["mismatched"]), (1, 1, 1))
+
+    def test_no_prefetch_handle_returns_none(self):
+        prefetcher = SearchPrefetcher(search=make_search(0.05, []))
+
+        async def run():
+            other = prefetcher.start("latest AI news")
+            results = await prefetcher.take(None, "latest AI news")
+            prefetcher.release(other)
+            return results
+
+        self.assertIsNone(asyncio.run(run()))
+        self.assertEqual(prefetcher.stats()["used"], 0)
+
+    def test_prefetch_shares_the_search_tool_concurrency_limit(self):
+        running = []
+        peak = []
+
+        async def search(query, source_url=None):
+            running.append(query)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.remove(query)
+            return [{"title": query, "link": "https://example.com"}]
+
+        tool = Tool("search_website", "", {}, None, max_concurrency=1)
+        prefetcher = SearchPrefetcher(search=search, limiter=tool.slot)
+
+        async def run():
+            first = prefetcher.start("latest AI news")
+            second = prefetcher.start("python asyncio tutorial")
+            await asyncio.sleep(0.005)
+            waiting = tool.waiting
+            await asyncio.gather(first.task, second.task)
+            return waiting
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(tool.running, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
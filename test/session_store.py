@@ -0,0 +1,74 @@
+import asyncio
+import gc
+import unittest
+from backend.session_store import SessionStore
+from test.agent_concurrency import FakeAsyncClient
+
+
+class TestSessionStore(unittest.TestCase):
+    def test_lru_eviction(self):
+        store = SessionStore(client=None, max_sessions=2, ttl=60, max_history=4)
+        a = store.get("a")
+        store.get("b")
+        # 存取 a 使其成為最近使用，新增 c 時應淘汰 b
+        self.assertIs(store.get("a"), a)
+        store.get("c")
+        stats = store.stats()
+        self.assertEqual(stats["sessions"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertIs(store.get("a"), a)
+
+    def test_ttl_expiration(self):
+        store = SessionStore(client=None, max_sessions=10, ttl=0, max_history=4)
+        a = store.get("a")
+        self.assertIsNot(store.get("a"), a)
+        self.assertGreaterEqual(store.stats()["expirations"], 1)
+
+    def test_history_is_bounded(self):
+        store = SessionStore(client=None, max_sessions=10, ttl=60, max_history=4)
+        agent = store.get("a")
+        pinned = len(agent.messages)
+        for i in range(20):
+            agent.add_message("user", f"訊息 {i}")
+        self.assertEqual(len(agent.messages), pinned + 4)
+        self.assertEqual(agent.messages[-1]["content"], "訊息 19")
+
+    def test_anonymous_sessions_are_not_stored(self):
+        store = SessionStore(client=None)
+        self.assertIsNot(store.get(None), store.get(None))
+        self.assertEqual(store.stats()["sessions"], 0)
+
+    def test_same_session_requests_run_one_at_a_time(self):
+        store = SessionStore(client=FakeAsyncClient(), max_sessions=10, ttl=60)
+        agent = store.get("a")
+        pinned = len(agent.messages)
+
+        async def ask(query):
+            # 與 agent_stream 相同：持有 session 的鎖才執行流程
+            async with store.lock("a"):
+                return await store.get("a").chat(query)
+
+        async def run():
+            return await asyncio.gather(ask("第一個問題"), ask("第二個問題"))
+
+        asyncio.run(run())
+        history = [(m["role"], m["content"]) for m in agent.messages[pinned:]]
+        # 第二個請求的問題在第一個請求的回答之後才寫入歷史
+        first, second = history.index(("user", "第一個問題")), history.index(("user", "第二個問題"))
+        self.assertIn("assistant", [role for role, _ in history[first:second]])
+        self.assertEqual(history[-1][0], "assistant")
+
+    def test_session_locks(self):
+        store = SessionStore(client=None)
+        lock = store.lock("a")
+        self.assertIs(store.lock("a"), lock)
+        self.assertIsNot(store.lock("b"), lock)
+        self.assertIsNot(store.lock(None), store.lock(None))
+        # 沒有人持有的鎖會被回收
+        del lock
+        gc.collect()
+        self.assertEqual(len(store._locks), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
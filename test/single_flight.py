@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from backend.single_flight import SingleFlight
+
+
+def make_pipeline(calls, chunks=3, delay=0.05, fail=False):
+    async def pipeline():
+        calls.append(1)
+        for i in range(chunks):
+            await asyncio.sleep(delay)
+            yield i
+        if fail:
+            raise RuntimeError("模型服務錯誤")
+
+    return pipeline
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_requests_share_one_pipeline(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def request(wait):
+            await asyncio.sleep(wait)
+            return [chunk async for chunk in flights.stream("q", make_pipeline(calls))]
+
+        async def run():
+            # 第二個請求在第一個片段產生後才加入，仍應收到完整的片段
+            return await asyncio.gather(request(0), request(0.07), request(0.07))
+
+        results = asyncio.run(run())
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [[0, 1, 2]] * 3)
+        stats = flights.stats()
+        self.assertEqual((stats["flights"], stats["joined"], stats["active"]), (1, 2, 0))
+
+    def test_finished_flight_is_not_reused(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def run():
+            for _ in range(2):
+                [chunk async for chunk in flights.stream("q", make_pipeline(calls, delay=0))]
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+
+    def test_error_is_raised_for_every_subscriber(self):
+        flights = SingleFlight()
+
+        async def request():
+            received = []
+            try:
+                async for chunk in flights.stream("q", make_pipeline([], chunks=1, fail=True)):
+                    received.append(chunk)
+            except RuntimeError:
+                return received
+            return None
+
+        async def run():
+            return await asyncio.gather(request(), request())
+
+        self.assertEqual(asyncio.run(run()), [[0], [0]])
+        self.assertEqual(flights.stats()["failed"], 1)
+
+    def test_pipeline_cancelled_when_all_subscribers_leave(self):
+        flights = SingleFlight()
+
+        async def run():
+            flight = flights.join("q", make_pipeline([], chunks=100))
+            subscriber = flights.subscribe(flight)
+            await subscriber.__anext__()
+            await subscriber.aclose()
+            await asyncio.sleep(0)
+            return flight
+
+        flight = asyncio.run(run())
+        self.assertTrue(flight.task.cancelled())
+        self.assertTrue(flight.cancelled)
+        self.assertEqual(flights.stats()["cancelled"], 1)
+        self.assertEqual(flights.stats()["active"], 0)
+
+    def test_attach_to_checked_flight_after_it_finished_replays(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def run():
+            async def leader_request():
+                return [chunk async for chunk in flights.stream("q", make_pipeline(calls))]
+
+            leader = asyncio.create_task(leader_request())
+            await asyncio.sleep(0)
+            checked = flights.get("q")  # 端點檢查時流程仍在執行
+            await leader
+            self.assertIsNone(flights.get("q"))
+            # 串流開始時流程已結束：加入同一個流程重播片段，不另外執行
+            return [chunk async for chunk in flights.subscribe(flights.attach(checked))]
+
+        self.assertEqual(asyncio.run(run()), [0, 1, 2])
+        self.assertEqual(calls, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.agents import function_registry
+from src.agents.tool_registry import ToolRegistry
+from src.agents.function_registry import (
+    handle_tool_calls,
+    merge_tool_call_deltas,
+    get_streamed_tool_calls_info,
+)
+
+
+def tool_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def make_runner(delay, result):
+    async def runner(arguments, reasoning, default_source=None, prefetch=None):
+        await asyncio.sleep(delay)
+        return dict(result)
+
+    return runner
+
+
+class TestToolCallDeltas(unittest.TestCase):
+    def test_interleaved_fragments_are_merged_by_index(self):
+        calls = {}
+        merge_tool_call_deltas(calls, [tool_delta(0, "call_a", "search_", '{"qu')])
+        merge_tool_call_deltas(calls, [tool_delta(1, "call_b", "get_current_time", "")])
+        merge_tool_call_deltas(calls, [tool_delta(0, None, "website", 'ery": "獎學金"}')])
+        infos = get_streamed_tool_calls_info(calls)
+        self.assertEqual([i["func_name"] for i in infos], ["search_website", "get_current_time"])
+        self.assertEqual(infos[0]["arguments"], {"query": "獎學金"})
+        self.assertEqual(infos[1]["arguments"], {})
+
+
+class TestHandleToolCalls(unittest.TestCase):
+    def run_calls(self, infos, runners, timeouts=None):
+        registry = ToolRegistry()
+        for name, runner in runners.items():
+            registry.tool(name, name, timeout=(timeouts or {}).get(name, 5))(runner)
+        summaries = []
+
+        async def fake_summary(info, cacheable=True):
+            summaries.append((info, cacheable))
+            yield "摘要"
+
+        async def collect():
+            return [chunk async for chunk in handle_tool_calls(infos, [])]
+
+        with mock.patch.object(function_registry, "registry", registry), mock.patch.object(
+            function_registry, "summarize_result_stream", fake_summary
+        ):
+            start = time.perf_counter()
+            chunks = asyncio.run(collect())
+            return chunks, summaries, time.perf_counter() - start
+
+    def test_tools_run_concurrently_and_stream_in_completion_order(self):
+        infos = [
+            {"id": "a", "func_name": "slow_search", "arguments": {}},
+            {"id": "b", "func_name": "fast_time", "arguments": {}},
+        ]
+        runners = {
+            "slow_search": make_runner(0.3, {"raw_search_results": [{"title": "t", "link": "l"}]}),
+            "fast_time": make_runner(0.1, {"current_time": "現在"}),
+        }
+        chunks, summaries, elapsed = self.run_calls(infos, runners)
+
+        self.assertLess(elapsed, 0.45)  # 約為 max(0.3, 0.1)，而非 0.4
+        progress = [c.get("tool") for c in chunks if c.get("tool")]
+        self.assertEqual(progress, ["fast_time", "slow_search"])
+        info, _ = summaries[0]
+        self.assertEqual(info["current_time"], "現在")
+        self.assertEqual(len(info["raw_search_results"]), 1)
+        # 耗時只出現在進度片段，不進入摘要 prompt，相同問題的摘要才能共用快取
+        self.assertIn("耗時", next(c["message"] for c in chunks if c.get("tool")))
+        self.assertFalse(any("耗時" in step for step in info["reasoning"]))
+        self.assertTrue(chunks[-1]["finalized"])
+
+    def test_timeout_is_per_tool_and_reported_to_summary(self):
+        infos = [
+            {"id": "a", "func_name": "hangs", "arguments": {}},
+            {"id": "b", "func_name": "quick", "arguments": {}},
+        ]
+        runners = {
+            "hangs": make_runner(5, {}),
+            "quick": make_runner(0.01, {"knowledge_results": []}),
+        }
+        chunks, summaries, elapsed = self.run_calls(infos, runners, timeouts={"hangs": 0.2, "quick": 1})
+
+        self.assertLess(elapsed, 1)
+        info, cacheable = summaries[0]
+        self.assertIn("knowledge_results", info)
+        self.assertEqual(len(info["tool_errors"]), 1)
+        self.assertIn("hangs", info["tool_errors"][0])
+        self.assertFalse(cacheable)
+
+    def test_search_results_are_not_copied_into_reasoning(self):
+        results = [{"title": "獎學金公告", "link": "https://oia.example/a"}]
+
+        async def fake_search(query, source_url=None):
+            return results
+
+        reasoning = []
+        with mock.patch.object(function_registry, "search_website", fake_search), mock.patch.object(
+            function_registry.search_config, "PREFETCH_ENABLED", False
+        ), mock.patch.object(function_registry.search_config, "ENRICH_ENABLED", False):
+            info = asyncio.run(function_registry._run_search_website({"query": "獎學金"}, reasoning))
+
+        self.assertEqual(info["raw_search_results"], results)
+        self.assertFalse(any("oia.example" in step for step in reasoning))
+
+
+if __name__ == "__main__":
+    unittest.main()
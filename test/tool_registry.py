@@ -0,0 +1,59 @@
+import asyncio
+import time
+import unittest
+from src.agents.tool_registry import ToolRegistry
+from src.agents.function_registry import get_function_definitions, get_tool_definitions, registry
+
+
+class TestToolRegistry(unittest.TestCase):
+    def test_builtin_tools_and_cached_schemas(self):
+        names = [d["name"] for d in get_function_definitions()]
+        self.assertEqual(names, ["search_website", "get_current_time", "search_knowledge_base", "scrape_website"])
+        # schema 只建立一次，每次請求回傳同一份列表
+        self.assertIs(get_function_definitions(), get_function_definitions())
+        self.assertIs(get_tool_definitions(), get_tool_definitions())
+        self.assertFalse(registry.get("get_current_time").cacheable)
+
+    def test_registering_invalidates_cache(self):
+        tools = ToolRegistry()
+
+        @tools.tool("a", "工具 A")
+        async def a(arguments, reasoning, default_source=None):
+            return {}
+
+        first = tools.definitions()
+        tools.tool("b", "工具 B")(a)
+        self.assertEqual([d["name"] for d in tools.definitions()], ["a", "b"])
+        self.assertIsNot(first, tools.definitions())
+        self.assertEqual(tools.tool_definitions()[1], {"type": "function", "function": tools.definitions()[1]})
+
+    def test_max_concurrency_throttles_and_timeout_includes_queueing(self):
+        tools = ToolRegistry()
+        active = []
+        peak = []
+
+        @tools.tool("slow", "慢工具", max_concurrency=2, timeout=0.35)
+        async def slow(arguments, reasoning, default_source=None):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.2)
+            active.pop()
+            return {}
+
+        async def run():
+            tool = tools.get("slow")
+            return await asyncio.gather(*(tool.run({}, []) for _ in range(4)), return_exceptions=True), tool.stats()
+
+        start = time.perf_counter()
+        results, stats = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(max(peak), 2)
+        # 前兩個 0.2 秒完成；後兩個排隊 0.2 秒後再執行 0.2 秒，超過 0.35 秒上限
+        self.assertEqual(sum(isinstance(r, asyncio.TimeoutError) for r in results), 2)
+        self.assertEqual((stats["completed"], stats["timeouts"]), (2, 2))
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from src.utils.ttl_cache import TTLCache, SqliteCache, TieredCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)  # b 最久未使用，應被淘汰
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expired_entries_miss(self):
+        cache = TTLCache(max_size=2, ttl=0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestTieredCache(unittest.TestCase):
+    def test_disk_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "search.sqlite3")
+            first = TieredCache(TTLCache(), SqliteCache(path))
+            first.set("q", [{"title": "標題", "link": "https://example.com"}])
+
+            # 模擬服務重啟：新的記憶體快取，同一個 sqlite 檔案
+            second = TieredCache(TTLCache(), SqliteCache(path))
+            self.assertEqual(second.get("q")[0]["title"], "標題")
+            self.assertEqual(second.disk.stats()["hits"], 1)
+            # 回填記憶體後不再讀取磁碟
+            second.get("q")
+            self.assertEqual(second.memory.stats()["hits"], 1)
+
+    def test_disk_size_bound(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = SqliteCache(os.path.join(tmp, "c.sqlite3"), max_size=3)
+            for i in range(10):
+                disk.set(f"k{i}", i)
+            self.assertEqual(len(disk), 3)
+            self.assertEqual(disk.get("k9"), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
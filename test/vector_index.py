@@ -0,0 +1,112 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from src.clients.embedding_client import HashingEmbedder
+from src.tools.knowledge_base import KnowledgeBase
+from src.tools.preferred_answers import FaqStore
+from src.tools.vector_index import VectorIndex
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=128)
+        self.embedded = []
+
+    async def __call__(self, texts):
+        self.embedded.extend(texts)
+        return await super().__call__(texts)
+
+
+ITEMS = [
+    {"id": "faq:1", "text": "獎學金申請截止日期", "payload": {"answer": "三月底"}},
+    {"id": "faq:2", "text": "宿舍如何申請", "payload": {"answer": "住宿組網站"}},
+    {"id": "faq:3", "text": "學生簽證需要哪些文件", "payload": {"answer": "護照與入學許可"}},
+]
+
+
+class TestVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.embedder = CountingEmbedder()
+
+    def search(self, index, text):
+        vector = asyncio.run(self.embedder([text]))[0]
+        return index.search(vector, k=1)[0]
+
+    def test_search_from_memory_mapped_file(self):
+        asyncio.run(VectorIndex(self.tmp.name).upsert(ITEMS, self.embedder))
+        # 重新開啟：向量由磁碟 mmap 讀取
+        index = VectorIndex(self.tmp.name)
+        self.assertEqual(len(index), 3)
+        score, id_, payload = self.search(index, "宿舍申請")
+        self.assertEqual(id_, "faq:2")
+        self.assertEqual(payload["answer"], "住宿組網站")
+        self.assertGreater(score, 0.2)
+
+    def test_incremental_update_embeds_only_changes(self):
+        index = VectorIndex(self.tmp.name)
+        asyncio.run(index.upsert(ITEMS, self.embedder, prefix="faq:"))
+        asyncio.run(index.upsert([{"id": "doc:a", "text": "國際處公告", "payload": {}}], self.embedder, prefix="doc:"))
+        self.embedder.embedded.clear()
+
+        updated = [ITEMS[0], {"id": "faq:2", "text": "宿舍申請流程", "payload": {"answer": "新答案"}}]
+        stats = asyncio.run(index.upsert(updated, self.embedder, prefix="faq:"))
+
+        self.assertEqual(self.embedder.embedded, ["宿舍申請流程"])
+        self.assertEqual((stats["unchanged"], stats["updated"], stats["removed"]), (1, 1, 1))
+        # 其他 prefix 的項目不受影響
+        self.assertIn("doc:a", index.ids)
+        self.assertNotIn("faq:3", index.ids)
+
+    def test_unchanged_items_do_not_rewrite_files(self):
+        index = VectorIndex(self.tmp.name)
+        asyncio.run(index.upsert(ITEMS, self.embedder))
+        mtime = os.stat(index.vectors_path).st_mtime_ns
+        self.embedder.embedded.clear()
+
+        stats = asyncio.run(index.upsert(ITEMS, self.embedder))
+        self.assertEqual((stats["added"], stats["updated"], stats["removed"], stats["unchanged"]), (0, 0, 0, 3))
+        self.assertEqual(self.embedder.embedded, [])
+        self.assertEqual(os.stat(index.vectors_path).st_mtime_ns, mtime)
+
+        # 只有 payload 改變：不重新 embedding，但要寫回
+        edited = ITEMS[:2] + [{**ITEMS[2], "payload": {"answer": "護照、入學許可與財力證明"}}]
+        stats = asyncio.run(index.upsert(edited, self.embedder))
+        self.assertEqual((stats["updated"], stats["unchanged"]), (1, 2))
+        self.assertEqual(self.embedder.embedded, [])
+        self.assertEqual(VectorIndex(self.tmp.name).payloads[2]["answer"], "護照、入學許可與財力證明")
+
+
+class TestKnowledgeBase(unittest.TestCase):
+    def test_faq_rows_are_indexed_and_reindexed_on_update(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        rows = [
+            {"問題": "宿舍如何申請", "回覆有誤": "請至住宿組網站申請"},
+            {"問題": "學生簽證需要哪些文件", "回覆有誤": "護照與入學許可"},
+        ]
+        store = FaqStore(loader=lambda: list(rows))
+        embedder = CountingEmbedder()
+        kb = KnowledgeBase(VectorIndex(tmp.name), embedder=embedder, store=store)
+
+        results = asyncio.run(kb.search("宿舍申請", k=1, min_score=0))
+        self.assertEqual(results[0]["answer"], "請至住宿組網站申請")
+        self.assertEqual(len(embedder.embedded), 3)  # 兩列問答 + 一次查詢
+
+        # 資料版本未變：不重新 embedding 問答
+        embedder.embedded.clear()
+        asyncio.run(kb.search("簽證", k=1, min_score=0))
+        self.assertEqual(embedder.embedded, ["簽證"])
+
+        rows.append({"問題": "圖書館開放時間", "回覆有誤": "早上八點到晚上十點"})
+        store.refresh()
+        embedder.embedded.clear()
+        results = asyncio.run(kb.search("圖書館開放時間", k=1, min_score=0))
+        self.assertEqual(embedder.embedded, ["圖書館開放時間", "圖書館開放時間"])
+        self.assertEqual(results[0]["question"], "圖書館開放時間")
+
+
+if __name__ == "__main__":
+    unittest.main()